@@ -8,6 +8,9 @@ from .analyst_agent import AnalystAgent
 from .forecast_agent import ForecastAgent
 from .orchestrator_agent import OrchestratorAgent
 from .multi_agent_system import MultiAgentSystem
+from .events import ExecutionLog
+from .tracing import Tracer, get_tracer, critical_path
+from .llm_recording import RecordingClient, ReplayClient, TranscriptMiss
 
 __all__ = [
     'BaseAgent',
@@ -16,5 +19,12 @@ __all__ = [
     'AnalystAgent',
     'ForecastAgent',
     'OrchestratorAgent',
-    'MultiAgentSystem'
+    'MultiAgentSystem',
+    'ExecutionLog',
+    'Tracer',
+    'get_tracer',
+    'critical_path',
+    'RecordingClient',
+    'ReplayClient',
+    'TranscriptMiss'
 ]
\ No newline at end of file
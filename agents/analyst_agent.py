@@ -2,15 +2,26 @@
 # File: agents/analyst_agent.py
 # ============================================================================
 import pandas as pd
+from psycopg2 import sql
 from typing import Dict, List
 from openai import OpenAI
+from utils.database import connect_database
+from utils.metadata_cache import get_schema_cache
+from utils.sql_statistics import (
+    TREND_AGGREGATES, TREND_PERIODS, compute_source_statistics, describe_source, fetch_source_trend, source_relation
+)
+from utils.streaming_stats import StreamingSummary, iter_query_batches, iter_records, summarize_batches
+from utils.trend_analysis import analyze_trends
 from .base_agent import BaseAgent
 
 
 class AnalystAgent(BaseAgent):
     """Agent specialized in data analysis and insights."""
     
-    def __init__(self, client: OpenAI):
+    # Inline datasets above this size are summarized in batches instead of one DataFrame
+    STREAMING_ROW_THRESHOLD = 20000
+    
+    def __init__(self, client: OpenAI, db_config: Dict = None):
         super().__init__(
             name="Data Analyst Agent",
             role="""You are a senior data analyst with expertise in statistical analysis and business intelligence.
@@ -19,9 +30,22 @@ Your responsibilities:
 - Provide actionable business insights
 - Identify anomalies and opportunities
 - Suggest further analyses
-- Communicate findings clearly to non-technical stakeholders""",
+- Communicate findings clearly to non-technical stakeholders
+
+When the data lives in the database, pass a 'table' or a SELECT 'query' to analyze_data instead of copying rows into 'data'. The statistics are then computed over the full table inside PostgreSQL.""",
             client=client
         )
+        self.db_config = db_config
+    
+    def get_db_connection(self):
+        """Create a read-only database connection."""
+        conn = connect_database(self.db_config, source="analyst_agent")
+        try:
+            conn.set_session(readonly=True)
+        except Exception:
+            conn.close()
+            raise
+        return conn
     
     def get_tools(self) -> List[Dict]:
         return [{
@@ -37,15 +61,54 @@ Your responsibilities:
                             "items": {
                                 "type": "object"
                             },
-                            "description": "Data to analyze"
+                            "description": "Small inline dataset to analyze. Omit when analyzing a table or query."
+                        },
+                        "table": {
+                            "type": "string",
+                            "description": "Database table to analyze in full (e.g. 'expenses')"
+                        },
+                        "query": {
+                            "type": "string",
+                            "description": "SELECT statement whose result should be analyzed in the database"
+                        },
+                        "method": {
+                            "type": "string",
+                            "enum": ["database", "streaming"],
+                            "description": "For table/query sources: 'database' computes exact aggregates in SQL (default); 'streaming' reads rows once through a server-side cursor and also reports approximate distinct counts"
                         },
                         "analysis_type": {
                             "type": "string",
                             "enum": ["descriptive", "trend", "correlation", "summary"],
                             "description": "Type of analysis to perform"
+                        },
+                        "time_column": {
+                            "type": "string",
+                            "description": "Trend analysis: date/period column (detected when omitted)"
+                        },
+                        "value_column": {
+                            "type": "string",
+                            "description": "Trend analysis: numeric column to analyze (detected when omitted)"
+                        },
+                        "group_column": {
+                            "type": "string",
+                            "description": "Trend analysis: optional column splitting the data into separate series (e.g. category)"
+                        },
+                        "season_length": {
+                            "type": "integer",
+                            "description": "Trend analysis: optional seasonal cycle length in periods (e.g. 12 for monthly data) to remove before anomaly detection"
+                        },
+                        "period": {
+                            "type": "string",
+                            "enum": list(TREND_PERIODS),
+                            "description": "Trend analysis of a table/query: period to aggregate dates into (chosen from the date range when omitted)"
+                        },
+                        "aggregate": {
+                            "type": "string",
+                            "enum": list(TREND_AGGREGATES),
+                            "description": "Trend analysis of a table/query: how values are combined per period (default sum)"
                         }
                     },
-                    "required": ["data", "analysis_type"]
+                    "required": ["analysis_type"]
                 }
             }
         }]
@@ -53,9 +116,20 @@ Your responsibilities:
     def process_tool_call(self, tool_name: str, tool_input: Dict) -> Dict:
         if tool_name == "analyze_data":
             try:
-                df = pd.DataFrame(tool_input['data'])
                 analysis_type = tool_input['analysis_type']
                 
+                if tool_input.get('table') or tool_input.get('query'):
+                    return self._analyze_source(tool_input, analysis_type)
+                
+                if 'data' not in tool_input:
+                    return {"success": False, "error": "Provide 'data', a 'table' or a 'query' to analyze"}
+                
+                if len(tool_input['data']) > self.STREAMING_ROW_THRESHOLD and analysis_type != "trend":
+                    summary = summarize_batches(iter_records(tool_input['data']))
+                    return self._streaming_result(summary, analysis_type)
+                
+                df = pd.DataFrame(tool_input['data'])
+                
                 if analysis_type == "descriptive":
                     stats = df.describe().to_dict()
                     return {"success": True, "statistics": stats}
@@ -77,8 +151,102 @@ Your responsibilities:
                         return {"success": True, "correlations": corr}
                     return {"success": False, "error": "Not enough numeric columns"}
                 
+                elif analysis_type == "trend":
+                    return self._trend_result(df, tool_input)
+                
                 return {"success": True, "message": "Analysis complete"}
             except Exception as e:
                 return {"success": False, "error": str(e)}
         
         return {"error": "Unknown tool"}
+    
+    def _analyze_source(self, tool_input: Dict, analysis_type: str) -> Dict:
+        """Compute statistics for a table or query inside PostgreSQL."""
+        if not self.db_config:
+            return {"success": False, "error": "No database configured for source analysis"}
+        
+        print(f"🗄️ Analyzing in database: {tool_input.get('table') or tool_input.get('query')}")
+        
+        # Before borrowing a connection: a catalog miss opens its own
+        columns = self._table_columns(tool_input['table']) if tool_input.get('table') else None
+        conn = self.get_db_connection()
+        try:
+            streaming = analysis_type != "trend" and tool_input.get('method') == "streaming"
+            if columns is None and tool_input.get('query') and not streaming:
+                columns = get_schema_cache().get_query_columns(
+                    self.db_config,
+                    tool_input['query'],
+                    lambda: describe_source(conn, source_relation(query=tool_input['query']))
+                )
+            
+            if analysis_type == "trend":
+                # Only the per-period series leaves the database
+                df, series = fetch_source_trend(
+                    conn,
+                    table=tool_input.get('table'),
+                    query=tool_input.get('query'),
+                    time_column=tool_input.get('time_column'),
+                    value_column=tool_input.get('value_column'),
+                    group_column=tool_input.get('group_column'),
+                    period=tool_input.get('period'),
+                    aggregate=tool_input.get('aggregate', "sum"),
+                    columns=columns
+                )
+                result = self._trend_result(df, dict(tool_input, **series))
+                result["trends"].update(period=series["period"], aggregate=series["aggregate"])
+                return {"source": "database", **result}
+            
+            if streaming:
+                relation = source_relation(tool_input.get('table'), tool_input.get('query'))
+                # Server-side cursors need a transaction, which psycopg2 opens implicitly
+                summary = summarize_batches(iter_query_batches(conn, sql.SQL("SELECT * FROM {}").format(relation)))
+                return self._streaming_result(summary, analysis_type)
+            
+            result = compute_source_statistics(
+                conn,
+                analysis_type,
+                table=tool_input.get('table'),
+                query=tool_input.get('query'),
+                columns=columns
+            )
+        finally:
+            conn.close()
+        
+        if analysis_type == "correlation" and not result["correlations"]:
+            return {"success": False, "error": "Not enough numeric columns"}
+        
+        return {"success": True, "source": "database", **result}
+    
+    def _table_columns(self, table: str) -> List:
+        """(name, type OID) pairs of a table from the schema cache, or None if it is not in the catalog."""
+        columns = get_schema_cache().get_catalog(self.db_config, self.get_db_connection).get(table)
+        if not columns or any(column.get("type_oid") is None for column in columns):
+            return None
+        return [(column["name"], column["type_oid"]) for column in columns]
+    
+    def _trend_result(self, df: pd.DataFrame, tool_input: Dict) -> Dict:
+        """Compact trend and anomaly findings for one or many series."""
+        trends = analyze_trends(
+            df,
+            time_column=tool_input.get('time_column'),
+            value_column=tool_input.get('value_column'),
+            group_column=tool_input.get('group_column'),
+            season_length=tool_input.get('season_length')
+        )
+        print(f"📈 Trend analysis: {trends['series_count']} series, {trends['total_points']} points")
+        return {"success": True, "trends": trends}
+    
+    def _streaming_result(self, summary: StreamingSummary, analysis_type: str) -> Dict:
+        """Shape a streaming summary like the in-memory analysis results."""
+        if analysis_type == "descriptive":
+            return {"success": True, "source": "streaming", "row_count": summary.row_count, "statistics": summary.describe()}
+        
+        elif analysis_type == "summary":
+            return {"success": True, "source": "streaming", "summary": summary.summary()}
+        
+        elif analysis_type == "correlation":
+            if len(summary.numeric_columns or []) > 1:
+                return {"success": True, "source": "streaming", "row_count": summary.row_count, "correlations": summary.correlations()}
+            return {"success": False, "error": "Not enough numeric columns"}
+        
+        return {"success": False, "error": f"Analysis type '{analysis_type}' is not supported for streaming"}
\ No newline at end of file
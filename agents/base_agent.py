@@ -2,10 +2,34 @@
 # File: agents/base_agent.py
 # ============================================================================
 import json
-from datetime import datetime, date
-from decimal import Decimal
-from typing import List, Dict
+import time
+from typing import Callable, List, Dict
 from openai import OpenAI
+from openai.types.chat import ChatCompletion
+from utils.metrics import get_registry
+from utils.serialization import ENCODINGS, approximate_tokens, compact_result, dumps_text, get_serialization_config
+from .events import ExecutionLog
+from .tracing import current_sink, current_span, get_tracer, record_event
+
+
+LLM_SECONDS = get_registry().histogram(
+    "analytics_llm_request_duration_seconds", "LLM chat completion latency", ["agent"]
+)
+LLM_REQUESTS = get_registry().counter("analytics_llm_requests_total", "LLM chat completions", ["agent", "status"])
+LLM_TOKENS = get_registry().counter("analytics_llm_tokens_total", "LLM tokens used", ["agent", "type"])
+AGENT_TURN_SECONDS = get_registry().histogram(
+    "analytics_agent_turn_duration_seconds", "Time for an agent to answer one message", ["agent"]
+)
+TOOL_CALLS = get_registry().counter("analytics_tool_calls_total", "Tool calls by outcome", ["agent", "tool", "status"])
+TOOL_SECONDS = get_registry().histogram("analytics_tool_call_duration_seconds", "Tool call latency", ["tool"])
+
+# Tool parameter letting the LLM choose how tabular results come back
+ENCODING_PARAMETER = {
+    "type": "string",
+    "enum": list(ENCODINGS),
+    "description": "How result rows are returned to you: 'rows' (column names and types once, then one array "
+                   "per row), 'csv', or 'records' (one object per row). Omit for the compact default."
+}
 
 
 class BaseAgent:
@@ -25,129 +49,217 @@ class BaseAgent:
         """Override this method in subclasses to handle tool calls."""
         return {"error": "Tool not implemented"}
     
-    def json_serialize(self, obj):
-        """Convert non-serializable objects to serializable types."""
-        if isinstance(obj, Decimal):
-            return float(obj)
-        elif isinstance(obj, (datetime, date)):
-            return obj.isoformat()
-        elif isinstance(obj, bytes):
-            return obj.decode('utf-8')
-        raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
-    
     def safe_json_dumps(self, obj):
         """Safely serialize objects to JSON, handling special types."""
-        return json.dumps(obj, default=self.json_serialize)
+        return dumps_text(obj)
+    
+    def format_tool_result(self, tool_name: str, tool_input: Dict, result: Dict) -> str:
+        """Override to change how a tool result is presented to the LLM; callers keep the full result."""
+        return self.safe_json_dumps(result)
+    
+    def compact_tool_result(self, tool_input: Dict, result: Dict) -> str:
+        """Serialize a tabular result in the compact LLM encoding and report the tokens it saves."""
+        encoding = tool_input.get("encoding")
+        if encoding not in ENCODINGS:
+            encoding = get_serialization_config()['tool_encoding']
+        content = self.safe_json_dumps(compact_result(result, encoding))
+        if encoding != "records" and result.get("success"):
+            # One extra encoder pass, so the savings are measured rather than guessed
+            full_tokens = approximate_tokens(self.safe_json_dumps(result))
+            tokens = approximate_tokens(content)
+            span = current_span()
+            if span is not None:
+                span.attributes.update(encoding=encoding, result_tokens_full=full_tokens)
+            print(f"🗜️ Result as {encoding}: ~{full_tokens:,} → ~{tokens:,} tokens")
+        return content
+    
+    @staticmethod
+    def _collect_stream(stream, on_token: Callable[[str], None]) -> ChatCompletion:
+        """Assemble a streamed completion, passing content deltas to on_token as they arrive.
+        
+        Tool calls arrive as fragments keyed by index (id and name first, then
+        pieces of the arguments) and are stitched back together, so callers get
+        the same ChatCompletion as without streaming.
+        """
+        if isinstance(stream, ChatCompletion):
+            # Clients that cannot stream (benchmark stub, replayed transcripts) answer in one piece
+            if stream.choices[0].message.content:
+                on_token(stream.choices[0].message.content)
+            return stream
+        
+        completion = {"id": "", "created": 0, "model": "gpt-4o", "object": "chat.completion", "choices": []}
+        content, tool_calls, finish_reason = [], {}, None
+        for chunk in stream:
+            completion.update(id=chunk.id or completion["id"], created=chunk.created or completion["created"],
+                              model=chunk.model or completion["model"])
+            if chunk.usage is not None:
+                completion["usage"] = chunk.usage.model_dump()
+            for choice in chunk.choices:
+                delta = choice.delta
+                if delta.content:
+                    content.append(delta.content)
+                    on_token(delta.content)
+                for fragment in delta.tool_calls or []:
+                    call = tool_calls.setdefault(
+                        fragment.index, {"id": "", "type": "function", "function": {"name": "", "arguments": ""}}
+                    )
+                    if fragment.id:
+                        call["id"] = fragment.id
+                    if fragment.function is not None:
+                        call["function"]["name"] += fragment.function.name or ""
+                        call["function"]["arguments"] += fragment.function.arguments or ""
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+        
+        message = {"role": "assistant", "content": "".join(content) or None}
+        if tool_calls:
+            message["tool_calls"] = [tool_calls[index] for index in sorted(tool_calls)]
+        completion["choices"] = [{"index": 0, "message": message, "finish_reason": finish_reason or "stop"}]
+        return ChatCompletion.model_validate(completion)
+    
+    def _complete(self, messages: List[Dict], tools: List[Dict] = None, on_token: Callable[[str], None] = None):
+        """Call the LLM inside an llm span, streaming the reply text to on_token when given."""
+        with get_tracer().span("llm.chat", kind="llm", agent=self.name, model="gpt-4o",
+                               messages=len(messages), streamed=on_token is not None) as span:
+            start = time.perf_counter()
+            stream = {"stream": True, "stream_options": {"include_usage": True}} if on_token else {}
+            try:
+                response = self.client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=messages,
+                    tools=tools if tools else None,
+                    tool_choice="auto" if tools else None,
+                    temperature=0.7,
+                    **stream
+                )
+                if on_token:
+                    response = self._collect_stream(response, on_token)
+            except Exception:
+                LLM_REQUESTS.inc(agent=self.name, status="error")
+                raise
+            finally:
+                LLM_SECONDS.observe(time.perf_counter() - start, agent=self.name)
+            LLM_REQUESTS.inc(agent=self.name, status="ok")
+            
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                LLM_TOKENS.inc(usage.prompt_tokens, agent=self.name, type="prompt")
+                LLM_TOKENS.inc(usage.completion_tokens, agent=self.name, type="completion")
+                span.attributes["prompt_tokens"] = usage.prompt_tokens
+                span.attributes["completion_tokens"] = usage.completion_tokens
+            span.attributes["finish_reason"] = response.choices[0].finish_reason
+            return response
     
     def chat(self, message: str, context: str = "", execution_logs: list = None) -> tuple:
         """Send a message to the agent and get a response with execution logs."""
         print(f"\n{'🤖 ' + self.name:━^60}")
         
-        # Initialize execution logs if not provided
+        # Sub-agents publish into the caller's log unless given their own
         if execution_logs is None:
-            execution_logs = []
-        
-        # Log agent start
-        execution_logs.append({
-            "type": "agent_start",
-            "agent": self.name,
-            "message": message,
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        system_message = f"{self.role}\n\n{context}" if context else self.role
-        
-        # Build messages with conversation history
-        messages = [{"role": "system", "content": system_message}]
-        
-        # Add conversation history for context
-        messages.extend(self.conversation_history)
-        
-        # Add current user message
-        messages.append({"role": "user", "content": message})
-        
-        tools = self.get_tools()
-        
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            tools=tools if tools else None,
-            tool_choice="auto" if tools else None,
-            temperature=0.7
-        )
+            execution_logs = current_sink()
+        if execution_logs is None:
+            execution_logs = ExecutionLog()
         
-        iteration = 0
-        # Process tool calls if any
-        while response.choices[0].finish_reason == "tool_calls":
-            iteration += 1
-            messages.append(response.choices[0].message)
+        tracer = get_tracer()
+        with tracer.span(self.name, kind="agent", sink=execution_logs, agent=self.name) as agent_span:
+            # Log agent start
+            record_event("agent_start", agent=self.name, message=message)
             
-            execution_logs.append({
-                "type": "decision",
-                "iteration": iteration,
-                "decision": f"Agent decided to use {len(response.choices[0].message.tool_calls)} tool(s)",
-                "timestamp": datetime.now().isoformat()
-            })
+            system_message = f"{self.role}\n\n{context}" if context else self.role
             
-            for tool_call in response.choices[0].message.tool_calls:
-                tool_name = tool_call.function.name
-                tool_input = json.loads(tool_call.function.arguments)
-                
-                print(f"\n🔧 Tool: {tool_name}")
-                print(f"📋 Input: {json.dumps(tool_input, indent=2)}")
-                
-                # Log tool call
-                execution_logs.append({
-                    "type": "tool_call",
-                    "tool_name": tool_name,
-                    "tool_input": tool_input,
-                    "timestamp": datetime.now().isoformat()
-                })
+            # Build messages with conversation history
+            messages = [{"role": "system", "content": system_message}]
+            
+            # Add conversation history for context
+            messages.extend(self.conversation_history)
+            
+            # Add current user message
+            messages.append({"role": "user", "content": message})
+            
+            tools = self.get_tools()
+            
+            response = self._complete(messages, tools)
+            
+            iteration = 0
+            # Process tool calls if any
+            while response.choices[0].finish_reason == "tool_calls":
+                iteration += 1
+                messages.append(response.choices[0].message)
                 
-                result = self.process_tool_call(tool_name, tool_input)
+                record_event(
+                    "decision",
+                    iteration=iteration,
+                    decision=f"Agent decided to use {len(response.choices[0].message.tool_calls)} tool(s)"
+                )
                 
-                # Log tool result
-                execution_logs.append({
-                    "type": "tool_result",
-                    "tool_name": tool_name,
-                    "success": result.get("success", False),
-                    "row_count": result.get("row_count"),
-                    "error": result.get("error"),
-                    "timestamp": datetime.now().isoformat()
-                })
+                for tool_call in response.choices[0].message.tool_calls:
+                    tool_name = tool_call.function.name
+                    tool_input = json.loads(tool_call.function.arguments)
+                    
+                    print(f"\n🔧 Tool: {tool_name}")
+                    print(f"📋 Input: {tool_call.function.arguments}")
+                    
+                    with tracer.span(f"tool.{tool_name}", kind="tool", agent=self.name, tool=tool_name) as tool_span:
+                        # Log tool call
+                        record_event("tool_call", tool_name=tool_name, tool_input=tool_input)
+                        
+                        result = self.process_tool_call(tool_name, tool_input)
+                        
+                        # Artifacts (e.g. chart specs) are for the UI, not the LLM
+                        artifacts = result.pop("artifacts", None)
+                        # Serialized once, inside the span so large results show up in its timing
+                        content = self.format_tool_result(tool_name, tool_input, result)
+                        tool_span.attributes["result_chars"] = len(content)
+                        tool_span.attributes["result_tokens"] = approximate_tokens(content)
+                        
+                        status = "ok" if result.get("success", False) else "error"
+                        TOOL_CALLS.inc(agent=self.name, tool=tool_name, status=status)
+                        TOOL_SECONDS.observe(tool_span.duration_ms / 1000, tool=tool_name)
+                        if status == "error":
+                            tool_span.set_error(str(result.get("error") or "Tool call failed"))
+                        if result.get("row_count") is not None:
+                            tool_span.attributes["row_count"] = result["row_count"]
+                        
+                        # Log tool result
+                        record_event(
+                            "tool_result",
+                            tool_name=tool_name,
+                            success=result.get("success", False),
+                            row_count=result.get("row_count"),
+                            error=result.get("error"),
+                            artifacts=artifacts or [],
+                            result_tokens=tool_span.attributes["result_tokens"],
+                            duration_ms=round(tool_span.duration_ms, 1)
+                        )
+                    
+                    messages.append({
+                        "role": "tool",
+                        "tool_call_id": tool_call.id,
+                        "name": tool_name,
+                        "content": content
+                    })
                 
-                messages.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "name": tool_name,
-                    "content": self.safe_json_dumps(result)
-                })
+                response = self._complete(messages, tools)
             
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=messages,
-                tools=tools if tools else None,
-                tool_choice="auto" if tools else None,
-                temperature=0.7
+            final_response = response.choices[0].message.content
+            print(f"\n💬 Response: {final_response}\n")
+            
+            # Store conversation in history
+            self.conversation_history.append({"role": "user", "content": message})
+            self.conversation_history.append({"role": "assistant", "content": final_response})
+            
+            # Keep only last 10 exchanges (20 messages) to avoid token limits
+            if len(self.conversation_history) > 20:
+                self.conversation_history = self.conversation_history[-20:]
+            
+            AGENT_TURN_SECONDS.observe(agent_span.duration_ms / 1000, agent=self.name)
+            
+            # Log agent completion
+            record_event(
+                "agent_complete",
+                agent=self.name,
+                response_length=len(final_response),
+                duration_ms=round(agent_span.duration_ms, 1)
             )
         
-        final_response = response.choices[0].message.content
-        print(f"\n💬 Response: {final_response}\n")
-        
-        # Store conversation in history
-        self.conversation_history.append({"role": "user", "content": message})
-        self.conversation_history.append({"role": "assistant", "content": final_response})
-        
-        # Keep only last 10 exchanges (20 messages) to avoid token limits
-        if len(self.conversation_history) > 20:
-            self.conversation_history = self.conversation_history[-20:]
-        
-        # Log agent completion
-        execution_logs.append({
-            "type": "agent_complete",
-            "agent": self.name,
-            "response_length": len(final_response),
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        return final_response, execution_logs
\ No newline at end of file
+        return final_response, execution_logs
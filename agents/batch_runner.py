@@ -0,0 +1,209 @@
+# ============================================================================
+# File: agents/batch_runner.py
+# ============================================================================
+import os
+import re
+import sys
+import json
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, TextIO
+import pyarrow.parquet as pq
+from utils.columnar import ColumnarResult
+
+
+def read_questions(path: str) -> List[Dict]:
+    """Questions from a file (or '-' for stdin): one per line, or JSON lines with "question" and optional "id".
+
+    Ids default to the line number, so a resumed run must read the same file.
+    """
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        questions = []
+        for number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                entry = json.loads(line)
+                questions.append({"id": str(entry.get("id") or f"line-{number}"), "question": entry["question"]})
+            else:
+                questions.append({"id": f"line-{number}", "question": line})
+        return questions
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def completed_ids(output_path: str) -> set:
+    """Ids already answered successfully in an existing output file."""
+    if not output_path or output_path == "-" or not os.path.exists(output_path):
+        return set()
+    done = set()
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A run killed mid-write leaves a partial last line
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def _timings(spans: List) -> Dict:
+    request = next((span for span in spans if span.kind == "request"), None)
+    timings = {
+        "total_ms": round(request.duration_ms, 1) if request else None,
+        "llm_ms": round(sum(span.duration_ms for span in spans if span.kind == "llm"), 1),
+        "llm_calls": sum(1 for span in spans if span.kind == "llm")
+    }
+    for span in spans:
+        if span.kind == "tool":
+            key = f"{span.name}_ms"
+            timings[key] = round(timings.get(key, 0.0) + span.duration_ms, 1)
+    return timings
+
+
+def _usage(spans: List) -> Dict:
+    prompt = sum(span.attributes.get("prompt_tokens", 0) for span in spans if span.kind == "llm")
+    completion = sum(span.attributes.get("completion_tokens", 0) for span in spans if span.kind == "llm")
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+class BatchRunner:
+    """Answers a list of questions on a pool of isolated agent sessions and streams JSONL records.
+
+    Each worker owns one MultiAgentSystem (from make_system) and clears its
+    conversation memory before every question. Questions that raise or whose
+    tool calls fail are retried with exponential backoff; table and forecast
+    results are saved under results_dir and referenced from the record by path.
+    """
+
+    def __init__(self, make_system: Callable, concurrency: int = 4, retries: int = 2, backoff: float = 1.0,
+                 results_dir: str = None):
+        self.make_system = make_system
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.results_dir = results_dir
+        self._systems = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _acquire_system(self):
+        try:
+            return self._systems.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.concurrency
+                self._created += create
+            return self.make_system() if create else self._systems.get()
+
+    def _result_handles(self, question_id: str, logs: List[Dict]) -> List[Dict]:
+        handles = []
+        safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", question_id)
+        artifacts = [
+            artifact
+            for log in logs
+            if log.get("type") == "tool_result" and log.get("success")
+            for artifact in log.get("artifacts", [])
+        ]
+        for index, artifact in enumerate(artifacts):
+            kind = artifact.get("kind")
+            handle = {"kind": kind, "title": artifact.get("title")}
+            if kind == "table":
+                data = ColumnarResult.coerce(artifact["data"])
+                handle.update(rows=len(data), columns=data.columns)
+                if self.results_dir:
+                    handle["path"] = os.path.join(self.results_dir, f"{safe_id}-{index}.parquet")
+                    pq.write_table(data.table, handle["path"], compression="zstd")
+            elif kind == "forecast":
+                handle["periods"] = len(artifact["data"].get("forecast", []))
+                if self.results_dir:
+                    handle["path"] = os.path.join(self.results_dir, f"{safe_id}-{index}.json")
+                    with open(handle["path"], "w", encoding="utf-8") as f:
+                        json.dump(artifact["data"], f, default=str)
+            elif kind == "image":
+                handle["path"] = artifact["path"]
+            handles.append(handle)
+        return handles
+
+    def answer(self, item: Dict) -> Dict:
+        """Answer one question, retrying failures; always returns a record."""
+        record = {"id": item["id"], "question": item["question"], "started_at": datetime.now().isoformat()}
+        system = self._acquire_system()
+        try:
+            for attempt in range(1, self.retries + 2):
+                record["attempts"] = attempt
+                try:
+                    system.clear_memory()
+                    answer, logs = system.query(item["question"])
+                except Exception as e:
+                    record.update(status="error", error=f"{type(e).__name__}: {e}")
+                    if attempt <= self.retries:
+                        time.sleep(self.backoff * 2 ** (attempt - 1))
+                    continue
+
+                spans = system.trace()
+                tool_failures = sum(1 for log in logs if log.get("type") == "tool_result" and not log.get("success"))
+                record.update(
+                    status="partial" if tool_failures else "ok",
+                    answer=answer,
+                    sql=[
+                        log["tool_input"]["query"]
+                        for log in logs
+                        if log.get("type") == "tool_call" and log.get("tool_name") == "execute_sql"
+                    ],
+                    results=self._result_handles(item["id"], logs),
+                    tool_failures=tool_failures,
+                    timings=_timings(spans),
+                    usage=_usage(spans),
+                    trace_id=system.last_trace_id
+                )
+                record.pop("error", None)
+                if not tool_failures:
+                    break
+                # The agents answered around a failed tool (e.g. a dropped connection); try again
+                if attempt <= self.retries:
+                    time.sleep(self.backoff * 2 ** (attempt - 1))
+        finally:
+            self._systems.put(system)
+        return record
+
+    def run(self, questions: Iterable[Dict], output: TextIO, skip: set = frozenset(), quiet: bool = True) -> Dict:
+        """Answer questions concurrently, writing each record to output as it completes."""
+        pending = [item for item in questions if item["id"] not in skip]
+        if self.results_dir:
+            os.makedirs(self.results_dir, exist_ok=True)
+        summary = {"total": len(pending), "ok": 0, "failed": 0, "skipped": len(skip)}
+        start = time.perf_counter()
+        write_lock = threading.Lock()
+
+        def work(item: Dict):
+            record = self.answer(item)
+            with write_lock:
+                output.write(json.dumps(record, default=str) + "\n")
+                output.flush()
+                summary["ok" if record["status"] == "ok" else "failed"] += 1
+                done = summary["ok"] + summary["failed"]
+            status = {"ok": "✅", "partial": "⚠️"}.get(record["status"], "❌")
+            elapsed = (record.get("timings") or {}).get("total_ms")
+            detail = f"{elapsed / 1000:.1f}s" if elapsed is not None else record.get("error", "")
+            print(f"{status} [{done}/{summary['total']}] {item['id']}: {detail}", file=sys.stderr)
+
+        with redirect_stdout(open(os.devnull, "w") if quiet else sys.stderr):
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch") as executor:
+                for future in [executor.submit(work, item) for item in pending]:
+                    future.result()
+            # Image charts render in worker processes; let them finish before exiting
+            while not self._systems.empty():
+                self._systems.get_nowait().viz_agent.wait_for_charts(timeout=60)
+
+        summary["elapsed_s"] = round(time.perf_counter() - start, 1)
+        return summary
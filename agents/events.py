@@ -0,0 +1,59 @@
+# ============================================================================
+# File: agents/events.py
+# ============================================================================
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+_token_listener = contextvars.ContextVar("token_listener", default=None)
+
+
+class ExecutionLog(list):
+    """Execution log that publishes every appended event to its listeners.
+
+    Agents keep appending plain dicts, so anything that accepts the old list
+    keeps working; listeners see each event as soon as it is recorded.
+    """
+
+    def __init__(self, events: Iterable[Dict] = (), listeners: List[Callable] = None):
+        super().__init__(events)
+        self._listeners = list(listeners or [])
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[Dict], None]) -> Callable[[Dict], None]:
+        with self._lock:
+            self._listeners.append(callback)
+        return callback
+
+    def unsubscribe(self, callback: Callable[[Dict], None]):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def append(self, event: Dict):
+        super().append(event)
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                # A broken UI listener must not fail the agent run
+                print(f"⚠️ Event listener failed: {e}")
+
+
+@contextmanager
+def streaming_tokens(callback: Optional[Callable[[str], None]]):
+    """Stream the orchestrator's answer text to callback, delta by delta, while the block runs."""
+    token = _token_listener.set(callback)
+    try:
+        yield
+    finally:
+        _token_listener.reset(token)
+
+
+def current_token_listener() -> Optional[Callable[[str], None]]:
+    """The callback receiving answer tokens in this context, if any."""
+    return _token_listener.get()
@@ -3,17 +3,24 @@
 # ============================================================================
 import pandas as pd
 import numpy as np
-import psycopg2
 from datetime import datetime
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import PolynomialFeatures
 from typing import Dict, List
 from openai import OpenAI
-from .base_agent import BaseAgent
+from utils.database import connect_database
+from utils.metrics import get_registry
+from .base_agent import ENCODING_PARAMETER, BaseAgent
 import warnings
 warnings.filterwarnings('ignore')
 
 
+FORECASTS = get_registry().counter("analytics_forecasts_total", "Forecasts generated by outcome", ["status"])
+FORECAST_SECONDS = get_registry().histogram(
+    "analytics_forecast_duration_seconds", "Time to query history and fit a forecast", ["period_type"]
+)
+
+
 class ForecastAgent(BaseAgent):
     """Agent specialized in time series forecasting and predictions."""
     
@@ -41,7 +48,7 @@ You should ALWAYS use the forecast_data tool to generate data-driven predictions
     
     def get_db_connection(self):
         """Create database connection."""
-        return psycopg2.connect(**self.db_config)
+        return connect_database(self.db_config, source="forecast_agent")
     
     def get_tools(self) -> List[Dict]:
         return [{
@@ -72,7 +79,8 @@ You should ALWAYS use the forecast_data tool to generate data-driven predictions
                         "target_year": {
                             "type": "integer",
                             "description": "Optional: specific year to predict for (e.g., 2025, 2026)"
-                        }
+                        },
+                        "encoding": ENCODING_PARAMETER
                     },
                     "required": ["metric", "periods_ahead", "period_type"]
                 }
@@ -80,6 +88,19 @@ You should ALWAYS use the forecast_data tool to generate data-driven predictions
         }]
     
     def process_tool_call(self, tool_name: str, tool_input: Dict) -> Dict:
+        if tool_name == "forecast_data":
+            with FORECAST_SECONDS.time(period_type=str(tool_input.get('period_type'))):
+                result = self._run_tool(tool_name, tool_input)
+            FORECASTS.inc(status="ok" if result.get("success") else "error")
+            return result
+        return self._run_tool(tool_name, tool_input)
+    
+    def format_tool_result(self, tool_name: str, tool_input: Dict, result: Dict) -> str:
+        if tool_name == "forecast_data":
+            return self.compact_tool_result(tool_input, result)
+        return super().format_tool_result(tool_name, tool_input, result)
+    
+    def _run_tool(self, tool_name: str, tool_input: Dict) -> Dict:
         if tool_name == "forecast_data":
             try:
                 category = tool_input.get('category')
@@ -96,12 +117,12 @@ You should ALWAYS use the forecast_data tool to generate data-driven predictions
                 # Build query based on category and period type
                 if period_type == "month":
                     if category:
-                        query = f"""
+                        query = """
                         SELECT 
                             DATE_TRUNC('month', date) as period,
                             AVG(amount) as value
                         FROM expenses
-                        WHERE category = '{category}'
+                        WHERE category = %(category)s
                         GROUP BY period
                         ORDER BY period;
                         """
@@ -116,12 +137,12 @@ You should ALWAYS use the forecast_data tool to generate data-driven predictions
                         """
                 else:  # year
                     if category:
-                        query = f"""
+                        query = """
                         SELECT 
                             EXTRACT(YEAR FROM date) as year,
                             SUM(amount) as value
                         FROM expenses
-                        WHERE category = '{category}'
+                        WHERE category = %(category)s
                         GROUP BY year
                         ORDER BY year;
                         """
@@ -137,8 +158,10 @@ You should ALWAYS use the forecast_data tool to generate data-driven predictions
                 
                 # Execute query
                 conn = self.get_db_connection()
-                df = pd.read_sql(query, conn)
-                conn.close()
+                try:
+                    df = pd.read_sql(query, conn, params={"category": category} if category else None)
+                finally:
+                    conn.close()
                 
                 if len(df) < 3:
                     return {
@@ -213,7 +236,7 @@ You should ALWAYS use the forecast_data tool to generate data-driven predictions
                 
                 print(f"✅ Forecast generated successfully!")
                 
-                return {
+                result = {
                     "success": True,
                     "forecast": forecast_results,
                     "historical": historical_data,
@@ -230,6 +253,8 @@ You should ALWAYS use the forecast_data tool to generate data-driven predictions
                         "historical_periods": len(df)
                     }
                 }
+                result["artifacts"] = [{"kind": "forecast", "title": tool_input['metric'], "data": dict(result)}]
+                return result
                 
             except Exception as e:
                 return {
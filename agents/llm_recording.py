@@ -0,0 +1,171 @@
+# ============================================================================
+# File: agents/llm_recording.py
+# ============================================================================
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List
+from openai.types.chat import ChatCompletion
+from .tracing import current_span
+
+
+MATCH_MODES = ("structure", "exact")
+
+# Several sessions may record into the same transcript
+_write_lock = threading.Lock()
+
+
+def get_recording_config() -> Dict:
+    """Get LLM transcript recording/replay configuration from environment variables."""
+    return {
+        'record_path': os.getenv('LLM_RECORD_PATH') or None,
+        'replay_path': os.getenv('LLM_REPLAY_PATH') or None,
+        'latency_scale': float(os.getenv('LLM_REPLAY_LATENCY_SCALE', 1.0)),
+        'match': os.getenv('LLM_REPLAY_MATCH', 'structure').lower()
+    }
+
+
+def _plain(message) -> Dict:
+    """A chat message as a plain dict, whether it is a dict or an SDK object."""
+    if hasattr(message, "model_dump"):
+        return message.model_dump(exclude_none=True)
+    return dict(message)
+
+
+def request_key(model: str, messages: List, tools: List[Dict] = None, match: str = "structure") -> str:
+    """Hash identifying a completion request.
+
+    "exact" hashes every message. "structure" ignores system prompts and tool
+    result contents, so transcripts keep matching when the schema context,
+    query results or cache hits differ between runs; the conversation (user
+    messages and the model's own tool calls) still has to be the same.
+    """
+    normalized = []
+    for message in messages:
+        message = _plain(message)
+        if match == "structure" and message.get("role") in ("system", "tool"):
+            message = dict(message, content=None)
+        normalized.append(message)
+    payload = {
+        "model": model,
+        "messages": normalized,
+        "tools": sorted(tool["function"]["name"] for tool in tools or [])
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class _Completions:
+    def __init__(self, create):
+        self.create = create
+
+
+class _Chat:
+    def __init__(self, create):
+        self.completions = _Completions(create)
+
+
+class RecordingClient:
+    """Wraps an OpenAI client and appends every completion, with its latency, to a JSONL transcript."""
+
+    def __init__(self, client, path: str):
+        self.client = client
+        self.path = path
+        self.chat = _Chat(self._create)
+
+    def _create(self, model: str, messages: List, tools: List[Dict] = None, **kwargs):
+        # Transcripts hold whole completions; callers asking to stream get the reply in one piece
+        kwargs.pop("stream", None)
+        kwargs.pop("stream_options", None)
+        start = time.perf_counter()
+        response = self.client.chat.completions.create(model=model, messages=messages, tools=tools, **kwargs)
+        latency = time.perf_counter() - start
+
+        span = current_span()
+        entry = {
+            "recorded_at": datetime.now().isoformat(),
+            "agent": span.attributes.get("agent") if span else None,
+            "latency_s": round(latency, 4),
+            "request": {
+                "model": model,
+                "messages": [_plain(message) for message in messages],
+                "tools": [tool["function"]["name"] for tool in tools or []]
+            },
+            "response": response.model_dump(exclude_none=True)
+        }
+        with _write_lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+        return response
+
+
+class TranscriptMiss(LookupError):
+    """A replayed request has no recorded response."""
+
+
+class ReplayClient:
+    """Serves completions from a recorded transcript, matched by request hash.
+
+    Responses for the same request are served in recorded order and cycle when
+    exhausted, so a transcript can drive repeated load-test iterations. Each
+    reply waits its recorded latency times latency_scale (0 replays instantly).
+    With strict=False an unmatched request gets the next recording made by an
+    agent with the same tools instead of raising TranscriptMiss.
+    """
+
+    def __init__(self, path: str, latency_scale: float = 1.0, match: str = "structure", strict: bool = True):
+        if match not in MATCH_MODES:
+            raise ValueError(f"match must be one of {', '.join(MATCH_MODES)}")
+        self.path = path
+        self.latency_scale = latency_scale
+        self.match = match
+        self.strict = strict
+        self.chat = _Chat(self._create)
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._by_key = {}
+        self._by_tools = {}
+
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                request = entry["request"]
+                tools = [{"function": {"name": name}} for name in request["tools"]]
+                key = request_key(request["model"], request["messages"], tools, match)
+                self._by_key.setdefault(key, deque()).append(entry)
+                self._by_tools.setdefault(tuple(sorted(request["tools"])), deque()).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._by_key.values())
+
+    @staticmethod
+    def _next(entries: deque) -> Dict:
+        entry = entries.popleft()
+        entries.append(entry)
+        return entry
+
+    def _create(self, model: str, messages: List, tools: List[Dict] = None, **kwargs) -> ChatCompletion:
+        key = request_key(model, messages, tools, self.match)
+        with self._lock:
+            entries = self._by_key.get(key)
+            if entries is None:
+                self.misses += 1
+                entries = None if self.strict else self._by_tools.get(
+                    tuple(sorted(tool["function"]["name"] for tool in tools or []))
+                )
+            entry = self._next(entries) if entries else None
+        if entry is None:
+            last = _plain(messages[-1]) if messages else {}
+            raise TranscriptMiss(
+                f"No recorded completion in {self.path} for request {key[:12]} "
+                f"(last message: {str(last.get('content'))[:80]!r}); re-record the transcript"
+            )
+
+        if self.latency_scale > 0:
+            time.sleep(entry["latency_s"] * self.latency_scale)
+        return ChatCompletion.model_validate(entry["response"])
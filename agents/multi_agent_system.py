@@ -2,8 +2,17 @@
 # File: agents/multi_agent_system.py
 # ============================================================================
 import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from openai import OpenAI
-from typing import Dict
+from typing import Callable, Dict, List
+from utils.chart_cache import ChartCache
+from utils.chart_renderer import ChartRenderer
+from utils.metrics import get_registry, start_metrics_server
+from utils.profiling import profiled
+from .events import ExecutionLog, streaming_tokens
+from .llm_recording import RecordingClient, ReplayClient, get_recording_config
+from .tracing import Span, critical_path, get_tracer, get_tracing_config, record_event
 from .sql_agent import SQLAgent
 from .visualization_agent import VisualizationAgent
 from .analyst_agent import AnalystAgent
@@ -11,16 +20,35 @@ from .forecast_agent import ForecastAgent
 from .orchestrator_agent import OrchestratorAgent
 
 
+QUERIES = get_registry().counter("analytics_queries_total", "User queries by outcome", ["status"])
+QUERY_SECONDS = get_registry().histogram("analytics_query_duration_seconds", "End-to-end user query latency")
+QUERIES_IN_FLIGHT = get_registry().gauge("analytics_queries_in_flight", "User queries currently being answered")
+
+
 class MultiAgentSystem:
     """Main system coordinating all agents."""
     
-    def __init__(self, db_config: Dict, api_key: str = None):
-        self.client = OpenAI(api_key=api_key or os.environ.get("OPENAI_API_KEY"))
+    def __init__(self, db_config: Dict, api_key: str = None, chart_output: str = "interactive", client=None,
+                 record_path: str = None, replay_path: str = None, chart_cache: ChartCache = None,
+                 renderer: ChartRenderer = None):
+        recording = get_recording_config()
+        record_path = record_path or recording['record_path']
+        replay_path = replay_path or recording['replay_path']
+        if client is None and replay_path:
+            client = ReplayClient(replay_path, recording['latency_scale'], recording['match'])
+            print(f"📼 Replaying {len(client)} recorded completions from {replay_path}")
+        
+        # Any object with OpenAI's chat.completions.create works, e.g. the benchmark stub
+        self.client = client or OpenAI(api_key=api_key or os.environ.get("OPENAI_API_KEY"))
+        if record_path:
+            self.client = RecordingClient(self.client, record_path)
+            print(f"⏺️ Recording completions to {record_path}")
         
         # Initialize specialized agents
         self.sql_agent = SQLAgent(self.client, db_config)
-        self.viz_agent = VisualizationAgent(self.client)
-        self.analyst_agent = AnalystAgent(self.client)
+        # Sessions of one server can share a chart cache and render pool
+        self.viz_agent = VisualizationAgent(self.client, chart_cache, renderer, default_output=chart_output)
+        self.analyst_agent = AnalystAgent(self.client, db_config)
         self.forecast_agent = ForecastAgent(self.client, db_config)
         
         # Initialize orchestrator
@@ -31,13 +59,82 @@ class MultiAgentSystem:
             self.analyst_agent,
             self.forecast_agent
         )
+        
+        # Listeners receiving every execution-log event of every query
+        self._subscribers = []
+        self._subscribers_lock = threading.Lock()
+        # Agents keep conversation state, so queries run one at a time
+        self._query_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent-query")
+        self.last_trace_id = None
+        
+        # No-op unless METRICS_PORT is set
+        start_metrics_server()
+    
+    @property
+    def agents(self) -> List:
+        return [self.orchestrator, self.sql_agent, self.viz_agent, self.analyst_agent, self.forecast_agent]
+    
+    def clear_memory(self):
+        """Forget the conversation history of every agent."""
+        for agent in self.agents:
+            agent.conversation_history = []
     
-    def query(self, user_message: str) -> tuple:
-        """Process user query through the multi-agent system and return response with logs."""
+    def subscribe(self, callback: Callable[[Dict], None]) -> Callable[[Dict], None]:
+        """Receive each execution-log event as it happens."""
+        with self._subscribers_lock:
+            self._subscribers.append(callback)
+        return callback
+    
+    def unsubscribe(self, callback: Callable[[Dict], None]):
+        """Stop receiving execution-log events."""
+        with self._subscribers_lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+    
+    def query(self, user_message: str, on_event: Callable[[Dict], None] = None, profile: bool = False,
+              on_token: Callable[[str], None] = None) -> tuple:
+        """Process user query through the multi-agent system and return response with logs.
+        
+        With profile=True the query runs under cProfile and tracemalloc and a
+        "profile" event pointing at the saved reports is added to the logs.
+        on_token receives the orchestrator's answer text as it is generated.
+        """
         print(f"\n{'='*60}")
         print(f"👤 User: {user_message}")
         print(f"{'='*60}")
         
-        execution_logs = []
-        response, logs = self.orchestrator.chat(user_message, execution_logs=execution_logs)
-        return response, logs
\ No newline at end of file
+        with self._subscribers_lock:
+            listeners = list(self._subscribers)
+        if on_event:
+            listeners.append(on_event)
+        
+        # The execution log is the live view of the events recorded on this request's spans
+        execution_logs = ExecutionLog(listeners=listeners)
+        QUERIES_IN_FLIGHT.inc()
+        try:
+            with get_tracer().span("query", kind="request", sink=execution_logs, question=user_message) as span:
+                with profiled(span.trace_id, enabled=profile) as profile_report, streaming_tokens(on_token):
+                    response, logs = self.orchestrator.chat(user_message, execution_logs=execution_logs)
+                if profile_report:
+                    record_event("profile", **profile_report)
+        finally:
+            QUERIES_IN_FLIGHT.dec()
+            QUERIES.inc(status=span.status)
+            QUERY_SECONDS.observe(span.duration_ms / 1000)
+        self.last_trace_id = span.trace_id
+        
+        if span.duration_ms / 1000 >= get_tracing_config()['slow_query_seconds']:
+            print(f"🐢 Slow query ({span.duration_ms / 1000:.1f}s), critical path:")
+            for step in critical_path(self.trace(span.trace_id)):
+                name = "  " * step['depth'] + step['name']
+                print(f"   {name:<40} {step['kind']:<10} {step['duration_ms']:>10.1f} ms (self {step['self_ms']:.1f} ms)")
+        return response, logs
+    
+    def trace(self, trace_id: str = None) -> List[Span]:
+        """Spans of a request, by default the most recent one."""
+        return get_tracer().spans(trace_id or self.last_trace_id)
+    
+    def submit_query(self, user_message: str, on_event: Callable[[Dict], None] = None,
+                     profile: bool = False, on_token: Callable[[str], None] = None) -> Future:
+        """Run query() on a background worker; the Future resolves to (response, logs)."""
+        return self._query_executor.submit(self.query, user_message, on_event, profile, on_token)
\ No newline at end of file
@@ -2,16 +2,23 @@
 # File: agents/orchestrator_agent.py
 # ============================================================================
 import json
-from datetime import datetime
 from typing import Dict, List
 from openai import OpenAI
-from .base_agent import BaseAgent
+from utils.metrics import get_registry
+from .base_agent import AGENT_TURN_SECONDS, BaseAgent
+from .events import ExecutionLog, current_token_listener
+from .tracing import current_sink, get_tracer, record_event
 from .sql_agent import SQLAgent
 from .visualization_agent import VisualizationAgent
 from .analyst_agent import AnalystAgent
 from .forecast_agent import ForecastAgent
 
 
+DELEGATIONS = get_registry().counter(
+    "analytics_delegations_total", "Orchestrator delegations by agent and outcome", ["agent", "status"]
+)
+
+
 class OrchestratorAgent(BaseAgent):
     """Orchestrator that coordinates between specialized agents."""
     
@@ -106,20 +113,20 @@ CRITICAL: For historical data, use SQL Agent. For future predictions, use Foreca
                 "type": "function",
                 "function": {
                     "name": "delegate_to_analyst_agent",
-                    "description": "Ask Data Analyst Agent to analyze data and provide insights",
+                    "description": "Ask Data Analyst Agent to analyze data and provide insights. For statistics over database tables, describe the table or query in the task and omit data; the analyst computes them inside PostgreSQL.",
                     "parameters": {
                         "type": "object",
                         "properties": {
                             "task": {
                                 "type": "string",
-                                "description": "The analysis task"
+                                "description": "The analysis task, naming the table or query when analyzing database data"
                             },
                             "data": {
                                 "type": "string",
-                                "description": "JSON string of data to analyze"
+                                "description": "Optional JSON string of a small dataset to analyze"
                             }
                         },
-                        "required": ["task", "data"]
+                        "required": ["task"]
                     }
                 }
             }
@@ -128,33 +135,32 @@ CRITICAL: For historical data, use SQL Agent. For future predictions, use Foreca
     def process_tool_call(self, tool_name: str, tool_input: Dict) -> Dict:
         if tool_name == "delegate_to_sql_agent":
             schema = self.sql_agent.get_database_schema()
-            response, logs = self.sql_agent.chat(tool_input['task'], context=schema, execution_logs=self.execution_logs)
+            response, logs = self.sql_agent.chat(tool_input['task'], context=schema)
             return {"response": response, "agent": "SQL Agent"}
         
         elif tool_name == "delegate_to_forecast_agent":
-            response, logs = self.forecast_agent.chat(tool_input['task'], execution_logs=self.execution_logs)
+            response, logs = self.forecast_agent.chat(tool_input['task'])
             return {"response": response, "agent": "Forecasting Agent"}
         
         elif tool_name == "delegate_to_viz_agent":
-            # Parse the data and create a clearer message
-            try:
-                data = json.loads(tool_input['data'])
-                message = f"""{tool_input['task']}
+            # Pass the data string on as written; re-encoding it only costs time and tokens
+            message = f"""{tool_input['task']}
 
 You must use the create_chart tool with the following data:
 
-Data to visualize: {json.dumps(data, indent=2)}
+Data to visualize: {tool_input['data']}
 
 Remember to include this data in the 'data' parameter of the create_chart tool call."""
-            except:
-                message = f"{tool_input['task']}\n\nData: {tool_input['data']}"
             
-            response, logs = self.viz_agent.chat(message, execution_logs=self.execution_logs)
+            response, logs = self.viz_agent.chat(message)
             return {"response": response, "agent": "Visualization Agent"}
         
         elif tool_name == "delegate_to_analyst_agent":
-            message = f"{tool_input['task']}\n\nData: {tool_input['data']}"
-            response, logs = self.analyst_agent.chat(message, execution_logs=self.execution_logs)
+            message = tool_input['task']
+            if tool_input.get('data'):
+                message += f"\n\nData: {tool_input['data']}"
+            schema = self.sql_agent.get_database_schema()
+            response, logs = self.analyst_agent.chat(message, context=schema)
             return {"response": response, "agent": "Data Analyst Agent"}
         
         return {"error": "Unknown tool"}
@@ -163,88 +169,74 @@ Remember to include this data in the 'data' parameter of the create_chart tool c
         """Send a message and get response with execution logs."""
         # Initialize execution logs
         if execution_logs is None:
-            execution_logs = []
-        
-        self.execution_logs = execution_logs
-        
-        # Log orchestrator start
-        execution_logs.append({
-            "type": "orchestrator_start",
-            "message": message,
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        system_message = self.role
-        
-        # Build messages with conversation history
-        messages = [{"role": "system", "content": system_message}]
-        
-        # Add conversation history for context
-        messages.extend(self.conversation_history)
-        
-        # Add current user message
-        messages.append({"role": "user", "content": message})
-        
-        tools = self.get_tools()
-        
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            tools=tools,
-            tool_choice="auto",
-            temperature=0.7
-        )
+            execution_logs = current_sink()
+        if execution_logs is None:
+            execution_logs = ExecutionLog()
         
-        iteration = 0
-        # Process tool calls if any
-        while response.choices[0].finish_reason == "tool_calls":
-            iteration += 1
-            messages.append(response.choices[0].message)
+        tracer = get_tracer()
+        with tracer.span(self.name, kind="agent", sink=execution_logs, agent=self.name) as turn_span:
+            # Log orchestrator start
+            record_event("orchestrator_start", message=message)
             
-            for tool_call in response.choices[0].message.tool_calls:
-                tool_name = tool_call.function.name
-                tool_input = json.loads(tool_call.function.arguments)
-                
-                # Log delegation
-                agent_name = tool_name.replace("delegate_to_", "").replace("_agent", "").upper()
-                execution_logs.append({
-                    "type": "agent_delegation",
-                    "agent": agent_name,
-                    "task": tool_input.get('task', ''),
-                    "timestamp": datetime.now().isoformat()
-                })
+            system_message = self.role
+            
+            # Build messages with conversation history
+            messages = [{"role": "system", "content": system_message}]
+            
+            # Add conversation history for context
+            messages.extend(self.conversation_history)
+            
+            # Add current user message
+            messages.append({"role": "user", "content": message})
+            
+            tools = self.get_tools()
+            # Set when the caller streams the answer (e.g. the API server's SSE endpoint)
+            on_token = current_token_listener()
+            
+            response = self._complete(messages, tools, on_token)
+            
+            iteration = 0
+            # Process tool calls if any
+            while response.choices[0].finish_reason == "tool_calls":
+                iteration += 1
+                messages.append(response.choices[0].message)
                 
-                result = self.process_tool_call(tool_name, tool_input)
+                for tool_call in response.choices[0].message.tool_calls:
+                    tool_name = tool_call.function.name
+                    tool_input = json.loads(tool_call.function.arguments)
+                    
+                    agent_name = tool_name.replace("delegate_to_", "").replace("_agent", "").upper()
+                    with tracer.span(f"delegate.{agent_name.lower()}", kind="delegation", agent=agent_name) as span:
+                        # Log delegation
+                        record_event("agent_delegation", agent=agent_name, task=tool_input.get('task', ''))
+                        
+                        result = self.process_tool_call(tool_name, tool_input)
+                        if result.get("error"):
+                            span.set_error(str(result["error"]))
+                        DELEGATIONS.inc(agent=agent_name, status=span.status)
+                    
+                    messages.append({
+                        "role": "tool",
+                        "tool_call_id": tool_call.id,
+                        "name": tool_name,
+                        "content": self.safe_json_dumps(result)
+                    })
                 
-                messages.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "name": tool_name,
-                    "content": self.safe_json_dumps(result)
-                })
+                response = self._complete(messages, tools, on_token)
             
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=messages,
-                tools=tools,
-                tool_choice="auto",
-                temperature=0.7
-            )
-        
-        final_response = response.choices[0].message.content
-        
-        # Store conversation in history
-        self.conversation_history.append({"role": "user", "content": message})
-        self.conversation_history.append({"role": "assistant", "content": final_response})
-        
-        # Keep only last 10 exchanges (20 messages) to avoid token limits
-        if len(self.conversation_history) > 20:
-            self.conversation_history = self.conversation_history[-20:]
-        
-        # Log completion
-        execution_logs.append({
-            "type": "orchestrator_complete",
-            "timestamp": datetime.now().isoformat()
-        })
+            final_response = response.choices[0].message.content
+            
+            # Store conversation in history
+            self.conversation_history.append({"role": "user", "content": message})
+            self.conversation_history.append({"role": "assistant", "content": final_response})
+            
+            # Keep only last 10 exchanges (20 messages) to avoid token limits
+            if len(self.conversation_history) > 20:
+                self.conversation_history = self.conversation_history[-20:]
+            
+            AGENT_TURN_SECONDS.observe(turn_span.duration_ms / 1000, agent=self.name)
+            
+            # Log completion
+            record_event("orchestrator_complete", duration_ms=round(turn_span.duration_ms, 1))
         
-        return final_response, execution_logs
\ No newline at end of file
+        return final_response, execution_logs
@@ -1,12 +1,33 @@
 # ============================================================================
 # File: agents/sql_agent.py
 # ============================================================================
-import pandas as pd
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import time
 from typing import Dict, List
 from openai import OpenAI
-from .base_agent import BaseAgent
+from psycopg2.extensions import register_type
+from utils.columnar import ColumnarResult
+from utils.database import NUMERIC_AS_FLOAT, connect_database
+from utils.metadata_cache import get_schema_cache
+from utils.metrics import get_registry
+from utils.serialization import native_columns, records_from_columns
+from .base_agent import ENCODING_PARAMETER, BaseAgent
+
+
+SQL_QUERIES = get_registry().counter(
+    "analytics_sql_queries_total", "SQL statements executed by statement type and outcome", ["statement", "status"]
+)
+SQL_SECONDS = get_registry().histogram(
+    "analytics_sql_query_duration_seconds", "SQL statement execution time, excluding connect", ["statement"]
+)
+SQL_ROWS = get_registry().histogram(
+    "analytics_sql_result_rows", "Rows returned per SQL query",
+    buckets=(1, 10, 100, 1000, 10000, 100000, 1000000)
+)
+
+
+def _statement_type(query: str) -> str:
+    words = query.lstrip(" \t\n(").split(None, 1)
+    return words[0].lower() if words else "unknown"
 
 
 class SQLAgent(BaseAgent):
@@ -30,34 +51,21 @@ IMPORTANT: When asked to retrieve data, you MUST use the execute_sql tool to act
     
     def get_db_connection(self):
         """Create database connection."""
-        return psycopg2.connect(**self.db_config)
+        return connect_database(self.db_config, source="sql_agent")
+    
+    def get_catalog(self) -> Dict[str, List[Dict]]:
+        """Retrieve table and column metadata from the process-wide schema cache."""
+        return get_schema_cache().get_catalog(self.db_config, self.get_db_connection)
     
     def get_database_schema(self) -> str:
         """Retrieve database schema."""
-        query = """
-        SELECT 
-            table_name,
-            column_name,
-            data_type,
-            is_nullable
-        FROM information_schema.columns
-        WHERE table_schema = 'public'
-        ORDER BY table_name, ordinal_position;
-        """
-        
-        conn = self.get_db_connection()
-        try:
-            df = pd.read_sql(query, conn)
-            schema_text = "Database Schema:\n\n"
-            for table in df['table_name'].unique():
-                schema_text += f"Table: {table}\n"
-                table_cols = df[df['table_name'] == table]
-                for _, row in table_cols.iterrows():
-                    schema_text += f"  - {row['column_name']} ({row['data_type']}, {'NULL' if row['is_nullable'] == 'YES' else 'NOT NULL'})\n"
-                schema_text += "\n"
-            return schema_text
-        finally:
-            conn.close()
+        schema_text = "Database Schema:\n\n"
+        for table, columns in self.get_catalog().items():
+            schema_text += f"Table: {table}\n"
+            for column in columns:
+                schema_text += f"  - {column['name']} ({column['type']}, {'NULL' if column['nullable'] else 'NOT NULL'})\n"
+            schema_text += "\n"
+        return schema_text
     
     def get_tools(self) -> List[Dict]:
         return [{
@@ -75,7 +83,8 @@ IMPORTANT: When asked to retrieve data, you MUST use the execute_sql tool to act
                         "explanation": {
                             "type": "string",
                             "description": "Brief explanation of what the query does"
-                        }
+                        },
+                        "encoding": ENCODING_PARAMETER
                     },
                     "required": ["query", "explanation"]
                 }
@@ -87,29 +96,55 @@ IMPORTANT: When asked to retrieve data, you MUST use the execute_sql tool to act
             print(f"📝 Query: {tool_input['query']}")
             print(f"💡 Explanation: {tool_input['explanation']}")
             
+            statement = _statement_type(tool_input['query'])
             conn = self.get_db_connection()
+            start = time.perf_counter()
             try:
-                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                cursor = conn.cursor()
+                register_type(NUMERIC_AS_FLOAT, cursor)
                 cursor.execute(tool_input['query'])
                 
                 if cursor.description:
-                    results = cursor.fetchall()
-                    results_list = [dict(row) for row in results]
+                    rows = cursor.fetchall()
+                    # Work column by column: the artifact keeps database types, the LLM gets JSON-native values
+                    names = [column.name for column in cursor.description]
+                    columns = {name: list(values) for name, values in zip(names, zip(*rows))} if rows else {
+                        name: [] for name in names
+                    }
+                    table = ColumnarResult.from_columns(columns)
+                    SQL_QUERIES.inc(statement=statement, status="ok")
+                    SQL_ROWS.observe(len(rows))
                     return {
                         "success": True,
-                        "data": results_list,
-                        "row_count": len(results_list)
+                        "data": records_from_columns(native_columns(columns)),
+                        "column_types": table.column_types,
+                        "row_count": len(rows),
+                        "artifacts": [{
+                            "kind": "table",
+                            "title": tool_input['explanation'],
+                            "data": table
+                        }]
                     }
                 else:
                     conn.commit()
+                    SQL_QUERIES.inc(statement=statement, status="ok")
+                    # DDL may have changed tables or columns
+                    get_schema_cache().invalidate(self.db_config)
                     return {
                         "success": True,
                         "message": "Query executed successfully",
                         "rows_affected": cursor.rowcount
                     }
             except Exception as e:
+                SQL_QUERIES.inc(statement=statement, status="error")
                 return {"success": False, "error": str(e)}
             finally:
+                SQL_SECONDS.observe(time.perf_counter() - start, statement=statement)
                 conn.close()
         
-        return {"error": "Unknown tool"}
\ No newline at end of file
+        return {"error": "Unknown tool"}
+    
+    def format_tool_result(self, tool_name: str, tool_input: Dict, result: Dict) -> str:
+        if tool_name == "execute_sql":
+            return self.compact_tool_result(tool_input, result)
+        return super().format_tool_result(tool_name, tool_input, result)
\ No newline at end of file
@@ -0,0 +1,305 @@
+# ============================================================================
+# File: agents/tracing.py
+# ============================================================================
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+SERVICE_NAME = "advanced-multiagent-analytics"
+
+# OTLP SpanKind values for the span kinds used here
+OTLP_KINDS = {"request": 2, "llm": 3, "tool": 1, "delegation": 1, "agent": 1}
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_event_sink = contextvars.ContextVar("event_sink", default=None)
+
+
+def get_tracing_config() -> Dict:
+    """Get tracing configuration from environment variables."""
+    return {
+        'buffer_size': int(os.getenv('TRACE_BUFFER_SIZE', 10000)),
+        'buffer_bytes': int(os.getenv('TRACE_BUFFER_BYTES', 64 * 1024 * 1024)),
+        'export_path': os.getenv('TRACE_EXPORT_PATH') or None,
+        'slow_query_seconds': float(os.getenv('TRACE_SLOW_QUERY_SECONDS', 30))
+    }
+
+
+class Span:
+    """One timed operation in a trace."""
+
+    __slots__ = (
+        "trace_id", "span_id", "parent_id", "name", "kind",
+        "start_ns", "end_ns", "attributes", "events", "status", "error"
+    )
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent_id: Optional[str], attributes: Dict):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.events = []
+        self.status = "ok"
+        self.error = None
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def set_error(self, message: str):
+        self.status = "error"
+        self.error = message
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "events": [_exportable_event(event) for event in self.events]
+        }
+
+    def to_otlp(self) -> Dict:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": OTLP_KINDS.get(self.kind, 1),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": _otlp_attributes(dict(self.attributes, **{"span.kind": self.kind})),
+            "events": [
+                {
+                    "timeUnixNano": str(event["time_ns"]),
+                    "name": event["type"],
+                    "attributes": _otlp_attributes(
+                        {k: v for k, v in _exportable_event(event).items() if k not in ("type", "time_ns")}
+                    )
+                }
+                for event in self.events
+            ],
+            "status": {"code": 2, "message": self.error or ""} if self.status == "error" else {"code": 1}
+        }
+
+
+# Longer strings and lists in span events are cut down; the execution log keeps them whole
+_EVENT_TEXT_CHARS = 1000
+_EVENT_LIST_ITEMS = 50
+
+
+def _exportable_event(event: Dict) -> Dict:
+    """Event without UI-only payloads (artifacts hold charts and result tables)."""
+    exported = {k: v for k, v in event.items() if k != "artifacts"}
+    if event.get("artifacts"):
+        exported["artifact_kinds"] = [artifact.get("kind") for artifact in event["artifacts"]]
+    return exported
+
+
+def _summarized_value(value):
+    if isinstance(value, str):
+        if len(value) <= _EVENT_TEXT_CHARS:
+            return value
+        return f"{value[:_EVENT_TEXT_CHARS]}… [{len(value):,} chars]"
+    if isinstance(value, dict):
+        return {key: _summarized_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if len(value) > _EVENT_LIST_ITEMS:
+            return f"[{len(value):,} items]"
+        return [_summarized_value(item) for item in value]
+    return value
+
+
+def _summarized_event(event: Dict) -> Dict:
+    """The form of an event kept on its span: exportable, with large values such as tool inputs cut down."""
+    return {key: _summarized_value(value) for key, value in _exportable_event(event).items()}
+
+
+def _otlp_attributes(attributes: Dict) -> List[Dict]:
+    values = []
+    for key, value in attributes.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        elif isinstance(value, str):
+            typed = {"stringValue": value}
+        else:
+            typed = {"stringValue": json.dumps(value, default=str)}
+        values.append({"key": key, "value": typed})
+    return values
+
+
+class Tracer:
+    """Records spans into a ring buffer and optionally streams them to a JSONL file.
+
+    The buffer drops its oldest spans once it holds more than buffer_size
+    spans or more than buffer_bytes of serialized span data.
+    """
+
+    def __init__(self, buffer_size: int = None, export_path: str = None, buffer_bytes: int = None):
+        config = get_tracing_config()
+        self.export_path = export_path if export_path is not None else config['export_path']
+        self.buffer_size = buffer_size or config['buffer_size']
+        self.buffer_bytes = buffer_bytes or config['buffer_bytes']
+        # (span, serialized size) pairs, oldest first
+        self._spans = deque()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", sink: list = None, **attributes):
+        """Time a block as a child of the current span; events recorded inside go to sink too."""
+        parent = _current_span.get()
+        trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        span = Span(name, kind, trace_id, parent.span_id if parent else None, attributes)
+        span_token = _current_span.set(span)
+        sink_token = _event_sink.set(sink) if sink is not None else None
+        try:
+            yield span
+        except Exception as e:
+            span.set_error(str(e))
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            if sink_token is not None:
+                _event_sink.reset(sink_token)
+            _current_span.reset(span_token)
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._spans.append((span, len(line)))
+            self._bytes += len(line)
+            while len(self._spans) > self.buffer_size or (self._bytes > self.buffer_bytes and len(self._spans) > 1):
+                self._bytes -= self._spans.popleft()[1]
+            if self.export_path:
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+
+    def spans(self, trace_id: str = None) -> List[Span]:
+        """Finished spans in the buffer, optionally for one trace, in start order."""
+        with self._lock:
+            spans = [span for span, _ in self._spans]
+        if trace_id:
+            spans = [span for span in spans if span.trace_id == trace_id]
+        return sorted(spans, key=lambda span: span.start_ns)
+
+    def export_jsonl(self, path: str, trace_id: str = None) -> int:
+        """Write buffered spans as JSON lines; returns the number written."""
+        spans = self.spans(trace_id)
+        with open(path, "w", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+        return len(spans)
+
+    def export_otlp(self, path: str, trace_id: str = None) -> int:
+        """Write buffered spans in the OTLP/JSON trace format; returns the number written."""
+        spans = self.spans(trace_id)
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+            "scopeSpans": [{"scope": {"name": "agents.tracing"}, "spans": [span.to_otlp() for span in spans]}]
+        }]}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        return len(spans)
+
+
+def current_span() -> Optional[Span]:
+    """The span active in this context, if any."""
+    return _current_span.get()
+
+
+def current_sink() -> Optional[list]:
+    """The execution log receiving events in this context, if any."""
+    return _event_sink.get()
+
+
+def record_event(event_type: str, **fields) -> Dict:
+    """Attach an event to the current span and publish it to the active execution log.
+
+    The log gets the full event; the span keeps a summarized copy, since
+    finished spans stay in the process-wide buffer long after the UI is done.
+    """
+    span = _current_span.get()
+    event = {"type": event_type, **fields, "timestamp": datetime.now().isoformat(), "time_ns": time.time_ns()}
+    if span is not None:
+        event["span_id"] = span.span_id
+        span.events.append(_summarized_event(event))
+    sink = _event_sink.get()
+    if sink is not None:
+        sink.append(event)
+    return event
+
+
+def execution_logs_from_spans(spans: List[Span]) -> List[Dict]:
+    """Rebuild the flat execution-log view from span events, in time order."""
+    events = [event for span in spans for event in span.events]
+    return sorted(events, key=lambda event: event["time_ns"])
+
+
+def critical_path(spans: List[Span]) -> List[Dict]:
+    """Spans that determined a trace's end-to-end latency, in execution order.
+
+    Within each span, walks backwards from its end through the children that
+    finished last without overlapping, recursively. Each entry reports its
+    depth, total time and the time not covered by critical children.
+    """
+    if not spans:
+        return []
+    by_id = {span.span_id: span for span in spans}
+    children = {}
+    for span in spans:
+        children.setdefault(span.parent_id if span.parent_id in by_id else None, []).append(span)
+
+    def walk(node: Span, depth: int) -> List[Dict]:
+        chain, cursor = [], node.end_ns
+        for child in sorted(children.get(node.span_id, []), key=lambda span: span.end_ns, reverse=True):
+            if child.end_ns <= cursor:
+                chain.append(child)
+                cursor = child.start_ns
+        path = [{
+            "name": node.name,
+            "kind": node.kind,
+            "depth": depth,
+            "duration_ms": round(node.duration_ms, 1),
+            "self_ms": round(max(node.duration_ms - sum(child.duration_ms for child in chain), 0.0), 1),
+            "status": node.status
+        }]
+        for child in reversed(chain):
+            path.extend(walk(child, depth + 1))
+        return path
+
+    return walk(max(children.get(None, []), key=lambda span: span.duration_ms), 0)
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer."""
+    return _tracer
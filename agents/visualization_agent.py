@@ -1,19 +1,32 @@
 # ============================================================================
 # File: agents/visualization_agent.py
 # ============================================================================
+import json
+import threading
+import contextvars
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from datetime import datetime
+from concurrent.futures import Future, TimeoutError, wait
 from typing import Dict, List
 from openai import OpenAI
+from utils.chart_cache import ChartCache, make_chart_key
+from utils.chart_renderer import ChartRenderer
+from utils.metrics import get_registry
+from utils.downsampling import downsample_frame, POINT_THRESHOLDS
+from utils.plotly_charts import create_plotly_chart, figure_to_spec
 from .base_agent import BaseAgent
+from .tracing import record_event
+
+
+CHARTS = get_registry().counter(
+    "analytics_charts_created_total", "Charts created by type, output and cache use", ["chart_type", "output", "cached"]
+)
 
 
 class VisualizationAgent(BaseAgent):
     """Agent specialized in creating data visualizations."""
     
-    def __init__(self, client: OpenAI):
+    def __init__(self, client: OpenAI, chart_cache: ChartCache = None, renderer: ChartRenderer = None,
+                 default_output: str = "interactive"):
         super().__init__(
             name="Visualization Agent",
             role="""You are a data visualization expert. 
@@ -27,8 +40,33 @@ Your responsibilities:
 IMPORTANT: When given data in the message, you MUST extract it and pass it to the create_chart tool in the 'data' parameter. The data will be provided as a JSON string that you need to include in your tool call.""",
             client=client
         )
-        self.chart_counter = 0
-        sns.set_style("whitegrid")
+        self.chart_cache = chart_cache if chart_cache is not None else ChartCache()
+        self.renderer = renderer if renderer is not None else ChartRenderer()
+        self.default_output = default_output
+        self.pending_charts = {}  # output path -> Future
+        self._pending_lock = threading.Lock()
+    
+    def _on_render_done(self, future: Future, key: str, filename: str, extension: str,
+                        context: contextvars.Context):
+        """Register a finished render in the cache and drop it from the pending set.
+
+        A failure is also recorded as a chart_failed event in the requesting
+        context, for renders that outlived the request's wait.
+        """
+        with self._pending_lock:
+            self.pending_charts.pop(filename, None)
+        if future.exception() is None:
+            self.chart_cache.put(key, extension)
+        else:
+            print(f"❌ Chart rendering failed for {filename}: {future.exception()}")
+            context.run(record_event, "chart_failed", filename=filename, error=str(future.exception()))
+    
+    def wait_for_charts(self, timeout: float = None) -> bool:
+        """Block until all pending renders finish; returns False on timeout."""
+        with self._pending_lock:
+            futures = list(self.pending_charts.values())
+        _, not_done = wait(futures, timeout=timeout)
+        return not not_done
     
     def get_tools(self) -> List[Dict]:
         return [{
@@ -70,6 +108,11 @@ IMPORTANT: When given data in the message, you MUST extract it and pass it to th
                         "y_label": {
                             "type": "string",
                             "description": "Y-axis label"
+                        },
+                        "output": {
+                            "type": "string",
+                            "enum": ["interactive", "image"],
+                            "description": "'interactive' shows a Plotly chart in the user's browser; 'image' saves a static image file. Use 'image' only when a file is explicitly requested."
                         }
                     },
                     "required": ["data", "chart_type", "title"]
@@ -80,57 +123,124 @@ IMPORTANT: When given data in the message, you MUST extract it and pass it to th
     def process_tool_call(self, tool_name: str, tool_input: Dict) -> Dict:
         if tool_name == "create_chart":
             try:
-                df = pd.DataFrame(tool_input['data'])
                 chart_type = tool_input['chart_type']
-                
-                plt.figure(figsize=(12, 7))
-                
-                if chart_type == "bar":
-                    plt.bar(df[tool_input['x_column']], df[tool_input['y_column']])
-                    plt.xlabel(tool_input.get('x_label', tool_input['x_column']))
-                    plt.ylabel(tool_input.get('y_label', tool_input['y_column']))
-                    plt.xticks(rotation=45, ha='right')
-                
-                elif chart_type == "line":
-                    plt.plot(df[tool_input['x_column']], df[tool_input['y_column']], marker='o', linewidth=2)
-                    plt.xlabel(tool_input.get('x_label', tool_input['x_column']))
-                    plt.ylabel(tool_input.get('y_label', tool_input['y_column']))
-                    plt.grid(True, alpha=0.3)
-                
-                elif chart_type == "scatter":
-                    plt.scatter(df[tool_input['x_column']], df[tool_input['y_column']], alpha=0.6, s=100)
-                    plt.xlabel(tool_input.get('x_label', tool_input['x_column']))
-                    plt.ylabel(tool_input.get('y_label', tool_input['y_column']))
-                
-                elif chart_type == "pie":
-                    plt.pie(df[tool_input['y_column']], labels=df[tool_input['x_column']], 
-                           autopct='%1.1f%%', startangle=90)
-                    plt.axis('equal')
-                
-                elif chart_type == "histogram":
-                    plt.hist(df[tool_input['x_column']], bins=30, edgecolor='black', alpha=0.7)
-                    plt.xlabel(tool_input.get('x_label', tool_input['x_column']))
-                    plt.ylabel('Frequency')
-                
-                elif chart_type == "box":
-                    df.boxplot(column=tool_input['y_column'], by=tool_input['x_column'])
-                    plt.xlabel(tool_input.get('x_label', tool_input['x_column']))
-                    plt.ylabel(tool_input.get('y_label', tool_input['y_column']))
-                
-                plt.title(tool_input['title'], fontsize=14, fontweight='bold')
-                plt.tight_layout()
-                
-                self.chart_counter += 1
-                filename = f"chart_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self.chart_counter}.png"
-                plt.savefig(filename, dpi=300, bbox_inches='tight')
-                plt.close()
-                
-                return {
-                    "success": True,
-                    "filename": filename,
-                    "message": f"Chart saved as {filename}"
+                options = {
+                    "chart_type": chart_type,
+                    "x_column": tool_input.get('x_column'),
+                    "y_column": tool_input.get('y_column'),
+                    "x_label": tool_input.get('x_label'),
+                    "y_label": tool_input.get('y_label'),
+                    "title": tool_input['title'],
+                    "max_points": POINT_THRESHOLDS.get(chart_type)
                 }
+                
+                if tool_input.get('output', self.default_output) == "interactive":
+                    result = self._create_interactive_chart(tool_input['data'], options)
+                else:
+                    result = self._create_image_chart(tool_input['data'], options)
+                if result.get("success"):
+                    CHARTS.inc(chart_type=chart_type, output=result["output"], cached=str(result["cached"]).lower())
+                return result
             except Exception as e:
                 return {"success": False, "error": str(e)}
         
-        return {"error": "Unknown tool"}
\ No newline at end of file
+        return {"error": "Unknown tool"}
+    
+    def _create_interactive_chart(self, data: List[Dict], options: Dict) -> Dict:
+        """Build a Plotly spec for in-browser rendering, reusing cached specs."""
+        key = make_chart_key(data, {**options, "format": "plotly"})
+        
+        cached_path = self.chart_cache.get(key, "json")
+        if cached_path:
+            print(f"♻️ Reusing cached chart spec: {cached_path}")
+            with open(cached_path) as f:
+                spec = json.load(f)
+        else:
+            fig = create_plotly_chart(
+                data,
+                options['chart_type'],
+                options['x_column'],
+                options['y_column'],
+                options['title'],
+                x_label=options['x_label'],
+                y_label=options['y_label']
+            )
+            spec = figure_to_spec(fig)
+            with open(self.chart_cache.path_for(key, "json"), "w") as f:
+                json.dump(spec, f, separators=(',', ':'))
+            self.chart_cache.put(key, "json")
+        
+        downsampling = spec.get("layout", {}).get("meta") or {}
+        return {
+            "success": True,
+            "chart_id": key[:12],
+            "output": "interactive",
+            "cached": cached_path is not None,
+            **downsampling,
+            "message": "Interactive chart created and shown to the user",
+            "artifacts": [{"kind": "plotly", "title": options['title'], "spec": spec}]
+        }
+    
+    def _create_image_chart(self, data: List[Dict], options: Dict) -> Dict:
+        """Render a static image on the worker pool, reusing cached artifacts."""
+        extension = self.renderer.output_format
+        key = make_chart_key(data, {**options, "dpi": self.renderer.dpi, "format": extension})
+        
+        cached_path = self.chart_cache.get(key, extension)
+        if cached_path:
+            print(f"♻️ Reusing cached chart: {cached_path}")
+            return {
+                "success": True,
+                "filename": cached_path,
+                "output": "image",
+                "cached": True,
+                "status": "ready",
+                "original_points": len(data),
+                "message": f"Chart saved as {cached_path}",
+                "artifacts": [{"kind": "image", "title": options['title'], "path": cached_path}]
+            }
+        
+        df = pd.DataFrame(data)
+        df, downsampling = downsample_frame(df, options['x_column'], options['y_column'], options['chart_type'])
+        if downsampling["downsampled"]:
+            print(f"📉 Downsampled {downsampling['original_points']} → {downsampling['plotted_points']} points ({downsampling['method']})")
+        
+        filename = self.chart_cache.path_for(key, extension)
+        with self._pending_lock:
+            future = self.pending_charts.get(filename)
+            submitted = future is None
+            if submitted:
+                future = self.renderer.submit({**options, "data": df}, filename)
+                self.pending_charts[filename] = future
+        if submitted:
+            context = contextvars.copy_context()
+            future.add_done_callback(lambda f: self._on_render_done(f, key, filename, extension, context))
+        
+        # Only report the chart once the file exists; a failed render is an error, not a path
+        try:
+            future.result(timeout=self.renderer.timeout)
+        except TimeoutError:
+            return {
+                "success": True,
+                "filename": filename,
+                "output": "image",
+                "cached": False,
+                "status": "pending",
+                **downsampling,
+                "message": f"Chart is still rendering and will be saved as {filename} if it succeeds; "
+                           f"do not tell the user it is ready",
+                "artifacts": [{"kind": "image", "title": options['title'], "path": filename, "status": "pending"}]
+            }
+        except Exception as e:
+            return {"success": False, "error": f"Chart rendering failed: {e}"}
+        
+        return {
+            "success": True,
+            "filename": filename,
+            "output": "image",
+            "cached": False,
+            "status": "ready",
+            **downsampling,
+            "message": f"Chart saved as {filename}",
+            "artifacts": [{"kind": "image", "title": options['title'], "path": filename}]
+        }
\ No newline at end of file
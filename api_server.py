@@ -0,0 +1,419 @@
+# ============================================================================
+# File: api_server.py
+# ============================================================================
+"""
+Headless HTTP API for the multi-agent analytics system.
+
+Each session is one conversation with its own MultiAgentSystem; all sessions
+share the LLM client, the database connection pool and the chart cache. The
+agents are synchronous, so queries run on a bounded worker pool while the
+event loop keeps serving open requests and SSE streams.
+
+Run with: python api_server.py --port 8000
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import uuid
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Callable, Dict
+import uvicorn
+from dotenv import load_dotenv
+from openai import OpenAI
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from agents import MultiAgentSystem, ReplayClient
+from agents.llm_recording import get_recording_config
+from utils import ChartCache, ColumnarResult, close_connection_pools, get_database_config, get_registry
+from utils.chart_renderer import ChartRenderer
+
+# Load environment variables
+load_dotenv()
+
+
+API_SESSIONS = get_registry().gauge("analytics_api_sessions", "Open API conversation sessions")
+API_QUERIES = get_registry().counter(
+    "analytics_api_queries_total", "API queries by endpoint and outcome", ["endpoint", "status"]
+)
+
+# Comment lines sent on idle SSE streams so proxies do not drop them
+KEEPALIVE_SECONDS = 15
+
+
+def get_api_config() -> Dict:
+    """Get API server configuration from environment variables."""
+    return {
+        'host': os.getenv('API_HOST', '127.0.0.1'),
+        'port': int(os.getenv('API_PORT', 8000)),
+        'workers': int(os.getenv('API_WORKERS', 16)),
+        'request_timeout': float(os.getenv('API_REQUEST_TIMEOUT', 120)),
+        'session_ttl': float(os.getenv('API_SESSION_TTL_SECONDS', 1800)),
+        'max_sessions': int(os.getenv('API_MAX_SESSIONS', 1000)),
+        'max_result_rows': int(os.getenv('API_MAX_RESULT_ROWS', 1000)),
+        'token': os.getenv('API_TOKEN') or None
+    }
+
+
+class _JSONResponse(JSONResponse):
+    """JSON response that also accepts Decimals, dates and other values str() handles."""
+
+    def render(self, content) -> bytes:
+        return json.dumps(content, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def public_event(event: Dict, max_rows: int) -> Dict:
+    """An execution-log event as JSON-safe data, with table artifacts cut to max_rows records."""
+    if not event.get("artifacts"):
+        return event
+    artifacts = []
+    for artifact in event["artifacts"]:
+        if artifact.get("kind") == "table":
+            data = ColumnarResult.coerce(artifact["data"])
+            artifact = {
+                "kind": "table",
+                "title": artifact.get("title"),
+                "columns": data.columns,
+                "row_count": len(data),
+                "rows": data.table.slice(0, max_rows).to_pylist(),
+                "truncated": len(data) > max_rows
+            }
+        artifacts.append(artifact)
+    return dict(event, artifacts=artifacts)
+
+
+class Session:
+    """One conversation: an agent system and the lock that keeps its queries in order."""
+
+    def __init__(self, system: MultiAgentSystem):
+        self.id = uuid.uuid4().hex
+        self.system = system
+        self.lock = asyncio.Lock()
+        self.created_at = datetime.now()
+        self.last_used = time.monotonic()
+        self.queries = 0
+
+    def describe(self) -> Dict:
+        return {
+            "session_id": self.id,
+            "created_at": self.created_at.isoformat(),
+            "idle_seconds": round(time.monotonic() - self.last_used, 1),
+            "queries": self.queries,
+            "busy": self.lock.locked()
+        }
+
+
+class SessionStore:
+    """Open sessions by id, expired after ttl idle seconds and capped at max_sessions.
+
+    Only touched from the event loop, so it needs no locking.
+    """
+
+    def __init__(self, make_system: Callable[[], MultiAgentSystem], ttl: float, max_sessions: int):
+        self.make_system = make_system
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = {}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Session:
+        session = self._sessions.get(session_id)
+        if session is None:
+            raise HTTPException(404, f"Unknown or expired session {session_id}")
+        session.last_used = time.monotonic()
+        return session
+
+    def create(self) -> Session:
+        self.expire()
+        if len(self._sessions) >= self.max_sessions:
+            # Make room by closing the least recently used idle conversation
+            idle = [session for session in self._sessions.values() if not session.lock.locked()]
+            if not idle:
+                raise HTTPException(503, "Too many open sessions; try again later")
+            self.remove(min(idle, key=lambda session: session.last_used).id)
+        session = Session(self.make_system())
+        self._sessions[session.id] = session
+        return session
+
+    def remove(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def expire(self) -> int:
+        """Drop idle sessions past their ttl; returns how many were dropped."""
+        cutoff = time.monotonic() - self.ttl
+        expired = [
+            session_id for session_id, session in self._sessions.items()
+            if session.last_used < cutoff and not session.lock.locked()
+        ]
+        for session_id in expired:
+            self.remove(session_id)
+        return len(expired)
+
+    def clear(self):
+        self._sessions.clear()
+
+
+def _authorize(request: Request):
+    token = request.app.state.config['token']
+    supplied = request.headers.get("authorization", "")
+    if token and not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+        raise HTTPException(401, "Missing or invalid bearer token")
+
+
+async def _read_question(request: Request):
+    """(question, timeout) from a JSON body {"question": ..., "timeout": seconds}."""
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(400, "Request body must be JSON")
+    question = body.get("question") if isinstance(body, dict) else None
+    if not isinstance(question, str) or not question.strip():
+        raise HTTPException(400, 'Body must include a non-empty "question"')
+    limit = request.app.state.config['request_timeout']
+    try:
+        timeout = min(float(body.get("timeout") or limit), limit)
+    except (TypeError, ValueError):
+        raise HTTPException(400, '"timeout" must be a number of seconds')
+    return question.strip(), timeout
+
+
+async def run_query(app: Starlette, session: Session, question: str, timeout: float,
+                    on_event: Callable = None, on_token: Callable = None):
+    """Answer question in the session's conversation on the worker pool within timeout seconds.
+
+    Returns (answer, logs, trace_id). A query that times out cannot be
+    interrupted mid-call: it finishes in the background and holds the session
+    until then, so the conversation history stays consistent.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    await asyncio.wait_for(session.lock.acquire(), timeout)
+    session.queries += 1
+
+    def work():
+        answer, logs = session.system.query(question, on_event=on_event, on_token=on_token)
+        return answer, logs, session.system.last_trace_id
+
+    future = loop.run_in_executor(app.state.executor, work)
+    future.add_done_callback(lambda _: session.lock.release())
+    # shield() keeps a timeout from cancelling the future and releasing the session early
+    return await asyncio.wait_for(asyncio.shield(future), max(deadline - loop.time(), 0))
+
+
+async def health(request: Request) -> Response:
+    return _JSONResponse({"status": "ok", "sessions": len(request.app.state.sessions)})
+
+
+async def metrics(request: Request) -> Response:
+    return Response(get_registry().render(), media_type="text/plain; version=0.0.4")
+
+
+async def create_session(request: Request) -> Response:
+    _authorize(request)
+    session = request.app.state.sessions.create()
+    return _JSONResponse(session.describe(), status_code=201)
+
+
+async def get_session(request: Request) -> Response:
+    _authorize(request)
+    return _JSONResponse(request.app.state.sessions.get(request.path_params["session_id"]).describe())
+
+
+async def delete_session(request: Request) -> Response:
+    _authorize(request)
+    if not request.app.state.sessions.remove(request.path_params["session_id"]):
+        raise HTTPException(404, f"Unknown or expired session {request.path_params['session_id']}")
+    return Response(status_code=204)
+
+
+async def query(request: Request) -> Response:
+    """Answer a question and return the answer with the full execution log."""
+    _authorize(request)
+    session = request.app.state.sessions.get(request.path_params["session_id"])
+    question, timeout = await _read_question(request)
+    try:
+        answer, logs, trace_id = await run_query(request.app, session, question, timeout)
+    except asyncio.TimeoutError:
+        API_QUERIES.inc(endpoint="query", status="timeout")
+        raise HTTPException(504, f"Query did not finish within {timeout:g}s")
+    except Exception as e:
+        API_QUERIES.inc(endpoint="query", status="error")
+        raise HTTPException(500, f"{type(e).__name__}: {e}")
+    API_QUERIES.inc(endpoint="query", status="ok")
+
+    max_rows = request.app.state.config['max_result_rows']
+    return _JSONResponse({
+        "session_id": session.id,
+        "trace_id": trace_id,
+        "answer": answer,
+        "events": [public_event(event, max_rows) for event in logs]
+    })
+
+
+def _sse(kind: str, data: Dict) -> str:
+    return f"event: {kind}\ndata: {json.dumps(data, default=str, separators=(',', ':'))}\n\n"
+
+
+async def _event_stream(task: asyncio.Task, events: asyncio.Queue, session_id: str, timeout: float):
+    try:
+        while True:
+            getter = asyncio.ensure_future(events.get())
+            done, _ = await asyncio.wait({getter, task}, timeout=KEEPALIVE_SECONDS,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                yield _sse(*getter.result())
+                continue
+            getter.cancel()
+            if task in done:
+                break
+            yield ": keep-alive\n\n"
+
+        # Events are queued before the query's result, so none are left behind here
+        while not events.empty():
+            yield _sse(*events.get_nowait())
+        try:
+            answer, _, trace_id = task.result()
+        except asyncio.TimeoutError:
+            API_QUERIES.inc(endpoint="stream", status="timeout")
+            yield _sse("error", {"status": 504, "error": f"Query did not finish within {timeout:g}s"})
+        except Exception as e:
+            API_QUERIES.inc(endpoint="stream", status="error")
+            yield _sse("error", {"status": 500, "error": f"{type(e).__name__}: {e}"})
+        else:
+            API_QUERIES.inc(endpoint="stream", status="ok")
+            yield _sse("answer", {"session_id": session_id, "trace_id": trace_id, "answer": answer})
+    finally:
+        if not task.done():
+            # The client went away; let the query finish quietly in the background
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+
+async def stream_query(request: Request) -> Response:
+    """Answer a question as server-sent events.
+
+    Streams "event" (each execution-log event as it is recorded), "token"
+    (orchestrator text deltas) and finally "answer" or "error". Text the
+    orchestrator writes before delegating is streamed too, so the "answer"
+    event is the authoritative reply.
+    """
+    _authorize(request)
+    session = request.app.state.sessions.get(request.path_params["session_id"])
+    question, timeout = await _read_question(request)
+
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    max_rows = request.app.state.config['max_result_rows']
+
+    # Called from the worker thread; convert there and hand over to the loop
+    def on_event(event: Dict):
+        loop.call_soon_threadsafe(events.put_nowait, ("event", public_event(event, max_rows)))
+
+    def on_token(text: str):
+        loop.call_soon_threadsafe(events.put_nowait, ("token", {"text": text}))
+
+    task = asyncio.ensure_future(run_query(request.app, session, question, timeout, on_event, on_token))
+    return StreamingResponse(
+        _event_stream(task, events, session.id, timeout),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _http_error(request: Request, exc: HTTPException) -> Response:
+    return _JSONResponse({"error": exc.detail}, status_code=exc.status_code)
+
+
+async def _expire_sessions(sessions: SessionStore):
+    while True:
+        await asyncio.sleep(60)
+        expired = sessions.expire()
+        if expired:
+            print(f"🧹 Expired {expired} idle session(s)")
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    sweeper = asyncio.create_task(_expire_sessions(app.state.sessions))
+    try:
+        yield
+    finally:
+        sweeper.cancel()
+        app.state.sessions.clear()
+        app.state.executor.shutdown(wait=False)
+        app.state.renderer.shutdown(wait=False)
+        close_connection_pools()
+
+
+def create_app(db_config: Dict = None, client=None) -> Starlette:
+    """Build the ASGI app; db_config and client default to the ones configured in the environment."""
+    config = get_api_config()
+    # Sessions borrow connections from one shared pool, sized for the worker threads by default
+    os.environ.setdefault('DB_POOL_SIZE', str(config['workers']))
+    db_config = db_config or get_database_config()
+    if client is None:
+        recording = get_recording_config()
+        if recording['replay_path']:
+            client = ReplayClient(recording['replay_path'], recording['latency_scale'], recording['match'])
+        else:
+            client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+
+    chart_cache, renderer = ChartCache(), ChartRenderer()
+    sessions = SessionStore(
+        lambda: MultiAgentSystem(db_config, client=client, chart_cache=chart_cache, renderer=renderer),
+        ttl=config['session_ttl'],
+        max_sessions=config['max_sessions']
+    )
+    API_SESSIONS.set_function(lambda: len(sessions))
+
+    app = Starlette(
+        routes=[
+            Route("/health", health, methods=["GET"]),
+            Route("/metrics", metrics, methods=["GET"]),
+            Route("/sessions", create_session, methods=["POST"]),
+            Route("/sessions/{session_id}", get_session, methods=["GET"]),
+            Route("/sessions/{session_id}", delete_session, methods=["DELETE"]),
+            Route("/sessions/{session_id}/query", query, methods=["POST"]),
+            Route("/sessions/{session_id}/stream", stream_query, methods=["POST"])
+        ],
+        exception_handlers={HTTPException: _http_error},
+        lifespan=lifespan
+    )
+    app.state.config = config
+    app.state.sessions = sessions
+    app.state.renderer = renderer
+    app.state.executor = ThreadPoolExecutor(max_workers=config['workers'], thread_name_prefix="api-query")
+    return app
+
+
+def main(argv=None):
+    config = get_api_config()
+    parser = argparse.ArgumentParser(description="Headless HTTP API for the multi-agent analytics system")
+    parser.add_argument("--host", default=config['host'], help=f"bind address (default {config['host']})")
+    parser.add_argument("--port", type=int, default=config['port'], help=f"port (default {config['port']})")
+    parser.add_argument("--log-level", default="info", help="uvicorn log level")
+    args = parser.parse_args(argv)
+
+    try:
+        db_config = get_database_config()
+        if not os.getenv('OPENAI_API_KEY') and not get_recording_config()['replay_path']:
+            raise ValueError("OPENAI_API_KEY environment variable must be set")
+    except ValueError as e:
+        print(f"❌ Configuration Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    uvicorn.run(create_app(db_config), host=args.host, port=args.port, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
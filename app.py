@@ -48,6 +48,8 @@ if 'multi_agent_system' not in st.session_state:
     st.session_state.multi_agent_system = None
 if 'show_agent_reasoning' not in st.session_state:
     st.session_state.show_agent_reasoning = True
+if 'profile_queries' not in st.session_state:
+    st.session_state.profile_queries = False
 
 # Initialize agent system
 @st.cache_resource
@@ -88,6 +90,11 @@ with st.sidebar:
         value=st.session_state.show_agent_reasoning,
         help="Display detailed execution logs showing tool calls and decision-making process"
     )
+    st.session_state.profile_queries = st.toggle(
+        "Profile Queries",
+        value=st.session_state.profile_queries,
+        help="Run each question under cProfile and tracemalloc; reports are linked from its execution logs"
+    )
     
     st.divider()
     
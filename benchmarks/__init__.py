@@ -0,0 +1,7 @@
+# ============================================================================
+# File: benchmarks/__init__.py
+# ============================================================================
+from .stub_client import FLOWS, StubOpenAI
+from .fixtures import benchmark_database, seed_expenses
+
+__all__ = ['FLOWS', 'StubOpenAI', 'benchmark_database', 'seed_expenses']
@@ -0,0 +1,129 @@
+# ============================================================================
+# File: benchmarks/fixtures.py
+# ============================================================================
+import io
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict
+import numpy as np
+from psycopg2.extensions import parse_dsn
+from utils.database import connect_database
+
+
+# Category -> (mean amount, relative frequency)
+CATEGORIES = {
+    "Groceries": (85.0, 30),
+    "Dining": (45.0, 18),
+    "Transport": (30.0, 14),
+    "Utilities": (160.0, 3),
+    "Mortgage": (1850.0, 1),
+    "Credit": (320.0, 6),
+    "Entertainment": (60.0, 8),
+    "Healthcare": (140.0, 3),
+    "Shopping": (110.0, 12),
+    "Travel": (640.0, 2)
+}
+PAYMENT_METHODS = ("Credit Card", "Debit Card", "Bank Transfer", "Cash")
+
+EXPENSES_DDL = """
+DROP TABLE IF EXISTS expenses;
+CREATE TABLE expenses (
+    id SERIAL PRIMARY KEY,
+    date DATE NOT NULL,
+    category TEXT NOT NULL,
+    description TEXT,
+    amount NUMERIC(12, 2) NOT NULL,
+    payment_method TEXT
+);
+"""
+
+
+def config_from_url(url: str) -> Dict:
+    """Turn a postgresql:// URL into the db_config dict the agents use."""
+    params = parse_dsn(url)
+    return {
+        'host': params.get('host', 'localhost'),
+        'port': params.get('port', '5432'),
+        'database': params.get('dbname'),
+        'user': params.get('user'),
+        'password': params.get('password', '')
+    }
+
+
+@contextmanager
+def benchmark_database(url: str = None):
+    """Yield a db_config for a scratch database that the benchmark may overwrite.
+
+    Uses url or BENCHMARK_DATABASE_URL when given; otherwise starts a throwaway
+    PostgreSQL with the optional pgserver package. The application's DB_* settings
+    are never used, since seeding drops the expenses table.
+    """
+    url = url or os.getenv('BENCHMARK_DATABASE_URL')
+    if url:
+        yield config_from_url(url)
+        return
+
+    try:
+        import pgserver
+    except ImportError:
+        raise RuntimeError(
+            "Set BENCHMARK_DATABASE_URL to a scratch database, or pip install pgserver for a throwaway local one"
+        )
+
+    directory = tempfile.mkdtemp(prefix="analytics-benchmark-")
+    server = pgserver.get_server(directory, cleanup_mode="stop")
+    try:
+        yield config_from_url(server.get_uri())
+    finally:
+        server.cleanup()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def generate_expenses(rows: int, years: int = 3, seed: int = 42) -> io.StringIO:
+    """Tab-separated expenses with category mixes, seasonality and a mild upward trend."""
+    rng = np.random.default_rng(seed)
+    names = list(CATEGORIES)
+    means = np.array([CATEGORIES[name][0] for name in names])
+    weights = np.array([CATEGORIES[name][1] for name in names], dtype=float)
+
+    end = date.today().replace(day=1)
+    start = end.replace(year=end.year - years)
+    days = (end - start).days
+    offsets = np.sort(rng.integers(0, days, rows))
+    dates = np.datetime64(start) + offsets.astype("timedelta64[D]")
+
+    categories = rng.choice(len(names), rows, p=weights / weights.sum())
+    months = dates.astype("datetime64[M]").astype(int) % 12
+    season = 1 + 0.15 * np.sin(2 * np.pi * (months - 2) / 12)
+    trend = 1 + 0.05 * offsets / 365
+    amounts = np.round(rng.gamma(4.0, means[categories] / 4.0) * season * trend, 2)
+    methods = rng.integers(0, len(PAYMENT_METHODS), rows)
+
+    buffer = io.StringIO()
+    for day, category, amount, method in zip(dates.astype(str), categories, amounts, methods):
+        buffer.write(f"{day}\t{names[category]}\t{names[category]} purchase\t{amount:.2f}\t{PAYMENT_METHODS[method]}\n")
+    buffer.seek(0)
+    return buffer
+
+
+def seed_expenses(db_config: Dict, rows: int = 10000, years: int = 3, seed: int = 42) -> int:
+    """(Re)create the expenses table with generated rows; returns the row count."""
+    conn = connect_database(db_config, source="benchmark")
+    try:
+        with conn, conn.cursor() as cursor:
+            cursor.execute(EXPENSES_DDL)
+            cursor.copy_expert(
+                "COPY expenses (date, category, description, amount, payment_method) FROM STDIN",
+                generate_expenses(rows, years, seed)
+            )
+            cursor.execute("CREATE INDEX ON expenses (date)")
+            cursor.execute("CREATE INDEX ON expenses (category)")
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute("VACUUM ANALYZE expenses")
+    finally:
+        conn.close()
+    return rows
@@ -0,0 +1,236 @@
+# ============================================================================
+# File: benchmarks/load_test.py
+# ============================================================================
+"""
+Concurrent multi-user load test of MultiAgentSystem.
+
+Simulates analysts, each with their own agent session, who ask a weighted mix
+of questions with think time in between. Users are added gradually over the
+ramp-up period. Several concurrency levels can be run in one go to find where
+latency degrades; the report is JSON so runs can be compared across releases.
+
+Run with: python -m benchmarks.load_test --users 1,5,10,20 --duration 60 --latency 0.5
+"""
+
+import os
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from typing import Dict, List, Tuple
+from agents import MultiAgentSystem, ReplayClient
+from utils.database import DB_CONNECT_SECONDS, DB_POOL_WAIT_SECONDS
+from .fixtures import benchmark_database, seed_expenses
+from .run_benchmark import peak_rss_mb, run_once, summarize
+from .stub_client import FLOWS, StubOpenAI
+
+
+DEFAULT_MIX = "sql=5,chart=2,forecast=2,analysis=1"
+
+
+def parse_mix(text: str) -> List[Tuple[str, str, float]]:
+    """'sql=5,chart=2' -> [(flow, question, weight), ...]."""
+    mix = []
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in FLOWS:
+            raise ValueError(f"Unknown flow '{name}' (expected one of {', '.join(FLOWS)})")
+        mix.append((name, FLOWS[name]["question"], float(weight or 1)))
+    return mix
+
+
+def load_questions(path: str) -> List[Tuple[str, str, float]]:
+    """Questions from a JSON list of {"question", "weight", "label"} objects."""
+    with open(path) as f:
+        entries = json.load(f)
+    return [
+        (entry.get("label") or entry["question"][:40], entry["question"], float(entry.get("weight", 1)))
+        for entry in entries
+    ]
+
+
+def histogram_quantile(q: float, buckets: Dict[float, int]) -> float:
+    """Estimate a quantile from cumulative bucket counts, interpolating within the bucket."""
+    bounds = sorted(buckets)
+    if not bounds or not buckets[bounds[-1]]:
+        return 0.0
+    rank = q * buckets[bounds[-1]]
+    lower_bound, lower_count = 0.0, 0
+    for bound in bounds:
+        if buckets[bound] >= rank:
+            if bound == float('inf'):
+                return lower_bound
+            width = buckets[bound] - lower_count
+            return lower_bound + (bound - lower_bound) * ((rank - lower_count) / width if width else 0)
+        lower_bound, lower_count = bound, buckets[bound]
+    return lower_bound
+
+
+def connect_wait_summary(before: Dict, after: Dict) -> Dict:
+    """Database connection acquisition between two snapshots of the connect histogram."""
+    count = after["count"] - before["count"]
+    buckets = {bound: cumulative - before["buckets"].get(bound, 0) for bound, cumulative in after["buckets"].items()}
+    return {
+        "connections": count,
+        "mean_ms": round((after["sum"] - before["sum"]) / count * 1000, 2) if count else 0.0,
+        "p95_ms": round(histogram_quantile(0.95, buckets) * 1000, 2),
+        "p99_ms": round(histogram_quantile(0.99, buckets) * 1000, 2)
+    }
+
+
+def simulate_user(user: int, system, mix: List[Tuple[str, str, float]], start_at: float, stop_at: float,
+                  think_time: float, seed: int, results: List[Dict], lock: threading.Lock):
+    """One analyst: wait for their ramp-up slot, then ask questions until the step ends."""
+    rng = random.Random(seed * 1000 + user)
+    time.sleep(max(start_at - time.perf_counter(), 0))
+    labels, questions, weights = zip(*mix)
+
+    while time.perf_counter() < stop_at:
+        index = rng.choices(range(len(mix)), weights=weights)[0]
+        started = time.perf_counter()
+        result = {"user": user, "flow": labels[index], "started_at": started}
+        try:
+            stages = run_once(system, questions[index])
+            result.update(ok=stages["errors"] == 0, tool_failures=stages["errors"])
+        except Exception as e:
+            result.update(ok=False, tool_failures=0, error=f"{type(e).__name__}: {e}")
+        result["latency_ms"] = (time.perf_counter() - started) * 1000
+        with lock:
+            results.append(result)
+
+        if think_time > 0:
+            time.sleep(think_time * rng.uniform(0.5, 1.5))
+
+
+def run_step(systems: List, users: int, mix, duration: float, ramp_up: float, think_time: float, seed: int) -> Dict:
+    """Run one concurrency level and summarize it."""
+    results, lock = [], threading.Lock()
+    connect_before = DB_CONNECT_SECONDS.snapshot()
+    pool_before = DB_POOL_WAIT_SECONDS.snapshot()
+    start = time.perf_counter()
+    stop_at = start + ramp_up + duration
+
+    with ThreadPoolExecutor(max_workers=users, thread_name_prefix="load-user") as executor:
+        for user in range(users):
+            start_at = start + (ramp_up * user / users if users > 1 else 0)
+            executor.submit(simulate_user, user, systems[user], mix, start_at, stop_at, think_time, seed, results, lock)
+    elapsed = time.perf_counter() - start
+
+    # Throughput and latency only count requests started after ramp-up
+    steady = [result for result in results if result["started_at"] >= start + ramp_up] or results
+    failed = [result for result in results if not result["ok"]]
+    flows = sorted({result["flow"] for result in results})
+    return {
+        "users": users,
+        "requests": len(results),
+        "failed": len(failed),
+        "error_rate": round(len(failed) / len(results), 4) if results else 0.0,
+        "errors": sorted({result["error"] for result in failed if result.get("error")})[:10],
+        "throughput_rps": round(len(steady) / duration, 3) if duration else round(len(results) / elapsed, 3),
+        "latency_ms": summarize([result["latency_ms"] for result in steady]),
+        "flows": {
+            flow: summarize([result["latency_ms"] for result in steady if result["flow"] == flow])
+            for flow in flows
+        },
+        "db_connect": connect_wait_summary(connect_before, DB_CONNECT_SECONDS.snapshot()),
+        "db_pool_wait": connect_wait_summary(pool_before, DB_POOL_WAIT_SECONDS.snapshot()),
+        "peak_rss_mb": peak_rss_mb(),
+        "elapsed_s": round(elapsed, 1)
+    }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_step(step: Dict):
+    latency = step["latency_ms"]
+    print(
+        f"{step['users']:>5} {step['requests']:>8} {step['throughput_rps']:>8.2f} {latency['p50']:>9.0f} "
+        f"{latency['p95']:>9.0f} {latency['p99']:>9.0f} {step['error_rate'] * 100:>6.1f}% "
+        f"{step['db_connect']['p95_ms']:>10.1f} {step['db_pool_wait']['p95_ms']:>10.1f} {step['peak_rss_mb']:>8.0f}"
+    )
+
+
+def parse_args(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Concurrent multi-user load test of the multi-agent system")
+    parser.add_argument("--users", default="10", help="concurrent users, or a comma-separated list of levels to step through")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to hold each level after ramp-up")
+    parser.add_argument("--ramp-up", type=float, default=10, help="seconds over which users are added")
+    parser.add_argument("--think-time", type=float, default=2.0, help="mean seconds between a user's questions (±50%%)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted flows, default {DEFAULT_MIX}")
+    parser.add_argument("--questions", metavar="FILE", help="JSON list of {question, weight, label} to use instead of --mix")
+    parser.add_argument("--latency", type=float, default=0.5, help="stub seconds per LLM completion")
+    parser.add_argument("--jitter", type=float, default=0.3, help="stub relative latency jitter")
+    parser.add_argument("--replay", metavar="FILE", help="serve completions from a recorded transcript")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplier for recorded latencies when replaying")
+    parser.add_argument("--openai", action="store_true", help="call the real OpenAI API (uses OPENAI_API_KEY)")
+    parser.add_argument("--rows", type=int, default=10000, help="expenses rows to generate")
+    parser.add_argument("--seed", type=int, default=42, help="seed for data, question choice and jitter")
+    parser.add_argument("--pool-size", type=int, default=0, help="share a pool of this many connections (0 = connect per query)")
+    parser.add_argument("--database-url", help="scratch database to seed (default: BENCHMARK_DATABASE_URL or pgserver)")
+    parser.add_argument("--label", help="release or build label stored in the report")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None) -> Dict:
+    args = parse_args(argv)
+    levels = [int(level) for level in args.users.split(",")]
+    mix = load_questions(args.questions) if args.questions else parse_mix(args.mix)
+
+    os.environ['CHART_CACHE_DIR'] = tempfile.mkdtemp(prefix="analytics-load-charts-")
+    os.environ['DB_POOL_SIZE'] = str(args.pool_size)
+    if args.replay:
+        client = ReplayClient(args.replay, latency_scale=args.latency_scale)
+    elif args.openai:
+        client = None
+    else:
+        client = StubOpenAI(latency=args.latency, jitter=args.jitter, seed=args.seed)
+
+    report = {
+        "label": args.label,
+        "revision": _git_revision(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("database_url", "output")},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "steps": []
+    }
+
+    with benchmark_database(args.database_url) as db_config:
+        print(f"🌱 Seeding {args.rows:,} expenses rows...")
+        seed_expenses(db_config, rows=args.rows, seed=args.seed)
+
+        quiet = open(os.devnull, "w")
+        with redirect_stdout(quiet):
+            # One agent session per simulated user, as each browser session has its own
+            systems = [MultiAgentSystem(db_config, client=client) for _ in range(max(levels))]
+
+        print(f"\n{'users':>5} {'requests':>8} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} "
+              f"{'conn p95':>10} {'pool p95':>10} {'RSS MB':>8}")
+        for users in levels:
+            with redirect_stdout(quiet):
+                step = run_step(systems, users, mix, args.duration, args.ramp_up, args.think_time, args.seed)
+            report["steps"].append(step)
+            print_step(step)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📄 Report written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
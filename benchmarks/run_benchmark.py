@@ -0,0 +1,192 @@
+# ============================================================================
+# File: benchmarks/run_benchmark.py
+# ============================================================================
+"""
+Offline end-to-end benchmark of MultiAgentSystem.
+
+Seeds a scratch PostgreSQL with a generated expenses table, replaces the OpenAI
+client with the scripted stub and times each flow (SQL question, chart,
+forecast, analysis), broken down by stage from the request's trace.
+
+Run with: python -m benchmarks.run_benchmark --rows 100000 --iterations 5
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+from typing import Dict, List
+import numpy as np
+from agents import MultiAgentSystem, ReplayClient
+from .fixtures import benchmark_database, seed_expenses
+from .stub_client import FLOWS, StubOpenAI
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def summarize(values: List[float]) -> Dict:
+    """Latency distribution in milliseconds."""
+    return {
+        "mean": round(float(np.mean(values)), 1) if values else 0.0,
+        "p50": round(percentile(values, 50), 1),
+        "p95": round(percentile(values, 95), 1),
+        "p99": round(percentile(values, 99), 1),
+        "min": round(min(values), 1) if values else 0.0,
+        "max": round(max(values), 1) if values else 0.0
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / 1024 / (1024 if sys.platform == "darwin" else 1), 1)
+
+
+def stage_breakdown(spans: List) -> Dict:
+    """Milliseconds spent per stage of one request: LLM calls, each tool, and everything else."""
+    request = next(span for span in spans if span.kind == "request")
+    llm_ms = sum(span.duration_ms for span in spans if span.kind == "llm")
+    stages = {
+        "total_ms": request.duration_ms,
+        "llm_ms": llm_ms,
+        "own_code_ms": request.duration_ms - llm_ms,
+        "llm_calls": sum(1 for span in spans if span.kind == "llm")
+    }
+    for span in spans:
+        if span.kind == "tool":
+            stages[f"{span.name}_ms"] = stages.get(f"{span.name}_ms", 0.0) + span.duration_ms
+    return stages
+
+
+def run_once(system, question: str) -> Dict:
+    """Answer one question from a clean conversation and return its stage timings."""
+    system.clear_memory()
+    _, logs = system.query(question)
+    stages = stage_breakdown(system.trace())
+    stages["errors"] = sum(1 for log in logs if log.get("type") == "tool_result" and not log.get("success"))
+    return stages
+
+
+def benchmark_flow(system, name: str, iterations: int, warmup: int, warm_cache: bool = False) -> Dict:
+    """Time a flow, then measure its Python allocation peak in a separate untimed run.
+
+    Unless warm_cache is set, the chart cache is emptied (untimed) before every
+    run, so chart iterations time rendering rather than cache hits.
+    """
+    question = FLOWS[name]["question"]
+
+    def run() -> Dict:
+        if not warm_cache:
+            system.viz_agent.chart_cache.clear()
+        return run_once(system, question)
+
+    for _ in range(warmup):
+        run()
+
+    runs = [run() for _ in range(iterations)]
+
+    tracemalloc.start()
+    run()
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    totals = [run["total_ms"] for run in runs]
+    stage_names = sorted({key for run in runs for key in run if key.endswith("_ms") and key != "total_ms"})
+    return {
+        "question": question,
+        "iterations": iterations,
+        "latency_ms": summarize(totals),
+        "stages_ms": {stage: summarize([run.get(stage, 0.0) for run in runs]) for stage in stage_names},
+        "llm_calls": runs[0]["llm_calls"] if runs else 0,
+        "errors": sum(run["errors"] for run in runs),
+        "queries_per_second": round(len(totals) / (sum(totals) / 1000), 2) if totals else 0.0,
+        "python_peak_mb": round(python_peak / 1024 / 1024, 1)
+    }
+
+
+def print_report(report: Dict):
+    print(f"\n{'flow':<10} {'p50 ms':>9} {'p95 ms':>9} {'llm ms':>9} {'own ms':>9} {'q/s':>7} {'py MB':>7}  slowest tool")
+    for name, flow in report["flows"].items():
+        tools = {stage: stats for stage, stats in flow["stages_ms"].items() if stage.startswith("tool.")}
+        slowest = max(tools.items(), key=lambda item: item[1]["mean"], default=(None, None))
+        slowest_text = f"{slowest[0][:-3]} {slowest[1]['mean']:.1f} ms" if slowest[0] else "-"
+        print(
+            f"{name:<10} {flow['latency_ms']['p50']:>9.1f} {flow['latency_ms']['p95']:>9.1f} "
+            f"{flow['stages_ms']['llm_ms']['mean']:>9.1f} {flow['stages_ms']['own_code_ms']['mean']:>9.1f} "
+            f"{flow['queries_per_second']:>7.2f} {flow['python_peak_mb']:>7.1f}  {slowest_text}"
+        )
+    print(f"\nPeak RSS: {report['peak_rss_mb']} MB")
+
+
+def parse_args(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the multi-agent system")
+    parser.add_argument("--rows", type=int, default=10000, help="expenses rows to generate")
+    parser.add_argument("--years", type=int, default=3, help="years of history to generate")
+    parser.add_argument("--iterations", type=int, default=5, help="timed runs per flow")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs per flow before timing")
+    parser.add_argument("--flows", default=",".join(FLOWS), help=f"comma-separated subset of {', '.join(FLOWS)}")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds per LLM completion")
+    parser.add_argument("--jitter", type=float, default=0.0, help="relative latency jitter, e.g. 0.2 for ±20%%")
+    parser.add_argument("--replay", metavar="FILE", help="serve completions from a recorded transcript instead of the stub")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplier for recorded latencies when replaying")
+    parser.add_argument("--seed", type=int, default=42, help="seed for data generation and jitter")
+    parser.add_argument("--warm-cache", action="store_true", help="keep the chart cache between runs (default: every run renders cold)")
+    parser.add_argument("--database-url", help="scratch database to seed (default: BENCHMARK_DATABASE_URL or pgserver)")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the agents' console output")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None) -> Dict:
+    args = parse_args(argv)
+    flows = [name.strip() for name in args.flows.split(",") if name.strip()]
+    unknown = [name for name in flows if name not in FLOWS]
+    if unknown:
+        raise SystemExit(f"Unknown flow(s): {', '.join(unknown)}")
+
+    # Start every run with a cold chart cache of its own
+    os.environ['CHART_CACHE_DIR'] = tempfile.mkdtemp(prefix="analytics-benchmark-charts-")
+    agent_output = sys.stdout if args.verbose else open(os.devnull, "w")
+
+    with benchmark_database(args.database_url) as db_config:
+        print(f"🌱 Seeding {args.rows:,} expenses rows...")
+        start = time.perf_counter()
+        seed_expenses(db_config, rows=args.rows, years=args.years, seed=args.seed)
+        print(f"   done in {time.perf_counter() - start:.1f}s")
+
+        if args.replay:
+            client = ReplayClient(args.replay, latency_scale=args.latency_scale)
+        else:
+            client = StubOpenAI(latency=args.latency, jitter=args.jitter, seed=args.seed)
+        system = MultiAgentSystem(db_config, client=client)
+
+        report = {
+            "config": {key: value for key, value in vars(args).items() if key not in ("database_url", "output", "verbose")},
+            "environment": {"python": platform.python_version(), "platform": platform.platform()},
+            "flows": {}
+        }
+        for name in flows:
+            print(f"⏱️ Benchmarking {name}...")
+            with redirect_stdout(agent_output):
+                report["flows"][name] = benchmark_flow(system, name, args.iterations, args.warmup, args.warm_cache)
+        report["peak_rss_mb"] = peak_rss_mb()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Report written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# ============================================================================
+# File: benchmarks/stub_client.py
+# ============================================================================
+import io
+import csv
+import json
+import time
+import random
+import itertools
+import threading
+from typing import Dict, List
+from openai.types.chat import ChatCompletion
+
+
+# Orchestrator delegations and the tool call each sub-agent makes for its task
+FLOWS = {
+    "sql": {
+        "question": "Show me total expenses by category",
+        "steps": [("delegate_to_sql_agent", {"task": "Total expenses by category"})]
+    },
+    "chart": {
+        "question": "Create a line chart of monthly expenses",
+        "steps": [
+            ("delegate_to_sql_agent", {"task": "Monthly expense totals"}),
+            ("delegate_to_viz_agent", {"task": "Line chart of monthly expense totals"})
+        ]
+    },
+    "forecast": {
+        "question": "Predict total expenses for the next 12 months",
+        "steps": [("delegate_to_forecast_agent", {"task": "Predict total expenses for the next 12 months"})]
+    },
+    "analysis": {
+        "question": "Give me descriptive statistics of the expenses table",
+        "steps": [("delegate_to_analyst_agent", {"task": "Descriptive statistics of the expenses table"})]
+    }
+}
+
+TASK_TOOL_CALLS = {
+    "Total expenses by category": ("execute_sql", {
+        "query": "SELECT category, SUM(amount) AS total FROM expenses GROUP BY category ORDER BY total DESC",
+        "explanation": "Total expenses per category"
+    }),
+    "Monthly expense totals": ("execute_sql", {
+        "query": "SELECT DATE_TRUNC('month', date) AS month, SUM(amount) AS total FROM expenses GROUP BY month ORDER BY month",
+        "explanation": "Expense totals per month"
+    }),
+    "Predict total expenses for the next 12 months": ("forecast_data", {
+        "metric": "total expenses", "periods_ahead": 12, "period_type": "month"
+    }),
+    "Descriptive statistics of the expenses table": ("analyze_data", {
+        "table": "expenses", "analysis_type": "descriptive"
+    })
+}
+
+QUESTION_FLOWS = {flow["question"]: name for name, flow in FLOWS.items()}
+
+
+def _get(message, field: str):
+    """Read a field from a dict message or an SDK message object."""
+    return message.get(field) if isinstance(message, dict) else getattr(message, field, None)
+
+
+def _approximate_tokens(messages: List, tools: List[Dict]) -> int:
+    chars = len(json.dumps(tools)) if tools else 0
+    for message in messages:
+        chars += len(_get(message, "content") or "")
+        for tool_call in _get(message, "tool_calls") or []:
+            function = _get(tool_call, "function")
+            chars += len(_get(function, "arguments") or "")
+    return chars // 4
+
+
+def _records(data) -> List[Dict]:
+    """Row dicts from a tool result's data in any LLM encoding, as the model would read it back."""
+    if isinstance(data, dict) and "rows" in data:
+        return [dict(zip(data["columns"], row)) for row in data["rows"]]
+    if isinstance(data, str):
+        reader = csv.reader(io.StringIO(data))
+        names = [column.rsplit(":", 1)[0] for column in next(reader, [])]
+        return [dict(zip(names, row)) for row in reader]
+    return data
+
+
+def _json_after(text: str, marker: str):
+    """Decode the JSON value that follows marker in text, if any."""
+    start = text.find(marker)
+    if start < 0:
+        return None
+    try:
+        value, _ = json.JSONDecoder().raw_decode(text[start + len(marker):].lstrip())
+        return value
+    except ValueError:
+        return None
+
+
+class _Completions:
+    def __init__(self, client: "StubOpenAI"):
+        self._client = client
+
+    def create(self, model: str, messages: List, tools: List[Dict] = None, **kwargs) -> ChatCompletion:
+        return self._client.complete(model, messages, tools)
+
+
+class _Chat:
+    def __init__(self, client: "StubOpenAI"):
+        self.completions = _Completions(client)
+
+
+class StubOpenAI:
+    """Stand-in for the OpenAI client that scripts the agents' tool calls for the FLOWS.
+
+    Each completion sleeps for the configured latency (± jitter) so LLM time is
+    simulated while everything else runs for real. Token usage is estimated at
+    four characters per token.
+    """
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.chat = _Chat(self)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+
+    def _sleep(self):
+        with self._lock:
+            factor = 1 + self.jitter * self._random.uniform(-1, 1)
+        if self.latency > 0:
+            time.sleep(max(self.latency * factor, 0))
+
+    def complete(self, model: str, messages: List, tools: List[Dict] = None) -> ChatCompletion:
+        self._sleep()
+        tool_names = {tool["function"]["name"] for tool in tools or []}
+        user_index = max(i for i, message in enumerate(messages) if _get(message, "role") == "user")
+        request = _get(messages[user_index], "content") or ""
+        tool_results = [message for message in messages[user_index + 1:] if _get(message, "role") == "tool"]
+
+        if "delegate_to_sql_agent" in tool_names:
+            tool_call, content = self._orchestrate(request, tool_results)
+        else:
+            tool_call, content = self._work(request, tool_results, tool_names)
+        return self._response(model, tool_call, content, _approximate_tokens(messages, tools))
+
+    def _orchestrate(self, question: str, tool_results: List):
+        flow = FLOWS[QUESTION_FLOWS.get(question, "sql")]
+        if len(tool_results) >= len(flow["steps"]):
+            return None, "Here is what I found. " + " ".join(
+                (json.loads(_get(result, "content")).get("response") or "")[:300] for result in tool_results
+            )
+
+        name, arguments = flow["steps"][len(tool_results)]
+        if name == "delegate_to_viz_agent":
+            # Hand the rows the SQL agent returned to the visualization agent, as the model does
+            previous = json.loads(_get(tool_results[-1], "content")).get("response") or ""
+            arguments = dict(arguments, data=json.dumps(_json_after(previous, "Rows:") or []))
+        return (name, arguments), None
+
+    def _work(self, task: str, tool_results: List, tool_names: set):
+        if tool_results:
+            result = json.loads(_get(tool_results[-1], "content"))
+            if "data" in result:
+                rows = json.dumps(_records(result["data"]), default=str)
+                return None, f"The query returned {result.get('row_count')} rows. Rows: {rows}"
+            return None, f"Done: {json.dumps(result, default=str)[:500]}"
+
+        if "create_chart" in tool_names:
+            data = _json_after(task, "Data to visualize:") or []
+            columns = list(data[0]) if data else [None, None]
+            return ("create_chart", {
+                "data": data, "chart_type": "line", "x_column": columns[0], "y_column": columns[-1],
+                "title": task.split("\n")[0]
+            }), None
+
+        tool_call = TASK_TOOL_CALLS.get(task.split("\n")[0])
+        if tool_call and tool_call[0] in tool_names:
+            return tool_call, None
+        return None, "I could not find a scripted step for this task."
+
+    def _response(self, model: str, tool_call, content: str, prompt_tokens: int) -> ChatCompletion:
+        message = {"role": "assistant", "content": content}
+        if tool_call:
+            name, arguments = tool_call
+            message["tool_calls"] = [{
+                "id": f"call_{next(self._ids)}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(arguments, default=str)}
+            }]
+        completion_tokens = len(json.dumps(message)) // 4
+        return ChatCompletion.model_validate({
+            "id": f"stub-{next(self._ids)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "tool_calls" if tool_call else "stop", "message": message}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        })
@@ -2,33 +2,111 @@
 # File: main.py
 # ============================================================================
 import os
+import sys
+import argparse
 from dotenv import load_dotenv
 from agents import MultiAgentSystem
-from utils import get_database_config
+from agents.batch_runner import BatchRunner, completed_ids, read_questions
+from utils import ChartCache, get_database_config
+from utils.chart_renderer import ChartRenderer
 
 # Load environment variables
 load_dotenv()
 
 
-def main():
-    """Main CLI application."""
-    print("🚀 Initializing Multi-Agent PostgreSQL Analyst System...")
-    print("   With Forecasting Capabilities! 🔮")
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Multi-Agent PostgreSQL Analyst CLI")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="profile every query with cProfile and tracemalloc (reports go to PROFILE_DIR)"
+    )
+    parser.add_argument("--record", metavar="FILE", help="append every LLM completion to a JSONL transcript")
+    parser.add_argument("--replay", metavar="FILE", help="answer from a recorded transcript instead of the OpenAI API")
     
-    # Get configuration
+    batch = parser.add_argument_group("batch mode")
+    batch.add_argument("--batch", metavar="FILE", help="answer the questions in FILE ('-' for stdin), one per line or JSON lines")
+    batch.add_argument("--output", metavar="FILE", default="-", help="JSONL results file, resumed if it exists (default: stdout)")
+    batch.add_argument("--concurrency", type=int, default=4, help="questions answered in parallel, each in its own session")
+    batch.add_argument("--retries", type=int, default=2, help="retries per failed question")
+    batch.add_argument("--no-resume", action="store_true", help="answer every question even if the output already has it")
+    batch.add_argument("--verbose", action="store_true", help="show the agents' console output on stderr")
+    return parser.parse_args()
+
+
+def load_config(args):
+    """Database config and API key, or None after reporting what is missing."""
     try:
         db_config = get_database_config()
         api_key = os.getenv('OPENAI_API_KEY')
         
-        if not api_key:
+        if not api_key and not args.replay:
             raise ValueError("OPENAI_API_KEY environment variable must be set")
         
     except ValueError as e:
-        print(f"❌ Configuration Error: {e}")
+        print(f"❌ Configuration Error: {e}", file=sys.stderr)
+        return None
+    return db_config, api_key
+
+
+def run_batch(args):
+    """Answer a file of questions non-interactively, streaming JSONL records."""
+    config = load_config(args)
+    if config is None:
+        return
+    db_config, api_key = config
+    
+    questions = read_questions(args.batch)
+    skip = set() if args.no_resume else completed_ids(args.output)
+    if skip:
+        print(f"⏭️ Resuming: {len(skip)} question(s) already answered in {args.output}", file=sys.stderr)
+    
+    to_file = args.output != "-"
+    # Every session shares one chart cache and one pool of render processes
+    chart_cache, renderer = ChartCache(), ChartRenderer()
+    runner = BatchRunner(
+        lambda: MultiAgentSystem(
+            db_config, api_key, chart_output="image", record_path=args.record, replay_path=args.replay,
+            chart_cache=chart_cache, renderer=renderer
+        ),
+        concurrency=args.concurrency,
+        retries=args.retries,
+        results_dir=f"{os.path.splitext(args.output)[0]}_results" if to_file else None
+    )
+    output = open(args.output, "a", encoding="utf-8") if to_file else sys.stdout
+    try:
+        summary = runner.run(questions, output, skip=skip, quiet=not args.verbose)
+    finally:
+        renderer.shutdown()
+        if to_file:
+            output.close()
+    print(
+        f"🏁 {summary['ok']} answered, {summary['failed']} failed, {summary['skipped']} skipped "
+        f"in {summary['elapsed_s']}s",
+        file=sys.stderr
+    )
+
+
+def main():
+    """Main CLI application."""
+    args = parse_args()
+    if args.batch:
+        run_batch(args)
+        return
+    
+    print("🚀 Initializing Multi-Agent PostgreSQL Analyst System...")
+    print("   With Forecasting Capabilities! 🔮")
+    
+    # Get configuration
+    config = load_config(args)
+    if config is None:
         return
+    db_config, api_key = config
     
     # Initialize system
-    system = MultiAgentSystem(db_config, api_key)
+    # Terminal sessions cannot display interactive charts, so save image files
+    system = MultiAgentSystem(db_config, api_key, chart_output="image", record_path=args.record, replay_path=args.replay)
     
     print("\n✅ System ready! Available agents:")
     print("  - SQL Agent: Database queries and data retrieval")
@@ -64,7 +142,7 @@ def main():
         
         if user_input:
             try:
-                system.query(user_input)
+                system.query(user_input, profile=args.profile)
             except Exception as e:
                 print(f"❌ Error: {e}")
         else:
@@ -0,0 +1,243 @@
+# ============================================================================
+# File: streamlit_app/dashboard_store.py
+# ============================================================================
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import date, datetime, time as time_of_day
+from decimal import Decimal
+from typing import Dict, List
+import pyarrow.parquet as pq
+from utils.columnar import ColumnarResult
+
+
+# Widget fields persisted as configuration; data, watermarks and timestamps are not
+CONFIG_FIELDS = (
+    "id", "title", "type", "table", "x_col", "y_col", "x_type",
+    "aggregation", "data_limit", "refresh_interval", "watermark_col"
+)
+REQUIRED_FIELDS = ("title", "type", "table", "x_col", "y_col")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dashboards (
+    name TEXT PRIMARY KEY,
+    widgets TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    dashboard TEXT NOT NULL,
+    widget_id INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    row_count INTEGER NOT NULL,
+    watermark TEXT,
+    PRIMARY KEY (dashboard, widget_id)
+);
+"""
+
+# Watermark types as stored in the snapshots table, checked in order (bool before int, datetime before date)
+WATERMARK_TYPES = (
+    ("bool", bool, lambda text: text == "True"),
+    ("int", int, int),
+    ("decimal", Decimal, Decimal),
+    ("float", float, float),
+    ("datetime", datetime, datetime.fromisoformat),
+    ("date", date, date.fromisoformat),
+    ("time", time_of_day, time_of_day.fromisoformat),
+    ("uuid", uuid.UUID, uuid.UUID),
+    ("str", str, str)
+)
+
+
+def get_dashboard_store_config() -> Dict:
+    """Get dashboard store configuration from environment variables."""
+    return {
+        'directory': os.getenv('DASHBOARD_STORE_DIR', '.dashboards')
+    }
+
+
+def widget_config(widget: Dict) -> Dict:
+    """The persistable configuration of a widget."""
+    return {field: widget.get(field) for field in CONFIG_FIELDS if field in widget}
+
+
+def export_config(widgets: List[Dict]) -> str:
+    """Serialize widget configurations as JSON."""
+    return json.dumps([widget_config(widget) for widget in widgets], indent=2)
+
+
+def import_config(text: str) -> List[Dict]:
+    """Parse exported JSON into fresh widgets (without data) with sequential ids."""
+    configs = json.loads(text)
+    if not isinstance(configs, list):
+        raise ValueError("Dashboard configuration must be a list of widgets")
+
+    widgets = []
+    for index, config in enumerate(configs):
+        missing = [field for field in REQUIRED_FIELDS if not config.get(field)]
+        if missing:
+            raise ValueError(f"Widget {index} is missing {', '.join(missing)}")
+        widget = widget_config(config)
+        widget.update({"id": index, "data": None, "watermark": None})
+        widgets.append(widget)
+    return widgets
+
+
+class DashboardStore:
+    """Named dashboards in SQLite with per-widget Parquet data snapshots."""
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or get_dashboard_store_config()['directory']
+        self.snapshot_dir = os.path.join(self.directory, "snapshots")
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        self.db_path = os.path.join(self.directory, "dashboards.db")
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+            # Stores created before watermarks were kept exactly
+            if "watermark" not in {row[1] for row in conn.execute("PRAGMA table_info(snapshots)")}:
+                conn.execute("ALTER TABLE snapshots ADD COLUMN watermark TEXT")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _dashboard_dir(self, name: str) -> str:
+        return os.path.join(self.snapshot_dir, hashlib.sha1(name.encode()).hexdigest()[:16])
+
+    def save(self, name: str, widgets: List[Dict]):
+        """Save (or replace) a dashboard with snapshots of the widgets' current data."""
+        directory = self._dashboard_dir(name)
+        os.makedirs(directory, exist_ok=True)
+
+        snapshots = []
+        for widget in widgets:
+            data = widget.get("data")
+            if data is None:
+                continue
+            data = ColumnarResult.coerce(data)
+            path = os.path.join(directory, f"widget_{widget['id']}.parquet")
+            temp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+            pq.write_table(data.table, temp_path, compression="zstd")
+            os.replace(temp_path, path)
+            snapshots.append((
+                name, widget['id'], path, widget.get('refreshed_at') or time.time(), len(data),
+                encode_watermark(widget.get('watermark'))
+            ))
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO dashboards (name, widgets, updated_at) VALUES (?, ?, ?)",
+                (name, export_config(widgets), time.time())
+            )
+            conn.execute("DELETE FROM snapshots WHERE dashboard = ?", (name,))
+            conn.executemany(
+                "INSERT INTO snapshots (dashboard, widget_id, path, fetched_at, row_count, watermark) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                snapshots
+            )
+
+        # Drop snapshots of widgets that no longer exist
+        keep = {os.path.basename(snapshot[2]) for snapshot in snapshots}
+        for filename in os.listdir(directory):
+            if filename not in keep:
+                os.remove(os.path.join(directory, filename))
+
+    def list(self) -> List[Dict]:
+        """Saved dashboards, most recently updated first."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT name, widgets, updated_at FROM dashboards ORDER BY updated_at DESC"
+            ).fetchall()
+        return [
+            {"name": name, "widgets": len(json.loads(widgets)), "updated_at": updated_at}
+            for name, widgets, updated_at in rows
+        ]
+
+    def load(self, name: str) -> List[Dict]:
+        """Load a dashboard's widgets with their snapshot data and fetch times."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT widgets FROM dashboards WHERE name = ?", (name,)).fetchone()
+            snapshots = {
+                widget_id: (path, fetched_at, watermark)
+                for widget_id, path, fetched_at, watermark in conn.execute(
+                    "SELECT widget_id, path, fetched_at, watermark FROM snapshots WHERE dashboard = ?", (name,)
+                )
+            }
+        if row is None:
+            raise KeyError(f"No saved dashboard named '{name}'")
+
+        widgets = []
+        for config in json.loads(row[0]):
+            widget = dict(config, data=None, watermark=None)
+            path, fetched_at, watermark = snapshots.get(config["id"], (None, None, None))
+            if path and os.path.exists(path):
+                widget["data"] = ColumnarResult(pq.read_table(path))
+                widget["refreshed_at"] = fetched_at
+                widget["snapshot_at"] = fetched_at
+                widget["watermark"] = (
+                    decode_watermark(watermark) if watermark is not None else _snapshot_watermark(widget)
+                )
+            widgets.append(widget)
+        return widgets
+
+    def delete(self, name: str):
+        """Delete a dashboard and its snapshots."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM dashboards WHERE name = ?", (name,))
+            conn.execute("DELETE FROM snapshots WHERE dashboard = ?", (name,))
+        shutil.rmtree(self._dashboard_dir(name), ignore_errors=True)
+
+
+def encode_watermark(value) -> str:
+    """A watermark as tagged text that decode_watermark turns back into the same value and type.
+
+    The watermark is the raw database value bound into the next incremental
+    query, so a NUMERIC must come back as the exact Decimal, not as the
+    float64 the snapshot data was normalized to.
+    """
+    for name, kind, _ in WATERMARK_TYPES:
+        if value is None or not isinstance(value, kind):
+            continue
+        if isinstance(value, (date, time_of_day)):
+            text = value.isoformat()
+        elif isinstance(value, float):
+            text = repr(value)
+        else:
+            text = str(value)
+        return json.dumps({"type": name, "value": text})
+    # Other types fall back to the value recovered from the snapshot on load
+    return None
+
+
+def decode_watermark(text: str):
+    """The value stored by encode_watermark."""
+    stored = json.loads(text)
+    parse = {name: parse for name, _, parse in WATERMARK_TYPES}[stored["type"]]
+    return parse(stored["value"])
+
+
+def _snapshot_watermark(widget: Dict):
+    """Recover the incremental-refresh watermark from the newest row of a snapshot saved without one."""
+    column = widget.get("watermark_col")
+    data = widget["data"]
+    if not column or widget.get("aggregation") or column not in data.columns or not len(data):
+        return None
+    return data.table.column(column)[-1].as_py()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_dashboard_store() -> DashboardStore:
+    """Return the process-wide dashboard store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DashboardStore()
+        return _store
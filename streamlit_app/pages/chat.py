@@ -1,11 +1,19 @@
 # ============================================================================
 # File: streamlit_app/pages/chat.py
 # ============================================================================
+import os
+import html
+import queue
 import streamlit as st
 from datetime import datetime
 import pandas as pd
 import json
-from streamlit_app.utils import create_forecast_chart
+from streamlit_app.utils import create_forecast_chart, figure_from_spec
+from utils.columnar import ColumnarResult
+
+
+# Messages rendered per page of chat history
+CHAT_PAGE_SIZE = 20
 
 
 def render_chat_page(multi_agent_system):
@@ -13,36 +21,26 @@ def render_chat_page(multi_agent_system):
     st.title("💬 AI Data Analyst Chat")
     st.markdown("Ask questions about your data and get instant insights powered by AI")
     
+    history = st.session_state.chat_history
+    visible = st.session_state.setdefault('chat_visible_messages', CHAT_PAGE_SIZE)
+    hidden = max(len(history) - visible, 0)
+    
     # Chat container
     chat_container = st.container()
     
     with chat_container:
-        # Display chat history
-        for message in st.session_state.chat_history:
-            if message["role"] == "user":
-                st.markdown(f"""
-                <div style="display: flex; justify-content: flex-end; margin: 10px 0;">
-                    <div class="user-message">
-                        <strong>You:</strong> {message["content"]}
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.markdown(f"""
-                <div style="display: flex; justify-content: flex-start; margin: 10px 0;">
-                    <div class="assistant-message">
-                        <strong>🤖 AI Analyst:</strong> {message["content"]}
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Show execution logs if enabled
-                if st.session_state.show_agent_reasoning and message.get("execution_logs"):
-                    _render_execution_logs(message["execution_logs"])
-                
-                # Show data preview if available
-                if message.get("data"):
-                    _render_data_preview(message)
+        if hidden:
+            if st.button(f"⬆️ Load older messages ({hidden} more)", use_container_width=True):
+                st.session_state.chat_visible_messages += CHAT_PAGE_SIZE
+                st.rerun()
+        
+        # Display only the most recent page(s) of chat history
+        for message in history[hidden:]:
+            _render_message(message)
+        
+        # Stream the in-flight answer, if any
+        if st.session_state.get('pending_query'):
+            _stream_pending_query()
     
     # Chat input
     st.divider()
@@ -57,14 +55,48 @@ def render_chat_page(multi_agent_system):
         )
     
     with col2:
-        send_button = st.button("Send 🚀", use_container_width=True)
+        send_button = st.button("Send 🚀", use_container_width=True,
+                                disabled=bool(st.session_state.get('pending_query')))
     
     if send_button and user_input:
         _process_user_message(user_input, multi_agent_system)
 
 
+def _render_message(message):
+    """Render one chat message with its charts, logs and data."""
+    if message["role"] == "user":
+        st.markdown(f"""
+        <div style="display: flex; justify-content: flex-end; margin: 10px 0;">
+            <div class="user-message">
+                <strong>You:</strong> {message["content"]}
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+        return
+    
+    st.markdown(f"""
+    <div style="display: flex; justify-content: flex-start; margin: 10px 0;">
+        <div class="assistant-message">
+            <strong>🤖 AI Analyst:</strong> {message["content"]}
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Show charts produced by the Visualization Agent
+    if message.get("charts"):
+        _render_charts(message)
+    
+    # Show execution logs if enabled
+    if st.session_state.show_agent_reasoning and message.get("execution_logs"):
+        _render_execution_logs(message)
+    
+    # Show data preview if available
+    if message.get("data"):
+        _render_data_preview(message)
+
+
 def _process_user_message(user_input, multi_agent_system):
-    """Process user message through the multi-agent system."""
+    """Start processing a user message on the agent system's background worker."""
     if not multi_agent_system:
         st.error("⚠️ Agent system not initialized. Check your environment variables.")
         return
@@ -76,195 +108,218 @@ def _process_user_message(user_input, multi_agent_system):
         "timestamp": datetime.now().isoformat()
     })
     
-    # Create placeholder for real-time logs
+    # Events are queued by the worker thread and drained by the script thread
+    events = queue.Queue()
+    st.session_state.pending_query = {
+        "future": multi_agent_system.submit_query(
+            user_input, on_event=events.put, profile=st.session_state.get('profile_queries', False)
+        ),
+        "events": events,
+        "received": []
+    }
+    st.rerun()
+
+
+def _event_status(event):
+    """One-line progress text for an execution-log event."""
+    kind = event.get("type")
+    if kind == "agent_delegation":
+        return f"🎯 {event['agent'].title()} agent is working..."
+    if kind == "tool_call":
+        return f"🔧 Running {event['tool_name']}..."
+    if kind == "tool_result":
+        if not event.get("success"):
+            return f"⚠️ {event['tool_name']} failed, recovering..."
+        rows = f" ({event['row_count']} rows)" if event.get("row_count") is not None else ""
+        return f"✅ {event['tool_name']} finished{rows}"
+    if kind == "decision":
+        return "🧠 Deciding next step..."
+    return None
+
+
+def _stream_pending_query():
+    """Render execution events as the background query emits them, then store the answer."""
+    pending = st.session_state.pending_query
     status_placeholder = st.empty()
-    logs_placeholder = st.empty()
+    status_placeholder.info("🤔 AI is thinking...")
+    
+    log_container = None
+    if st.session_state.show_agent_reasoning:
+        with st.expander("🔍 Execution Details", expanded=True):
+            log_container = st.container()
+    
+    def show(event):
+        status = _event_status(event)
+        if status:
+            status_placeholder.info(status)
+        if log_container is not None:
+            card = _log_html(event)
+            if card:
+                log_container.markdown(card, unsafe_allow_html=True)
+    
+    # Replay events received before a rerun interrupted this loop
+    for event in pending["received"]:
+        show(event)
+    
+    while True:
+        try:
+            event = pending["events"].get(timeout=0.1)
+        except queue.Empty:
+            if pending["future"].done():
+                break
+            continue
+        pending["received"].append(event)
+        show(event)
+    
+    del st.session_state.pending_query
+    status_placeholder.empty()
     
-    # Get AI response with execution tracking
     try:
-        with status_placeholder:
-            st.info("🤔 AI is thinking...")
-        
-        # Show execution logs in real-time if enabled
-        if st.session_state.show_agent_reasoning:
-            with logs_placeholder:
-                with st.expander("🔍 Execution Details", expanded=True):
-                    log_container = st.container()
-        
-        # Query the system
-        response, execution_logs = multi_agent_system.query(user_input)
-        
-        # Display logs in real-time
-        if st.session_state.show_agent_reasoning:
-            with logs_placeholder:
-                with st.expander("🔍 Execution Details", expanded=True):
-                    with log_container:
-                        for log in execution_logs:
-                            _render_single_log(log)
-        
-        # Extract data from logs (look for SQL results or forecast data)
-        data = None
-        for log in execution_logs:
-            if log.get("type") == "tool_result" and log.get("success"):
-                # Check if this is from orchestrator's result
-                pass
-        
-        # Clear status
-        status_placeholder.empty()
-        
-        # Add assistant message
-        st.session_state.chat_history.append({
-            "role": "assistant",
-            "content": response,
-            "data": data,
-            "execution_logs": execution_logs,
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        # Update current data
-        if data:
-            st.session_state.current_data = data
-        
-        st.rerun()
+        response, execution_logs = pending["future"].result()
     except Exception as e:
-        status_placeholder.empty()
         st.error(f"❌ Error: {str(e)}")
-
-
-def _render_single_log(log):
-    """Render a single log entry."""
-    if log["type"] == "orchestrator_start":
-        st.markdown(f"""
-        <div style="background-color: #6366f1; padding: 10px; border-radius: 8px; margin: 5px 0;">
-            <strong>🎯 Orchestrator Started</strong><br>
-            <small>⏰ {log['timestamp']}</small>
-        </div>
-        """, unsafe_allow_html=True)
+        return
     
-    elif log["type"] == "agent_delegation":
-        st.markdown(f"""
-        <div style="background-color: #8b5cf6; padding: 10px; border-radius: 8px; margin: 5px 0;">
-            <strong>🎯 Delegated to {log['agent']} Agent</strong><br>
-            <strong>Task:</strong> {log['task']}<br>
-            <small>⏰ {log['timestamp']}</small>
-        </div>
-        """, unsafe_allow_html=True)
+    # Extract data from logs: the last SQL result or forecast produced
+    data = None
+    for log in execution_logs:
+        if log.get("type") == "tool_result" and log.get("success"):
+            for artifact in log.get("artifacts", []):
+                if artifact.get("kind") in ("table", "forecast"):
+                    data = artifact["data"]
     
-    elif log["type"] == "agent_start":
-        st.markdown(f"""
-        <div style="background-color: #1e40af; padding: 10px; border-radius: 8px; margin: 5px 0;">
-            <strong>🚀 {log['agent']} Started</strong><br>
-            <small>⏰ {log['timestamp']}</small>
-        </div>
-        """, unsafe_allow_html=True)
+    # Collect chart artifacts produced by tool calls
+    charts = [
+        artifact
+        for log in execution_logs
+        if log.get("type") == "tool_result"
+        for artifact in log.get("artifacts", [])
+        if artifact.get("kind") in ("plotly", "image")
+    ]
     
-    elif log["type"] == "decision":
-        st.markdown(f"""
-        <div style="background-color: #7c3aed; padding: 10px; border-radius: 8px; margin: 5px 0;">
-            <strong>🧠 Decision (Iteration {log['iteration']}):</strong> {log['decision']}<br>
-            <small>⏰ {log['timestamp']}</small>
-        </div>
-        """, unsafe_allow_html=True)
+    # Add assistant message
+    st.session_state.chat_history.append({
+        "role": "assistant",
+        "content": response,
+        "data": data,
+        "charts": charts,
+        "execution_logs": execution_logs,
+        "timestamp": datetime.now().isoformat()
+    })
     
-    elif log["type"] == "tool_call":
-        st.markdown(f"""
-        <div style="background-color: #059669; padding: 10px; border-radius: 8px; margin: 5px 0;">
-            <strong>🔧 Tool Called:</strong> {log['tool_name']}<br>
-            <small>⏰ {log['timestamp']}</small>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        if log.get("tool_input"):
-            if "query" in log["tool_input"]:
-                st.code(log["tool_input"]["query"], language="sql")
-            if "explanation" in log["tool_input"]:
-                st.caption(f"💡 {log['tool_input']['explanation']}")
-            
-            # Show forecast parameters
-            if log["tool_name"] == "forecast_data":
-                params = log["tool_input"]
-                st.info(f"""
-                📊 **Forecast Parameters:**
-                - Metric: {params.get('metric')}
-                - Category: {params.get('category', 'All')}
-                - Periods: {params.get('periods_ahead')} {params.get('period_type')}(s)
-                """)
-    
-    elif log["type"] == "tool_result":
-        success_color = "#059669" if log.get("success") else "#dc2626"
-        st.markdown(f"""
-        <div style="background-color: {success_color}; padding: 10px; border-radius: 8px; margin: 5px 0;">
-            <strong>✅ Tool Result:</strong> {log['tool_name']}<br>
-            <strong>Status:</strong> {'Success ✓' if log.get('success') else 'Failed ✗'}<br>
-            {f"<strong>Rows:</strong> {log.get('row_count')}<br>" if log.get('row_count') else ''}
-            {f"<strong>Error:</strong> {log.get('error')}<br>" if log.get('error') else ''}
-            <small>⏰ {log['timestamp']}</small>
-        </div>
-        """, unsafe_allow_html=True)
+    # Update current data
+    if data:
+        st.session_state.current_data = data
     
-    elif log["type"] == "agent_complete":
-        st.markdown(f"""
-        <div style="background-color: #047857; padding: 10px; border-radius: 8px; margin: 5px 0;">
-            <strong>🏁 {log['agent']} Completed</strong><br>
-            <strong>Response Length:</strong> {log['response_length']} characters<br>
-            <small>⏰ {log['timestamp']}</small>
-        </div>
-        """, unsafe_allow_html=True)
+    st.rerun()
+
+
+def _log_html(log):
+    """Build the HTML card for one execution log entry."""
+    esc = lambda value: html.escape(str(value))
+    kind = log.get("type")
+    details = ""
     
-    elif log["type"] == "orchestrator_complete":
-        st.markdown(f"""
-        <div style="background-color: #10b981; padding: 10px; border-radius: 8px; margin: 5px 0;">
-            <strong>🎉 Orchestrator Completed</strong><br>
-            <small>⏰ {log['timestamp']}</small>
-        </div>
-        """, unsafe_allow_html=True)
+    if kind == "orchestrator_start":
+        color, body = "#6366f1", "<strong>🎯 Orchestrator Started</strong>"
+    elif kind == "agent_delegation":
+        color = "#8b5cf6"
+        body = f"<strong>🎯 Delegated to {esc(log['agent'])} Agent</strong><br><strong>Task:</strong> {esc(log['task'])}"
+    elif kind == "agent_start":
+        color, body = "#1e40af", f"<strong>🚀 {esc(log['agent'])} Started</strong>"
+    elif kind == "decision":
+        color = "#7c3aed"
+        body = f"<strong>🧠 Decision (Iteration {esc(log['iteration'])}):</strong> {esc(log['decision'])}"
+    elif kind == "tool_call":
+        color, body = "#059669", f"<strong>🔧 Tool Called:</strong> {esc(log['tool_name'])}"
+        params = log.get("tool_input") or {}
+        if "query" in params:
+            query = esc(params["query"]).replace("\n", "<br>")
+            details += f'<div style="font-family: monospace; background-color: #1e293b; padding: 8px; border-radius: 6px; margin: 5px 0;">{query}</div>'
+        if "explanation" in params:
+            details += f"<div><small>💡 {esc(params['explanation'])}</small></div>"
+        if log["tool_name"] == "forecast_data":
+            details += (
+                f"<div><small>📊 <strong>Forecast Parameters:</strong> "
+                f"Metric: {esc(params.get('metric'))} | Category: {esc(params.get('category', 'All'))} | "
+                f"Periods: {esc(params.get('periods_ahead'))} {esc(params.get('period_type'))}(s)</small></div>"
+            )
+    elif kind == "tool_result":
+        color = "#059669" if log.get("success") else "#dc2626"
+        body = (
+            f"<strong>✅ Tool Result:</strong> {esc(log['tool_name'])}<br>"
+            f"<strong>Status:</strong> {'Success ✓' if log.get('success') else 'Failed ✗'}"
+        )
+        if log.get("row_count"):
+            body += f"<br><strong>Rows:</strong> {esc(log['row_count'])}"
+        if log.get("error"):
+            body += f"<br><strong>Error:</strong> {esc(log['error'])}"
+    elif kind == "chart_failed":
+        color = "#dc2626"
+        body = f"<strong>🖼️ Chart Rendering Failed:</strong> {esc(log['filename'])}<br><strong>Error:</strong> {esc(log['error'])}"
+    elif kind == "agent_complete":
+        color = "#047857"
+        body = (
+            f"<strong>🏁 {esc(log['agent'])} Completed</strong><br>"
+            f"<strong>Response Length:</strong> {esc(log['response_length'])} characters"
+        )
+    elif kind == "orchestrator_complete":
+        color, body = "#10b981", "<strong>🎉 Orchestrator Completed</strong>"
+    elif kind == "profile":
+        color = "#475569"
+        body = (
+            f"<strong>🔬 Profile Saved</strong> · peak {esc(log['peak_memory_mb'])} MiB traced<br>"
+            f"<strong>CPU:</strong> <code>{esc(log['pstats_path'])}</code><br>"
+            f"<strong>Allocations:</strong> <code>{esc(log['allocations_path'])}</code>"
+        )
+        rows = "".join(
+            f"<tr><td>{esc(entry['function'])}</td><td>{entry['calls']:,}</td>"
+            f"<td>{entry['self_ms']:,.1f}</td><td>{entry['cumulative_ms']:,.1f}</td></tr>"
+            for entry in log.get("top_functions", [])
+        )
+        if rows:
+            details += (
+                '<table style="font-size: 0.8em; margin: 5px 0;"><tr><th>Function</th><th>Calls</th>'
+                f'<th>Self ms</th><th>Cumulative ms</th></tr>{rows}</table>'
+            )
+    else:
+        return ""
+    
+    duration = f" · ⏱️ {log['duration_ms']:,.0f} ms" if log.get("duration_ms") is not None else ""
+    return (
+        f'<div style="background-color: {color}; padding: 10px; border-radius: 8px; margin: 5px 0;">'
+        f'{body}<br><small>⏰ {esc(log.get("timestamp", ""))}{duration}</small></div>{details}'
+    )
+
+
+def _logs_html(logs):
+    """Build the HTML for a list of execution log entries."""
+    return "\n".join(filter(None, (_log_html(log) for log in logs)))
 
 
-def _render_execution_logs(logs):
-    """Render execution logs in an expander."""
-    with st.expander("🔍 View Execution Details", expanded=False):
-        for log in logs:
-            if log["type"] == "orchestrator_start":
-                st.markdown(f"""
-                <div style="background-color: #6366f1; padding: 10px; border-radius: 8px; margin: 5px 0;">
-                    <strong>🎯 Orchestrator Started</strong><br>
-                    <small>⏰ {log['timestamp']}</small>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            elif log["type"] == "agent_delegation":
-                st.markdown(f"""
-                <div style="background-color: #8b5cf6; padding: 10px; border-radius: 8px; margin: 5px 0;">
-                    <strong>🎯 Delegated to {log['agent']} Agent</strong><br>
-                    <strong>Task:</strong> {log['task']}<br>
-                    <small>⏰ {log['timestamp']}</small>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            elif log["type"] == "tool_call":
-                st.markdown(f"""
-                <div style="background-color: #059669; padding: 10px; border-radius: 8px; margin: 5px 0;">
-                    <strong>🔧 Tool Called:</strong> {log['tool_name']}<br>
-                    <small>⏰ {log['timestamp']}</small>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                if log.get("tool_input"):
-                    if "query" in log["tool_input"]:
-                        st.code(log["tool_input"]["query"], language="sql")
-                    if "explanation" in log["tool_input"]:
-                        st.caption(f"💡 {log['tool_input']['explanation']}")
-            
-            elif log["type"] == "tool_result":
-                success_color = "#059669" if log.get("success") else "#dc2626"
-                st.markdown(f"""
-                <div style="background-color: {success_color}; padding: 10px; border-radius: 8px; margin: 5px 0;">
-                    <strong>✅ Tool Result:</strong> {log['tool_name']}<br>
-                    <strong>Status:</strong> {'Success ✓' if log.get('success') else 'Failed ✗'}<br>
-                    {f"<strong>Rows:</strong> {log.get('row_count')}<br>" if log.get('row_count') else ''}
-                    <small>⏰ {log['timestamp']}</small>
-                </div>
-                """, unsafe_allow_html=True)
+def _render_execution_logs(message):
+    """Render a message's execution logs, building the HTML only when opened and only once."""
+    if not st.toggle("🔍 View Execution Details", key=f"logs_{message['timestamp']}"):
+        return
+    
+    if "logs_html" not in message:
+        message["logs_html"] = _logs_html(message["execution_logs"])
+    st.markdown(message["logs_html"], unsafe_allow_html=True)
+
+
+def _render_charts(message):
+    """Render charts attached to an assistant message."""
+    for i, chart in enumerate(message["charts"]):
+        if chart["kind"] == "plotly":
+            st.plotly_chart(
+                figure_from_spec(chart["spec"]),
+                use_container_width=True,
+                key=f"chart_{message['timestamp']}_{i}"
+            )
+        elif os.path.exists(chart["path"]):
+            st.image(chart["path"], caption=chart.get("title"))
+        else:
+            st.caption(f"🖼️ {chart.get('title', 'Chart')} is still rendering: {chart['path']}")
 
 
 def _render_data_preview(message):
@@ -315,8 +370,9 @@ def _render_forecast_data(forecast_data, timestamp):
 
 def _render_regular_data(data, timestamp):
     """Render regular query results."""
-    df = pd.DataFrame(data)
-    st.dataframe(df, use_container_width=True)
+    data = ColumnarResult.coerce(data)
+    # Arrow tables go to the frontend without a pandas round trip
+    st.dataframe(data.table, use_container_width=True)
     
     col1, col2 = st.columns(2)
     with col1:
@@ -325,7 +381,7 @@ def _render_regular_data(data, timestamp):
             st.success("✅ Data pinned! Go to Dashboard Builder to visualize.")
             st.info("💡 Or use the new Dashboard Builder to select tables directly!")
     with col2:
-        csv = df.to_csv(index=False)
+        csv = data.to_pandas().to_csv(index=False)
         st.download_button(
             "💾 Download CSV",
             csv,
@@ -1,10 +1,22 @@
 # ============================================================================
 # File: streamlit_app/pages/dashboard.py
 # ============================================================================
+import time
 import streamlit as st
 import pandas as pd
 from streamlit_app.utils import create_plotly_chart
-import json
+from streamlit_app.widget_data import (
+    AGGREGATIONS, TIME_BUCKETS, apply_widget_result, describe_aggregation,
+    fetch_widget_data, fetch_widgets, submit_widget_fetch
+)
+from streamlit_app.dashboard_store import export_config, get_dashboard_store, import_config
+from utils.metadata_cache import get_schema_cache
+
+
+REFRESH_INTERVALS = {"Off": 0, "30 seconds": 30, "1 minute": 60, "5 minutes": 300, "15 minutes": 900}
+
+# How often auto-refreshing widgets check for due or finished fetches
+AUTO_REFRESH_TICK = 5
 
 
 def render_dashboard_page():
@@ -21,67 +33,143 @@ def render_dashboard_page():
         _render_dashboard()
 
 
-def _get_available_tables():
-    """Get list of tables from database."""
+def _get_catalog():
+    """Get table and column metadata from the process-wide schema cache."""
     if not st.session_state.multi_agent_system:
-        return []
+        return {}
     
     try:
-        query = """
-        SELECT table_name 
-        FROM information_schema.tables 
-        WHERE table_schema = 'public' 
-        ORDER BY table_name;
-        """
-        conn = st.session_state.multi_agent_system.sql_agent.get_db_connection()
-        df = pd.read_sql(query, conn)
-        conn.close()
-        return df['table_name'].tolist()
+        return st.session_state.multi_agent_system.sql_agent.get_catalog()
     except Exception as e:
         st.error(f"Error fetching tables: {e}")
-        return []
+        return {}
+
+
+def _get_available_tables():
+    """Get list of tables from database."""
+    return list(_get_catalog().keys())
 
 
 def _get_table_columns(table_name):
     """Get columns for a specific table."""
+    return [column['name'] for column in _get_catalog().get(table_name, [])]
+
+
+def _get_column_type(table_name, column_name):
+    """Get the Postgres data type of a column."""
+    for column in _get_catalog().get(table_name, []):
+        if column['name'] == column_name:
+            return column['type']
+    return None
+
+
+def _fetch_widget_data(widget):
+    """Fetch a widget's rows, aggregated in Postgres when the widget asks for it."""
     if not st.session_state.multi_agent_system:
-        return []
+        return None
     
     try:
-        query = f"""
-        SELECT column_name, data_type
-        FROM information_schema.columns
-        WHERE table_schema = 'public' AND table_name = '{table_name}'
-        ORDER BY ordinal_position;
-        """
-        conn = st.session_state.multi_agent_system.sql_agent.get_db_connection()
-        df = pd.read_sql(query, conn)
-        conn.close()
-        return df['column_name'].tolist()
+        return fetch_widget_data(widget, st.session_state.multi_agent_system.sql_agent.get_db_connection)
     except Exception as e:
-        st.error(f"Error fetching columns: {e}")
-        return []
+        st.error(f"Error fetching data: {e}")
+        return None
+
+
+def _refresh_all_widgets():
+    """Fetch every widget concurrently, sharing identical queries, then rerun once."""
+    widgets = st.session_state.dashboard_widgets
+    connect = st.session_state.multi_agent_system.sql_agent.get_db_connection
+    
+    with st.spinner(f"Refreshing {len(widgets)} widgets..."):
+        results = fetch_widgets(widgets, connect)
+    # Background fetches started before this one would only overwrite fresher data
+    st.session_state.get('widget_refresh_futures', {}).clear()
+    
+    failed = 0
+    for widget in widgets:
+        result = results[widget['id']]
+        if isinstance(result, Exception):
+            widget['refresh_error'] = str(result)
+            failed += 1
+        else:
+            apply_widget_result(widget, result)
+    
+    if failed:
+        st.session_state.dashboard_notice = f"⚠️ {failed} of {len(widgets)} widgets failed to refresh"
+    st.rerun()
 
 
-def _fetch_table_data(table_name, x_column, y_column, limit=1000):
-    """Fetch data from selected table."""
+def _poll_auto_refresh(widget):
+    """Collect a finished background fetch, or start one when the widget is due."""
+    futures = st.session_state.setdefault('widget_refresh_futures', {})
+    future = futures.get(widget['id'])
+    
+    if future is not None:
+        if future.done():
+            del futures[widget['id']]
+            try:
+                apply_widget_result(widget, future.result())
+            except Exception as e:
+                widget['refresh_error'] = str(e)
+                widget['refreshed_at'] = time.time()
+        return
+    
+    if st.session_state.multi_agent_system and widget.get('refresh_interval') and \
+            time.time() - widget.get('refreshed_at', 0) >= widget['refresh_interval']:
+        futures[widget['id']] = submit_widget_fetch(
+            widget, st.session_state.multi_agent_system.sql_agent.get_db_connection
+        )
+
+
+def _revalidate_widgets(widgets):
+    """Start background fetches for widgets; their charts pick up the results when done."""
     if not st.session_state.multi_agent_system:
-        return None
+        return
+    connect = st.session_state.multi_agent_system.sql_agent.get_db_connection
+    futures = st.session_state.setdefault('widget_refresh_futures', {})
+    futures.clear()
+    for widget in widgets:
+        futures[widget['id']] = submit_widget_fetch(widget, connect)
+
+
+def _render_widget_chart(widget):
+    """Render a widget's chart and status captions."""
+    if widget.get('refresh_error'):
+        st.warning(f"Last refresh failed: {widget['refresh_error']}")
+    
+    if widget.get('data') is None:
+        st.info("⏳ Loading data...")
+        return
     
     try:
-        query = f"""
-        SELECT "{x_column}", "{y_column}"
-        FROM {table_name}
-        WHERE "{x_column}" IS NOT NULL AND "{y_column}" IS NOT NULL
-        LIMIT {limit};
-        """
-        conn = st.session_state.multi_agent_system.sql_agent.get_db_connection()
-        df = pd.read_sql(query, conn)
-        conn.close()
-        return df.to_dict('records')
+        fig = create_plotly_chart(
+            widget['data'],
+            widget['type'],
+            widget['x_col'],
+            widget['y_col'],
+            widget['title']
+        )
+        st.plotly_chart(fig, use_container_width=True, key=f"widget_chart_{widget['id']}")
+        downsampling = fig.layout.meta
+        if downsampling and downsampling.get("downsampled"):
+            st.caption(f"📉 Showing {downsampling['plotted_points']:,} of {downsampling['original_points']:,} points")
     except Exception as e:
-        st.error(f"Error fetching data: {e}")
-        return None
+        st.error(f"Error rendering chart: {e}")
+    
+    if widget.get('snapshot_at'):
+        st.caption(f"📦 Saved snapshot from {time.strftime('%Y-%m-%d %H:%M', time.localtime(widget['snapshot_at']))}")
+    elif widget.get('refresh_interval') and widget.get('refreshed_at'):
+        st.caption(f"⏱️ Updated {time.strftime('%H:%M:%S', time.localtime(widget['refreshed_at']))}")
+
+
+@st.fragment(run_every=AUTO_REFRESH_TICK)
+def _render_live_widget_chart(widget_id):
+    """Auto-refreshing or revalidating chart; only this fragment reruns, and fetches run off the script thread."""
+    widget = next((w for w in st.session_state.dashboard_widgets if w['id'] == widget_id), None)
+    if widget is None:
+        return
+    _poll_auto_refresh(widget)
+    _render_widget_chart(widget)
 
 
 def _render_widget_creator():
@@ -91,6 +179,10 @@ def _render_widget_creator():
     # Get available tables
     tables = _get_available_tables()
     
+    if st.button("🔄 Reload Schema", help="Pick up new tables and columns"):
+        get_schema_cache().invalidate()
+        st.rerun()
+    
     if not tables:
         st.warning("⚠️ No tables found in database. Check your connection.")
         return
@@ -129,26 +221,60 @@ def _render_widget_creator():
                 y_columns_available = [col for col in columns if col != x_column]
                 y_column = st.selectbox("Y-Axis Column", y_columns_available)
             
-            data_limit = st.slider("Data Limit (rows)", 100, 10000, 1000, 100)
+            aggregation = st.selectbox(
+                "Aggregation",
+                ["None (raw rows)"] + list(AGGREGATIONS.keys()),
+                help="Group by the X column and aggregate Y in the database"
+            )
+            
+            col_c, col_d = st.columns(2)
+            with col_c:
+                time_bucket = st.selectbox("Time Bucket", ["None"] + TIME_BUCKETS,
+                                           help="Used when X is a date/timestamp column")
+            with col_d:
+                bins = st.number_input("Numeric Bins", 0, 200, 0,
+                                       help="Used when X is numeric; 0 groups by exact values")
+            
+            data_limit = st.slider("Data Limit (rows)", 100, 10000, 1000, 100,
+                                   help="Only applies to raw rows")
+            
+            watermark_column = st.selectbox(
+                "Watermark Column",
+                ["None"] + columns,
+                help="Monotonically increasing column (timestamp or id). Raw-row widgets "
+                     "then refresh by fetching only rows past the last one seen."
+            )
+            
+            refresh_interval = st.selectbox("Auto-refresh", list(REFRESH_INTERVALS.keys()))
             
             submitted = st.form_submit_button("➕ Add to Dashboard", use_container_width=True)
             
             if submitted:
                 with st.spinner("Fetching data..."):
+                    widget = {
+                        "id": max((w['id'] for w in st.session_state.dashboard_widgets), default=-1) + 1,
+                        "title": widget_title,
+                        "type": chart_type,
+                        "table": selected_table,
+                        "x_col": x_column,
+                        "y_col": y_column,
+                        "x_type": _get_column_type(selected_table, x_column),
+                        "aggregation": None if aggregation not in AGGREGATIONS else {
+                            "function": aggregation,
+                            "time_bucket": None if time_bucket == "None" else time_bucket,
+                            "bins": int(bins) or None
+                        },
+                        "data_limit": data_limit,
+                        "watermark_col": None if watermark_column == "None" else watermark_column,
+                        "watermark": None,
+                        "refresh_interval": REFRESH_INTERVALS[refresh_interval]
+                    }
+                    
                     # Fetch data from database
-                    data = _fetch_table_data(selected_table, x_column, y_column, data_limit)
+                    result = _fetch_widget_data(widget)
                     
-                    if data:
-                        widget = {
-                            "id": len(st.session_state.dashboard_widgets),
-                            "title": widget_title,
-                            "type": chart_type,
-                            "table": selected_table,
-                            "x_col": x_column,
-                            "y_col": y_column,
-                            "data": data,
-                            "data_limit": data_limit
-                        }
+                    if result and result["data"]:
+                        apply_widget_result(widget, result)
                         st.session_state.dashboard_widgets.append(widget)
                         st.success(f"✅ Widget '{widget_title}' added!")
                         st.rerun()
@@ -164,8 +290,10 @@ def _render_widget_creator():
                 try:
                     query = f"SELECT * FROM {selected_table} LIMIT 10;"
                     conn = st.session_state.multi_agent_system.sql_agent.get_db_connection()
-                    preview_df = pd.read_sql(query, conn)
-                    conn.close()
+                    try:
+                        preview_df = pd.read_sql(query, conn)
+                    finally:
+                        conn.close()
                     
                     st.dataframe(preview_df, use_container_width=True)
                     st.caption(f"Showing first 10 rows from {selected_table}")
@@ -173,11 +301,72 @@ def _render_widget_creator():
                     st.error(f"Error loading preview: {e}")
 
 
+def _render_saved_dashboards():
+    """Save, load, delete and import dashboards from the persistent store."""
+    store = get_dashboard_store()
+    
+    with st.expander("💾 Saved Dashboards"):
+        if st.session_state.dashboard_widgets:
+            save_col1, save_col2 = st.columns([3, 1])
+            with save_col1:
+                name = st.text_input("Dashboard Name", st.session_state.get('dashboard_name', ''),
+                                     label_visibility="collapsed", placeholder="Dashboard name")
+            with save_col2:
+                if st.button("💾 Save", use_container_width=True) and name:
+                    store.save(name, st.session_state.dashboard_widgets)
+                    st.session_state.dashboard_name = name
+                    st.success(f"✅ Saved '{name}' with data snapshots")
+        
+        saved = store.list()
+        if saved:
+            labels = {
+                f"{d['name']} ({d['widgets']} widgets, {time.strftime('%Y-%m-%d %H:%M', time.localtime(d['updated_at']))})": d['name']
+                for d in saved
+            }
+            selected = st.selectbox("Saved dashboards", list(labels.keys()))
+            load_col, delete_col = st.columns(2)
+            with load_col:
+                if st.button("📂 Load", use_container_width=True):
+                    # Show the snapshots immediately and revalidate against the database
+                    widgets = store.load(labels[selected])
+                    st.session_state.dashboard_widgets = widgets
+                    st.session_state.dashboard_name = labels[selected]
+                    _revalidate_widgets(widgets)
+                    st.rerun()
+            with delete_col:
+                if st.button("🗑️ Delete", use_container_width=True):
+                    store.delete(labels[selected])
+                    st.rerun()
+        
+        uploaded = st.file_uploader("Import configuration", type="json")
+        if uploaded is not None and st.button("📥 Import", use_container_width=True):
+            try:
+                widgets = import_config(uploaded.getvalue().decode('utf-8'))
+            except ValueError as e:
+                st.error(f"Invalid dashboard configuration: {e}")
+            else:
+                st.session_state.dashboard_widgets = widgets
+                _revalidate_widgets(widgets)
+                st.rerun()
+
+
 def _render_dashboard():
     """Render the dashboard with widgets."""
     st.subheader("📈 Your Dashboard")
     
+    _render_saved_dashboards()
+    
+    if st.session_state.get('dashboard_notice'):
+        st.warning(st.session_state.pop('dashboard_notice'))
+    
     if st.session_state.dashboard_widgets:
+        if st.session_state.multi_agent_system and \
+                st.button("🔄 Refresh All", help="Fetch every widget concurrently"):
+            _refresh_all_widgets()
+        
+        # Widgets with a background fetch in flight poll for its result
+        pending = st.session_state.get('widget_refresh_futures', {})
+        
         # Display widgets in a grid
         for i in range(0, len(st.session_state.dashboard_widgets), 2):
             cols = st.columns(2)
@@ -196,14 +385,9 @@ def _render_dashboard():
                             with widget_col2:
                                 if st.button("🔄", key=f"refresh_{widget['id']}", help="Refresh data"):
                                     # Refresh widget data
-                                    new_data = _fetch_table_data(
-                                        widget['table'], 
-                                        widget['x_col'], 
-                                        widget['y_col'],
-                                        widget.get('data_limit', 1000)
-                                    )
-                                    if new_data:
-                                        st.session_state.dashboard_widgets[idx]['data'] = new_data
+                                    result = _fetch_widget_data(widget)
+                                    if result:
+                                        apply_widget_result(widget, result)
                                         st.success("✅ Refreshed!")
                                         st.rerun()
                             with widget_col3:
@@ -212,34 +396,21 @@ def _render_dashboard():
                                     st.rerun()
                             
                             # Show table and columns info
-                            st.caption(f"📋 {widget['table']} | X: {widget['x_col']} | Y: {widget['y_col']}")
+                            st.caption(f"📋 {widget['table']} | X: {widget['x_col']} | Y: {widget['y_col']} | {describe_aggregation(widget)}")
                             
                             # Chart
-                            try:
-                                fig = create_plotly_chart(
-                                    widget['data'],
-                                    widget['type'],
-                                    widget['x_col'],
-                                    widget['y_col'],
-                                    widget['title']
-                                )
-                                st.plotly_chart(fig, use_container_width=True)
-                            except Exception as e:
-                                st.error(f"Error rendering chart: {e}")
+                            if widget.get('refresh_interval') or widget['id'] in pending:
+                                _render_live_widget_chart(widget['id'])
+                            else:
+                                _render_widget_chart(widget)
         
         # Export dashboard
         st.divider()
         col1, col2 = st.columns(2)
         with col1:
             if st.button("💾 Export Dashboard Configuration", use_container_width=True):
-                # Remove data from config for smaller file
-                export_config = []
-                for widget in st.session_state.dashboard_widgets:
-                    export_widget = widget.copy()
-                    export_widget.pop('data', None)  # Remove data, keep structure
-                    export_config.append(export_widget)
-                
-                config = json.dumps(export_config, indent=2)
+                # Configuration only; data is refetched on import
+                config = export_config(st.session_state.dashboard_widgets)
                 st.download_button(
                     "Download JSON",
                     config,
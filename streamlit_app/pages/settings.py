@@ -43,11 +43,7 @@ DB_PORT=***********
         if st.button("🧠 Clear Agent Memory", use_container_width=True):
             # Clear conversation history from all agents
             if st.session_state.multi_agent_system:
-                st.session_state.multi_agent_system.orchestrator.conversation_history = []
-                st.session_state.multi_agent_system.sql_agent.conversation_history = []
-                st.session_state.multi_agent_system.viz_agent.conversation_history = []
-                st.session_state.multi_agent_system.analyst_agent.conversation_history = []
-                st.session_state.multi_agent_system.forecast_agent.conversation_history = []
+                st.session_state.multi_agent_system.clear_memory()
                 st.success("Agent memory cleared!")
             st.rerun()
     
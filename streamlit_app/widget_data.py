@@ -0,0 +1,313 @@
+# ============================================================================
+# File: streamlit_app/widget_data.py
+# ============================================================================
+import os
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List
+import pandas as pd
+from psycopg2 import sql
+from utils.columnar import ColumnarResult
+from utils.sql_statistics import NUMERIC_TYPE_OIDS
+
+
+AGGREGATIONS = {
+    "Sum": "sum",
+    "Average": "avg",
+    "Count": "count",
+    "Min": "min",
+    "Max": "max"
+}
+TIME_BUCKETS = ["hour", "day", "week", "month", "quarter", "year"]
+TIME_TYPES = {"date", "timestamp without time zone", "timestamp with time zone"}
+NUMERIC_TYPES = {"smallint", "integer", "bigint", "numeric", "real", "double precision"}
+
+# Aggregated widgets never fetch more points than this
+MAX_AGGREGATED_POINTS = 500
+# Bins used when an unbucketed numeric x has more distinct values than that
+DEFAULT_BINS = 100
+# Seconds per time bucket, to pick one that fits a time range into MAX_AGGREGATED_POINTS
+_BUCKET_SECONDS = {
+    "hour": 3600, "day": 86400, "week": 7 * 86400, "month": 30.44 * 86400,
+    "quarter": 91.31 * 86400, "year": 365.25 * 86400
+}
+
+# Fields that determine a widget's query; widgets that agree on them share one fetch
+QUERY_FIELDS = ("table", "x_col", "y_col", "x_type", "aggregation", "data_limit", "watermark_col", "watermark")
+
+_executor = None
+_executor_lock = threading.Lock()
+_in_flight = {}  # query key -> Future
+
+
+def _is_bucketed(widget: Dict) -> bool:
+    """Whether the widget's aggregation buckets its x column rather than grouping by exact values."""
+    aggregation = widget["aggregation"]
+    x_type = widget.get("x_type")
+    return bool(
+        (aggregation.get("time_bucket") and x_type in TIME_TYPES)
+        or (aggregation.get("bins") and x_type in NUMERIC_TYPES)
+    )
+
+
+def _x_expression(widget: Dict, x: sql.Composable) -> sql.Composable:
+    """Bucket the x column in Postgres according to the widget's aggregation spec."""
+    aggregation = widget["aggregation"]
+    x_type = widget.get("x_type")
+
+    if aggregation.get("time_bucket") and x_type in TIME_TYPES:
+        return sql.SQL("date_trunc({}, {})").format(sql.Literal(aggregation["time_bucket"]), x)
+
+    if aggregation.get("bins") and x_type in NUMERIC_TYPES:
+        # Bucket midpoint; width_bucket puts the maximum in bin n + 1, so clamp it
+        return sql.SQL(
+            "CASE WHEN bounds.hi > bounds.lo "
+            "THEN bounds.lo + (LEAST(width_bucket({x}::float8, bounds.lo, bounds.hi, {n}), {n}) - 0.5) "
+            "* (bounds.hi - bounds.lo) / {n} "
+            "ELSE bounds.lo END"
+        ).format(x=x, n=sql.Literal(int(aggregation["bins"])))
+
+    return x
+
+
+def build_widget_query(widget: Dict) -> sql.Composed:
+    """Build the SELECT for a widget: raw rows, or grouped and bucketed aggregates."""
+    table = sql.Identifier(*widget["table"].split('.'))
+    x = sql.Identifier(widget["x_col"])
+    y = sql.Identifier(widget["y_col"])
+    not_null = sql.SQL("{} IS NOT NULL AND {} IS NOT NULL").format(x, y)
+
+    if not widget.get("aggregation"):
+        limit = sql.Literal(int(widget.get("data_limit", 1000)))
+        if not widget.get("watermark_col"):
+            return sql.SQL("SELECT {x}, {y} FROM {table} WHERE {not_null} LIMIT {limit}").format(
+                x=x, y=y, table=table, not_null=not_null, limit=limit
+            )
+
+        watermark = sql.Identifier(widget["watermark_col"])
+        columns = [x, y] if widget["watermark_col"] in (widget["x_col"], widget["y_col"]) else [x, y, watermark]
+        parts = dict(
+            columns=sql.SQL(", ").join(columns), table=table, not_null=not_null, wm=watermark, limit=limit
+        )
+        if widget.get("watermark") is None:
+            # Latest window; fetch_widget_data restores ascending order
+            return sql.SQL(
+                "SELECT {columns} FROM {table} WHERE {not_null} AND {wm} IS NOT NULL "
+                "ORDER BY {wm} DESC LIMIT {limit}"
+            ).format(**parts)
+        # Newest rows past the watermark, so a burst larger than the window is not fetched oldest first
+        return sql.SQL(
+            "SELECT {columns} FROM {table} WHERE {not_null} AND {wm} > {since} "
+            "ORDER BY {wm} DESC LIMIT {limit}"
+        ).format(since=sql.Literal(widget["watermark"]), **parts)
+
+    aggregation = widget["aggregation"]
+    function = AGGREGATIONS.get(aggregation["function"], aggregation["function"])
+    if function not in AGGREGATIONS.values():
+        raise ValueError(f"Unsupported aggregation: {function}")
+
+    y_expression = y if function in ("count", "min", "max") else sql.SQL("{}::float8").format(y)
+    source = table
+    if aggregation.get("bins") and widget.get("x_type") in NUMERIC_TYPES:
+        source = sql.SQL(
+            "{table} CROSS JOIN (SELECT min({x})::float8 AS lo, max({x})::float8 AS hi "
+            "FROM {table} WHERE {not_null}) AS bounds"
+        ).format(table=table, x=x, not_null=not_null)
+
+    return sql.SQL(
+        "SELECT {x_expression} AS {x_alias}, {function}({y_expression}) AS {y_alias} "
+        "FROM {source} WHERE {not_null} GROUP BY 1 ORDER BY 1 LIMIT {limit}"
+    ).format(
+        x_expression=_x_expression(widget, x),
+        x_alias=x,
+        function=sql.SQL(function),
+        y_expression=y_expression,
+        y_alias=y,
+        source=source,
+        not_null=not_null,
+        # One extra group tells fetch_widget_data the result was cut off
+        limit=sql.Literal(MAX_AGGREGATED_POINTS + 1)
+    )
+
+
+def default_bucketing(widget: Dict, cursor) -> Dict:
+    """Bucketing for an unbucketed time or numeric x that has too many distinct values, else None.
+
+    Time columns get the finest bucket that fits their range into
+    MAX_AGGREGATED_POINTS; numeric columns get DEFAULT_BINS bins.
+    """
+    x_type = widget.get("x_type")
+    if x_type in NUMERIC_TYPES:
+        return {"bins": DEFAULT_BINS}
+    if x_type not in TIME_TYPES:
+        return None
+
+    x = sql.Identifier(widget["x_col"])
+    cursor.execute(sql.SQL(
+        "SELECT extract(epoch FROM max({x})::timestamp - min({x})::timestamp) FROM {table} WHERE {x} IS NOT NULL"
+    ).format(x=x, table=sql.Identifier(*widget["table"].split('.'))))
+    span_seconds = float(cursor.fetchone()[0] or 0)
+    bucket = next(
+        (bucket for bucket in TIME_BUCKETS if span_seconds / _BUCKET_SECONDS[bucket] <= MAX_AGGREGATED_POINTS),
+        TIME_BUCKETS[-1]
+    )
+    return {"time_bucket": bucket}
+
+
+def is_incremental(widget: Dict) -> bool:
+    """Whether the widget's next fetch only asks for rows past its watermark."""
+    return bool(widget.get("watermark_col")) and not widget.get("aggregation") and widget.get("watermark") is not None
+
+
+def fetch_widget_data(widget: Dict, connect: Callable) -> Dict:
+    """Run a widget's query.
+
+    Returns {"data": ColumnarResult, "watermark": newest watermark value, "since": the watermark
+    the query started from (None for a full fetch), "gap": whether rows between the watermark and
+    the fetched ones were skipped because more than data_limit arrived, "bucketing": the bucketing applied because
+    an unbucketed x had too many groups (or None), "truncated": whether aggregated groups were
+    cut off at MAX_AGGREGATED_POINTS}.
+    """
+    bucketing = None
+    conn = connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(build_widget_query(widget))
+        rows = cursor.fetchall()
+        if widget.get("aggregation") and len(rows) > MAX_AGGREGATED_POINTS and not _is_bucketed(widget):
+            bucketing = default_bucketing(widget, cursor)
+            if bucketing:
+                cursor.execute(build_widget_query(dict(widget, aggregation=dict(widget["aggregation"], **bucketing))))
+                rows = cursor.fetchall()
+        columns = [col.name for col in cursor.description]
+        numeric = [col.name for col in cursor.description if col.type_code in NUMERIC_TYPE_OIDS]
+        cursor.close()
+    finally:
+        conn.close()
+
+    truncated = bool(widget.get("aggregation")) and len(rows) > MAX_AGGREGATED_POINTS
+    if truncated:
+        rows = rows[:MAX_AGGREGATED_POINTS]
+
+    since = widget.get("watermark") if is_incremental(widget) else None
+    watermark = None
+    # A full window of new rows may have skipped older new ones
+    gap = since is not None and len(rows) >= int(widget.get("data_limit", 1000))
+    if widget.get("watermark_col") and not widget.get("aggregation"):
+        # Watermark queries fetch newest first; restore ascending order
+        rows.reverse()
+        # Keep the raw database value so it can be bound back into the next query
+        index = columns.index(widget["watermark_col"])
+        watermark = rows[-1][index] if rows else since
+
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    # NUMERIC arrives as Decimal; plot it as float
+    for column in numeric:
+        df[column] = pd.to_numeric(df[column], errors='coerce').astype(float)
+    return {
+        "data": ColumnarResult.from_pandas(df),
+        "watermark": watermark,
+        "since": since,
+        "gap": gap,
+        "bucketing": bucketing,
+        "truncated": truncated
+    }
+
+
+def apply_widget_result(widget: Dict, result: Dict) -> bool:
+    """Store a fetch result on the widget, merging incremental rows into the current window.
+
+    An incremental result that skipped rows (see fetch_widget_data) replaces the
+    window instead, as the initial fetch does, so old and new rows are not joined
+    across the gap. Returns False when the result is stale (the widget moved past
+    its starting watermark).
+    """
+    if result["since"] is not None and result["since"] != widget.get("watermark"):
+        return False
+    if result["since"] is not None and not result.get("gap"):
+        limit = int(widget.get("data_limit", 1000))
+        widget["data"] = ColumnarResult.coerce(widget.get("data")).append(result["data"], keep_last=limit)
+    else:
+        widget["data"] = result["data"]
+
+    widget["watermark"] = result["watermark"]
+    widget["auto_bucketing"] = result.get("bucketing")
+    widget["truncated"] = result.get("truncated", False)
+    widget["refreshed_at"] = time.time()
+    widget.pop("refresh_error", None)
+    widget.pop("snapshot_at", None)
+    return True
+
+
+def describe_aggregation(widget: Dict) -> str:
+    """Short human-readable description of a widget's aggregation."""
+    aggregation = widget.get("aggregation")
+    if not aggregation:
+        if widget.get("watermark_col"):
+            return f"latest {widget.get('data_limit', 1000):,} rows by {widget['watermark_col']}"
+        return f"first {widget.get('data_limit', 1000):,} rows"
+
+    text = f"{aggregation['function']} of {widget['y_col']} by {widget['x_col']}"
+    auto = widget.get("auto_bucketing") or {}
+    if aggregation.get("time_bucket") and widget.get("x_type") in TIME_TYPES:
+        text += f" per {aggregation['time_bucket']}"
+    elif aggregation.get("bins") and widget.get("x_type") in NUMERIC_TYPES:
+        text += f" in {aggregation['bins']} bins"
+    elif auto.get("time_bucket"):
+        text += f" per {auto['time_bucket']} (auto: too many distinct values)"
+    elif auto.get("bins"):
+        text += f" in {auto['bins']} bins (auto: too many distinct values)"
+    if widget.get("truncated"):
+        text += f", first {MAX_AGGREGATED_POINTS:,} groups only"
+    return text
+
+
+def widget_query_key(widget: Dict) -> str:
+    """Canonical key of the query a widget runs."""
+    return json.dumps({field: widget.get(field) for field in QUERY_FIELDS}, sort_keys=True, default=str)
+
+
+def get_fetch_executor() -> ThreadPoolExecutor:
+    """Process-wide bounded pool for widget fetches, shared by every session."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv('DASHBOARD_FETCH_WORKERS', 4)),
+                thread_name_prefix="widget-fetch"
+            )
+        return _executor
+
+
+def submit_widget_fetch(widget: Dict, connect: Callable) -> Future:
+    """Fetch a widget in the background, joining an identical fetch already in flight."""
+    key = widget_query_key(widget)
+    executor = get_fetch_executor()
+    with _executor_lock:
+        future = _in_flight.get(key)
+        if future is not None:
+            return future
+        future = executor.submit(fetch_widget_data, dict(widget), connect)
+        _in_flight[key] = future
+
+    def _release(done: Future):
+        with _executor_lock:
+            if _in_flight.get(key) is done:
+                del _in_flight[key]
+
+    future.add_done_callback(_release)
+    return future
+
+
+def fetch_widgets(widgets: List[Dict], connect: Callable, timeout: float = None) -> Dict:
+    """Fetch many widgets concurrently; returns {widget id: fetch result or the raised exception}."""
+    futures = {widget["id"]: submit_widget_fetch(widget, connect) for widget in widgets}
+    results = {}
+    for widget_id, future in futures.items():
+        try:
+            results[widget_id] = future.result(timeout=timeout)
+        except Exception as e:
+            results[widget_id] = e
+    return results
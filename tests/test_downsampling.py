@@ -0,0 +1,37 @@
+# ============================================================================
+# File: tests/test_downsampling.py
+# ============================================================================
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from utils.downsampling import downsample_frame
+
+
+def test_downsample_frame_reduces_numeric_scatter():
+    df = pd.DataFrame({"x": np.arange(10000), "y": np.random.default_rng(0).normal(size=10000)})
+
+    result, metadata = downsample_frame(df, "x", "y", "scatter", max_points=500)
+
+    assert metadata["downsampled"]
+    assert 0 < len(result) <= 500
+
+
+def test_downsample_frame_keeps_text_y_unchanged():
+    df = pd.DataFrame({"x": np.arange(10000), "y": np.where(np.arange(10000) % 2, "Rent", "Food")})
+
+    result, metadata = downsample_frame(df, "x", "y", "scatter", max_points=500)
+
+    assert result is df
+    assert not metadata["downsampled"]
+    assert metadata["plotted_points"] == 10000
+
+
+def test_downsample_frame_accepts_decimal_y():
+    df = pd.DataFrame({"x": np.arange(10000), "y": [Decimal(i % 97) for i in range(10000)]})
+
+    result, metadata = downsample_frame(df, "x", "y", "line", max_points=500)
+
+    assert metadata["downsampled"]
+    assert len(result) == 500
@@ -0,0 +1,20 @@
+# ============================================================================
+# File: tests/test_serialization.py
+# ============================================================================
+from utils.serialization import compact_result, round_significant
+
+
+def test_round_significant_keeps_cents_and_small_values():
+    assert round_significant(57936.63, 6) == 57936.63
+    assert round_significant(16220.49, 6) == 16220.49
+    assert round_significant(1234567.891, 6) == 1234567.89
+    assert round_significant(123.456789, 6) == 123.457
+    assert round_significant(0.000042, 6) == 0.000042
+
+
+def test_compact_result_sends_exact_totals():
+    result = {"success": True, "data": [{"category": "Rent", "total": 57936.63, "share": 0.000042}]}
+
+    compact = compact_result(result, "rows", 6)
+
+    assert compact["data"]["rows"] == [("Rent", 57936.63, 0.000042)]
@@ -0,0 +1,34 @@
+# ============================================================================
+# File: tests/test_trend_analysis.py
+# ============================================================================
+import numpy as np
+import pandas as pd
+from utils.trend_analysis import analyze_trends
+
+
+def _noise(seed: int, groups: int = 2, points: int = 36) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "period": list(pd.date_range("2021-01-01", periods=points, freq="MS")) * groups,
+        "value": rng.normal(100, 5, groups * points),
+        "group": np.repeat([f"g{i}" for i in range(groups)], points)
+    })
+
+
+def test_seasonal_adjustment_does_not_flag_pure_noise():
+    # Three cycles of noise: a plain per-phase median zeroed a third of the residuals and flagged the cap
+    assert analyze_trends(_noise(2), group_column="group", season_length=12)["anomalies"] == []
+    for seed in range(20):
+        trends = analyze_trends(_noise(seed), group_column="group", season_length=12)
+        assert sum(row["anomaly_count"] for row in trends["findings"]) <= 1, seed
+
+
+def test_seasonal_adjustment_keeps_real_spikes():
+    t = np.arange(48)
+    values = 100 + 20 * np.sin(2 * np.pi * t / 12) + np.random.default_rng(1).normal(0, 1, 48)
+    values[30] += 25
+    frame = pd.DataFrame({"period": pd.date_range("2020-01-01", periods=48, freq="MS"), "value": values})
+
+    anomalies = analyze_trends(frame, season_length=12)["anomalies"]
+
+    assert [anomaly["time"] for anomaly in anomalies] == ["2022-07-01"]
@@ -1,6 +1,12 @@
 # ============================================================================
 # File: utils/__init__.py
 # ============================================================================
-from .database import get_database_config
+from .database import close_connection_pools, connect_database, get_connection_pool, get_database_config
+from .chart_cache import ChartCache, get_chart_cache_config
+from .metadata_cache import SchemaCache, get_schema_cache
+from .columnar import ColumnarResult
+from .metrics import get_registry, start_metrics_server
 
-__all__ = ['get_database_config']
\ No newline at end of file
+__all__ = ['get_database_config', 'connect_database', 'get_connection_pool', 'close_connection_pools', 'ChartCache',
+           'get_chart_cache_config', 'SchemaCache', 'get_schema_cache', 'ColumnarResult', 'get_registry',
+           'start_metrics_server']
@@ -0,0 +1,144 @@
+# ============================================================================
+# File: utils/chart_cache.py
+# ============================================================================
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, date
+from decimal import Decimal
+from typing import Dict, Optional
+from .metrics import get_registry
+
+
+CACHE_LOOKUPS = get_registry().counter(
+    "analytics_chart_cache_lookups_total", "Chart cache lookups by format and result", ["format", "result"]
+)
+
+
+def get_chart_cache_config() -> dict:
+    """Get chart cache configuration from environment variables."""
+    return {
+        'directory': os.getenv('CHART_CACHE_DIR', '.chart_cache'),
+        'max_bytes': int(float(os.getenv('CHART_CACHE_MAX_MB', 200)) * 1024 * 1024)
+    }
+
+
+def _canonical_default(obj):
+    """Serialize values that the stdlib encoder does not understand."""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    elif isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    elif isinstance(obj, bytes):
+        return obj.decode('utf-8', errors='replace')
+    return str(obj)
+
+
+def make_chart_key(data, options: Dict) -> str:
+    """Build a content-addressed key from chart data and render options."""
+    payload = json.dumps(
+        {"data": data, "options": options},
+        sort_keys=True,
+        separators=(',', ':'),
+        default=_canonical_default
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ChartCache:
+    """Content-addressed store of rendered chart artifacts with LRU size eviction."""
+
+    def __init__(self, directory: str = None, max_bytes: int = None):
+        config = get_chart_cache_config()
+        self.directory = directory or config['directory']
+        self.max_bytes = max_bytes if max_bytes is not None else config['max_bytes']
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # filename -> size, least recently used first
+        self._total_bytes = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the LRU index from the files already on disk."""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith('.'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name, stat.st_size))
+
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total_bytes += size
+
+    def path_for(self, key: str, extension: str = "png") -> str:
+        """Return the artifact path for a cache key."""
+        return os.path.join(self.directory, f"chart_{key[:32]}.{extension}")
+
+    def get(self, key: str, extension: str = "png") -> Optional[str]:
+        """Return the cached artifact path and mark it as recently used, or None."""
+        path = self.path_for(key, extension)
+        name = os.path.basename(path)
+        with self._lock:
+            if name not in self._entries:
+                CACHE_LOOKUPS.inc(format=extension, result="miss")
+                return None
+            if not os.path.exists(path):
+                self._total_bytes -= self._entries.pop(name)
+                CACHE_LOOKUPS.inc(format=extension, result="miss")
+                return None
+            self._entries.move_to_end(name)
+        CACHE_LOOKUPS.inc(format=extension, result="hit")
+
+        # Touch the file so recency survives a process restart
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def put(self, key: str, extension: str = "png") -> str:
+        """Register a freshly written artifact and evict old ones past the size cap."""
+        path = self.path_for(key, extension)
+        name = os.path.basename(path)
+        size = os.path.getsize(path)
+
+        with self._lock:
+            if name in self._entries:
+                self._total_bytes -= self._entries.pop(name)
+            self._entries[name] = size
+            self._total_bytes += size
+            self._evict(keep=name)
+        return path
+
+    def _evict(self, keep: str):
+        """Remove least recently used artifacts until the cache fits its cap."""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = next(iter(self._entries.items()))
+            if name == keep:
+                break
+            self._entries.pop(name)
+            self._total_bytes -= size
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def clear(self):
+        """Delete every cached artifact."""
+        with self._lock:
+            for name in list(self._entries):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._total_bytes = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
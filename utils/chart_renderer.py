@@ -0,0 +1,158 @@
+# ============================================================================
+# File: utils/chart_renderer.py
+# ============================================================================
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import pandas as pd
+import seaborn as sns
+from .metrics import get_registry
+
+
+SUPPORTED_FORMATS = ("png", "webp", "svg")
+
+
+def get_renderer_config() -> dict:
+    """Get chart renderer configuration from environment variables."""
+    output_format = os.getenv('CHART_FORMAT', 'png').lower()
+    if output_format not in SUPPORTED_FORMATS:
+        raise ValueError(f"CHART_FORMAT must be one of {', '.join(SUPPORTED_FORMATS)}")
+
+    return {
+        'max_workers': int(os.getenv('CHART_RENDER_WORKERS', min(4, os.cpu_count() or 1))),
+        'dpi': int(os.getenv('CHART_DPI', 150)),
+        'output_format': output_format,
+        # Seconds a chart request waits for its render before reporting it as pending
+        'timeout': float(os.getenv('CHART_RENDER_TIMEOUT', 30))
+    }
+
+
+def render_chart(spec: Dict, path: str, dpi: int, output_format: str) -> str:
+    """Render a chart spec to a file using the object-oriented Agg API."""
+    df = pd.DataFrame(spec['data'])
+    chart_type = spec['chart_type']
+    x_column = spec.get('x_column')
+    y_column = spec.get('y_column')
+    x_label = spec.get('x_label') or x_column
+    y_label = spec.get('y_label') or y_column
+
+    with matplotlib.rc_context(sns.axes_style("whitegrid")):
+        fig = Figure(figsize=(12, 7))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+
+        if chart_type == "bar":
+            ax.bar(df[x_column], df[y_column])
+            ax.set_xlabel(x_label)
+            ax.set_ylabel(y_label)
+            for tick in ax.get_xticklabels():
+                tick.set_rotation(45)
+                tick.set_horizontalalignment('right')
+
+        elif chart_type == "line":
+            ax.plot(df[x_column], df[y_column], marker='o', linewidth=2)
+            ax.set_xlabel(x_label)
+            ax.set_ylabel(y_label)
+            ax.grid(True, alpha=0.3)
+
+        elif chart_type == "scatter":
+            ax.scatter(df[x_column], df[y_column], alpha=0.6, s=100)
+            ax.set_xlabel(x_label)
+            ax.set_ylabel(y_label)
+
+        elif chart_type == "pie":
+            ax.pie(df[y_column], labels=df[x_column], autopct='%1.1f%%', startangle=90)
+            ax.axis('equal')
+
+        elif chart_type == "histogram":
+            ax.hist(df[x_column], bins=30, edgecolor='black', alpha=0.7)
+            ax.set_xlabel(x_label)
+            ax.set_ylabel('Frequency')
+
+        elif chart_type == "box":
+            df.boxplot(column=y_column, by=x_column, ax=ax)
+            ax.set_xlabel(x_label)
+            ax.set_ylabel(y_label)
+
+        ax.set_title(spec['title'], fontsize=14, fontweight='bold')
+        fig.tight_layout()
+        fig.savefig(path, dpi=dpi, bbox_inches='tight', format=output_format)
+
+    return path
+
+
+RENDERS_PENDING = get_registry().gauge("analytics_chart_renders_pending", "Chart renders queued or running")
+RENDER_SECONDS = get_registry().histogram(
+    "analytics_chart_render_duration_seconds", "Time from submitting a chart render to its completion", ["status"]
+)
+
+
+class ChartRenderer:
+    """Renders charts off the request thread on a pool of worker processes."""
+
+    def __init__(self, max_workers: int = None, dpi: int = None, output_format: str = None, timeout: float = None):
+        config = get_renderer_config()
+        self.timeout = timeout if timeout is not None else config['timeout']
+        self.max_workers = max_workers if max_workers is not None else config['max_workers']
+        self.dpi = dpi or config['dpi']
+        self.output_format = (output_format or config['output_format']).lower()
+        if self.output_format not in SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported chart format: {self.output_format}")
+        self._executor = None
+        # Sessions of the API server share one renderer
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Create the worker pool on first use."""
+        with self._executor_lock:
+            if self._executor is None:
+                # Spawned workers do not inherit locks held by other threads (e.g. Streamlit's)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def submit(self, spec: Dict, path: str) -> Future:
+        """Schedule a chart render and return a future resolving to the output path."""
+        start = time.perf_counter()
+        RENDERS_PENDING.inc()
+        future = self._submit(spec, path)
+
+        def _record(done: Future):
+            RENDERS_PENDING.dec()
+            status = "error" if done.exception() is not None else "ok"
+            RENDER_SECONDS.observe(time.perf_counter() - start, status=status)
+
+        future.add_done_callback(_record)
+        return future
+
+    def _submit(self, spec: Dict, path: str) -> Future:
+        if self.max_workers == 0:
+            # In-process rendering, e.g. where worker processes are not allowed
+            future = Future()
+            try:
+                future.set_result(render_chart(spec, path, self.dpi, self.output_format))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        try:
+            return self._get_executor().submit(render_chart, spec, path, self.dpi, self.output_format)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); start a fresh pool and retry once
+            self.shutdown(wait=False)
+            return self._get_executor().submit(render_chart, spec, path, self.dpi, self.output_format)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
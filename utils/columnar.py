@@ -0,0 +1,181 @@
+# ============================================================================
+# File: utils/columnar.py
+# ============================================================================
+import os
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Dict, List
+import pandas as pd
+import pyarrow as pa
+
+
+def get_columnar_config() -> Dict:
+    """Get result storage configuration from environment variables."""
+    return {
+        'compression': os.getenv('RESULT_COMPRESSION', 'zstd').lower(),
+        'compress_min_bytes': int(os.getenv('RESULT_COMPRESS_MIN_BYTES', 1024 * 1024)),
+        'frame_cache_size': int(os.getenv('RESULT_FRAME_CACHE_SIZE', 32))
+    }
+
+
+class _FrameCache:
+    """Small process-wide LRU of pandas views so reruns skip the Arrow -> pandas conversion."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is not None:
+                self._frames.move_to_end(key)
+            return frame
+
+    def put(self, key: str, frame: pd.DataFrame):
+        with self._lock:
+            self._frames[key] = frame
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_entries:
+                self._frames.popitem(last=False)
+
+
+_frame_cache = _FrameCache(get_columnar_config()['frame_cache_size'])
+
+
+def _normalize(table: pa.Table) -> pa.Table:
+    """Cast NUMERIC (decimal) columns to float64 so they plot and aggregate natively."""
+    for i, field in enumerate(table.schema):
+        if pa.types.is_decimal(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+    return table
+
+
+def _frame_to_arrow(df: pd.DataFrame) -> pa.Table:
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+
+    # Mixed-type object columns cannot be typed; keep only those as text
+    arrays = {}
+    for column in df.columns:
+        try:
+            arrays[str(column)] = pa.array(df[column], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arrays[str(column)] = pa.array(df[column].astype(str))
+    return pa.table(arrays)
+
+
+def _type_name(data_type: pa.DataType) -> str:
+    for name, check in (
+        ("bool", pa.types.is_boolean), ("int", pa.types.is_integer), ("float", pa.types.is_floating),
+        ("float", pa.types.is_decimal), ("text", pa.types.is_string), ("timestamp", pa.types.is_timestamp),
+        ("date", pa.types.is_date), ("time", pa.types.is_time), ("interval", pa.types.is_duration)
+    ):
+        if check(data_type):
+            return name
+    return str(data_type)
+
+
+class ColumnarResult:
+    """Immutable tabular result stored as an Arrow table, optionally as compressed IPC bytes.
+
+    The pandas view returned by to_pandas() is shared between callers and must be
+    treated as read-only.
+    """
+
+    def __init__(self, table: pa.Table, compression: str = "auto"):
+        config = get_columnar_config()
+        if compression == "auto":
+            codec = config['compression']
+            compression = codec if codec != 'none' and table.nbytes >= config['compress_min_bytes'] else None
+
+        self._token = uuid.uuid4().hex
+        self.schema = table.schema
+        self.num_rows = table.num_rows
+        self.compression = compression if compression and pa.Codec.is_available(compression) else None
+
+        if self.compression:
+            sink = pa.BufferOutputStream()
+            options = pa.ipc.IpcWriteOptions(compression=self.compression)
+            with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+                writer.write_table(table)
+            self._payload = sink.getvalue()
+        else:
+            self._payload = table
+
+    @classmethod
+    def from_pandas(cls, df: pd.DataFrame, compression: str = "auto") -> "ColumnarResult":
+        return cls(_normalize(_frame_to_arrow(df)), compression)
+
+    @classmethod
+    def from_records(cls, records: List[Dict], compression: str = "auto") -> "ColumnarResult":
+        try:
+            table = pa.Table.from_pylist(records)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            table = _frame_to_arrow(pd.DataFrame(records))
+        return cls(_normalize(table), compression)
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, List], compression: str = "auto") -> "ColumnarResult":
+        try:
+            table = pa.table(columns)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            table = _frame_to_arrow(pd.DataFrame(columns))
+        return cls(_normalize(table), compression)
+
+    @classmethod
+    def coerce(cls, data) -> "ColumnarResult":
+        """Wrap rows, a DataFrame or an existing result."""
+        if isinstance(data, cls):
+            return data
+        if isinstance(data, pd.DataFrame):
+            return cls.from_pandas(data)
+        return cls.from_records(list(data or []))
+
+    @property
+    def table(self) -> pa.Table:
+        if isinstance(self._payload, pa.Table):
+            return self._payload
+        return pa.ipc.open_stream(self._payload).read_all()
+
+    @property
+    def columns(self) -> List[str]:
+        return self.schema.names
+
+    @property
+    def column_types(self) -> Dict[str, str]:
+        """Short type name per column (int, float, text, date, ...), e.g. as hints for the LLM."""
+        return {field.name: _type_name(field.type) for field in self.schema}
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by this result (compressed size when compressed)."""
+        return self._payload.size if self.compression else self._payload.nbytes
+
+    def to_pandas(self) -> pd.DataFrame:
+        frame = _frame_cache.get(self._token)
+        if frame is None:
+            frame = self.table.to_pandas()
+            _frame_cache.put(self._token, frame)
+        return frame
+
+    def to_records(self) -> List[Dict]:
+        return self.table.to_pylist()
+
+    def append(self, other: "ColumnarResult", keep_last: int = None) -> "ColumnarResult":
+        """New result with other's rows after these, optionally trimmed to the last keep_last rows."""
+        table = pa.concat_tables([self.table, other.table], promote_options="permissive")
+        if keep_last is not None and table.num_rows > keep_last:
+            table = table.slice(table.num_rows - keep_last)
+        return ColumnarResult(table.combine_chunks())
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def __repr__(self) -> str:
+        codec = f", {self.compression}" if self.compression else ""
+        return f"ColumnarResult({self.num_rows} rows x {len(self.columns)} columns, {self.nbytes:,} bytes{codec})"
@@ -2,6 +2,13 @@
 # File: utils/database.py
 # ============================================================================
 import os
+import time
+import weakref
+import threading
+import psycopg2
+from psycopg2.extensions import DECIMAL, connection as _Connection, new_type
+from psycopg2.pool import PoolError
+from .metrics import get_registry
 
 
 def get_database_config() -> dict:
@@ -18,4 +25,212 @@ def get_database_config() -> dict:
     if not all([db_config['database'], db_config['user'], db_config['password']]):
         raise ValueError("DB_NAME, DB_USER, and DB_PASSWORD environment variables must be set")
     
-    return db_config
\ No newline at end of file
+    return db_config
+
+
+DB_CONNECT_SECONDS = get_registry().histogram(
+    "analytics_db_connect_duration_seconds", "Time to acquire a database connection", ["source"]
+)
+DB_CONNECT_ERRORS = get_registry().counter(
+    "analytics_db_connect_errors_total", "Failed database connection attempts", ["source"]
+)
+
+
+# NUMERIC parsed straight to float instead of Decimal: results are analyzed, plotted
+# and sent to the LLM as float64 anyway, and Decimals are slow to build and convert
+NUMERIC_AS_FLOAT = new_type(
+    DECIMAL.values, "NUMERIC_AS_FLOAT", lambda value, cursor: None if value is None else float(value)
+)
+
+
+def get_pool_config() -> dict:
+    """Get connection pool configuration from environment variables."""
+    return {
+        'max_connections': int(os.getenv('DB_POOL_SIZE', 0)),
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', 30))
+    }
+
+
+DB_POOL_WAIT_SECONDS = get_registry().histogram(
+    "analytics_db_pool_wait_duration_seconds", "Time spent waiting for a free pooled connection", ["source"]
+)
+DB_POOL_CONNECTIONS = get_registry().gauge(
+    "analytics_db_pool_connections", "Pooled database connections by state", ["state"]
+)
+DB_POOL_TIMEOUTS = get_registry().counter(
+    "analytics_db_pool_timeouts_total", "Requests that gave up waiting for a pooled connection", ["source"]
+)
+DB_POOL_RECLAIMED = get_registry().counter(
+    "analytics_db_pool_reclaimed_total", "Pooled connections garbage-collected without being closed", ["source"]
+)
+
+# Idle connections older than this are pinged before reuse, in case the server dropped them
+_PING_AFTER_IDLE_SECONDS = 60
+
+
+class PooledConnection(_Connection):
+    """psycopg2 connection whose close() hands it back to its pool instead of disconnecting.
+
+    Callers keep the usual connect/close pattern; being a real connection it
+    also works wherever psycopg2 insists on one (sql.Composable.as_string, pandas).
+    """
+
+    pool = None
+    # Finalizer that frees the pool slot if the connection is dropped while borrowed
+    _borrowed = None
+
+    def close(self):
+        if self.pool is None or self.closed:
+            return super().close()
+        self.pool.release(self)
+
+    def disconnect(self):
+        """Really close the connection."""
+        super().close()
+
+
+class ConnectionPool:
+    """Thread-safe pool of up to max_connections connections to one database.
+
+    acquire() blocks until a connection is free (up to timeout seconds) rather
+    than failing outright like psycopg2.pool. Returned connections are reset,
+    so a session left read-only, in autocommit or mid-transaction by one caller
+    is clean for the next. A borrowed connection that is garbage-collected
+    without being closed gives its slot back, so a missed close() cannot
+    shrink the pool for good.
+    """
+
+    def __init__(self, db_config: dict, max_connections: int, timeout: float = 30):
+        self.db_config = dict(db_config)
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _open(self) -> PooledConnection:
+        conn = psycopg2.connect(**self.db_config, connection_factory=PooledConnection)
+        conn.pool = self
+        return conn
+
+    def _take_idle(self):
+        with self._lock:
+            while self._idle:
+                conn, released_at = self._idle.pop()
+                DB_POOL_CONNECTIONS.dec(state="idle")
+                if conn.closed:
+                    continue
+                if time.monotonic() - released_at > _PING_AFTER_IDLE_SECONDS:
+                    try:
+                        with conn.cursor() as cursor:
+                            cursor.execute("SELECT 1")
+                        conn.rollback()
+                    except psycopg2.Error:
+                        conn.disconnect()
+                        continue
+                return conn
+        return None
+
+    def acquire(self, source: str = "app") -> PooledConnection:
+        """Borrow a connection; close() it to give it back."""
+        if self._closed:
+            raise PoolError("Connection pool is closed")
+        start = time.perf_counter()
+        got_slot = self._slots.acquire(timeout=self.timeout)
+        DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - start, source=source)
+        if not got_slot:
+            DB_POOL_TIMEOUTS.inc(source=source)
+            raise PoolError(f"No database connection free after {self.timeout:g}s ({self.max_connections} in use)")
+        try:
+            conn = self._take_idle() or self._open()
+        except Exception:
+            self._slots.release()
+            raise
+        DB_POOL_CONNECTIONS.inc(state="in_use")
+        conn._borrowed = weakref.finalize(conn, self._reclaim, source)
+        return conn
+
+    def _reclaim(self, source: str):
+        # psycopg2 disconnects the collected connection itself; only the slot is left to free
+        DB_POOL_CONNECTIONS.dec(state="in_use")
+        DB_POOL_RECLAIMED.inc(source=source)
+        self._slots.release()
+        print(f"⚠️ Reclaimed a pooled database connection that {source} never closed")
+
+    def release(self, conn: PooledConnection):
+        borrowed, conn._borrowed = conn._borrowed, None
+        if borrowed is None or not borrowed.detach():
+            # Already returned; a second close() must not free the slot twice
+            return
+        DB_POOL_CONNECTIONS.dec(state="in_use")
+        try:
+            if not conn.closed and not self._closed:
+                try:
+                    # Rolls back and restores session defaults (readonly, autocommit, SET ...)
+                    conn.reset()
+                except psycopg2.Error:
+                    conn.disconnect()
+                else:
+                    with self._lock:
+                        self._idle.append((conn, time.monotonic()))
+                    DB_POOL_CONNECTIONS.inc(state="idle")
+                    return
+            if not conn.closed:
+                conn.disconnect()
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Disconnect idle connections; borrowed ones are disconnected when returned."""
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            DB_POOL_CONNECTIONS.dec(state="idle")
+            conn.disconnect()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(db_config: dict) -> ConnectionPool:
+    """The process-wide pool for a database, created on first use when DB_POOL_SIZE > 0."""
+    config = get_pool_config()
+    if config['max_connections'] <= 0:
+        return None
+    key = tuple(sorted((name, str(value)) for name, value in db_config.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(db_config, config['max_connections'], config['timeout'])
+        return pool
+
+
+def close_connection_pools():
+    """Close every pool, e.g. on server shutdown."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def connect_database(db_config: dict, source: str = "app"):
+    """Open a psycopg2 connection, recording how long acquiring it took.
+
+    With DB_POOL_SIZE set the connection comes from the shared pool, and
+    closing it returns it there.
+    """
+    start = time.perf_counter()
+    try:
+        pool = get_connection_pool(db_config)
+        if pool is not None:
+            return pool.acquire(source)
+        return psycopg2.connect(**db_config)
+    except Exception:
+        DB_CONNECT_ERRORS.inc(source=source)
+        raise
+    finally:
+        DB_CONNECT_SECONDS.observe(time.perf_counter() - start, source=source)
@@ -0,0 +1,135 @@
+# ============================================================================
+# File: utils/downsampling.py
+# ============================================================================
+import numpy as np
+import pandas as pd
+from typing import Dict, Tuple
+
+
+# Maximum points plotted per chart type before downsampling kicks in
+POINT_THRESHOLDS = {
+    "line": 2000,
+    "area": 2000,
+    "scatter": 5000,
+}
+
+# Maps Streamlit dashboard chart names onto agent chart types
+CHART_TYPE_ALIASES = {
+    "Line Chart": "line",
+    "Area Chart": "area",
+    "Scatter Plot": "scatter",
+    "Bar Chart": "bar",
+    "Pie Chart": "pie",
+}
+
+
+def _numeric_axis(values) -> np.ndarray:
+    """Return x values as floats, falling back to positions for non-monotonic or categorical axes."""
+    series = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        x = series.astype('int64').to_numpy(dtype=float)
+    elif pd.api.types.is_numeric_dtype(series):
+        x = series.to_numpy(dtype=float)
+    else:
+        return np.arange(len(series), dtype=float)
+
+    if np.isnan(x).any() or np.any(np.diff(x) < 0):
+        return np.arange(len(series), dtype=float)
+    return x
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """Select n_out indices with Largest-Triangle-Three-Buckets."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bucket boundaries for the n - 2 interior points
+    edges = np.floor(np.linspace(1, n - 1, n_out - 1)).astype(int)
+
+    # Average point of every bucket, used as the third triangle vertex
+    counts = np.diff(edges)
+    x_avg = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    y_avg = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+    x_avg = np.append(x_avg, x[-1])
+    y_avg = np.append(y_avg, y[-1])
+
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        bx, by = x[start:end], y[start:end]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs(
+            (x[a] - x_avg[i + 1]) * (by - y[a])
+            - (x[a] - bx) * (y_avg[i + 1] - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(x, y, n_out: int) -> np.ndarray:
+    """Keep the minimum and maximum y of each x bucket."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    n_buckets = max(n_out // 2, 1)
+    if n_out >= n:
+        return np.arange(n)
+
+    span = x.max() - x.min()
+    if span == 0:
+        buckets = (np.arange(n) * n_buckets // n)
+    else:
+        buckets = np.minimum(((x - x.min()) / span * n_buckets).astype(int), n_buckets - 1)
+
+    # Sort by bucket then y: the first row of each bucket is its min, the last its max
+    order = np.lexsort((y, buckets))
+    sorted_buckets = buckets[order]
+    starts = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    return np.unique(np.concatenate([order[starts], order[ends]]))
+
+
+def downsample_frame(df: pd.DataFrame, x_col: str, y_col: str, chart_type: str,
+                     max_points: int = None) -> Tuple[pd.DataFrame, Dict]:
+    """Downsample a frame for plotting and report the original point count."""
+    kind = CHART_TYPE_ALIASES.get(chart_type, chart_type)
+    threshold = max_points or POINT_THRESHOLDS.get(kind)
+    metadata = {
+        "original_points": len(df),
+        "plotted_points": len(df),
+        "downsampled": False
+    }
+
+    if threshold is None or len(df) <= threshold:
+        return df, metadata
+
+    y = pd.to_numeric(df[y_col], errors='coerce')
+    valid = y.notna().to_numpy()
+    # Both algorithms rank points by y; a categorical y is plotted as-is
+    if valid.sum() < df[y_col].notna().sum():
+        return df, metadata
+    frame = df[valid]
+    y_values = y[valid].to_numpy(dtype=float)
+    x_values = _numeric_axis(frame[x_col].to_numpy())
+
+    if kind == "scatter":
+        indices = minmax_indices(x_values, y_values, threshold)
+        method = "minmax"
+    else:
+        indices = lttb_indices(x_values, y_values, threshold)
+        method = "lttb"
+
+    result = frame.iloc[indices]
+    metadata.update({
+        "plotted_points": len(result),
+        "downsampled": True,
+        "method": method
+    })
+    return result, metadata
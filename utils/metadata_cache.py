@@ -0,0 +1,123 @@
+# ============================================================================
+# File: utils/metadata_cache.py
+# ============================================================================
+import os
+import time
+import threading
+from typing import Callable, Dict, List
+from .metrics import get_registry
+
+
+# One round trip for every table with its columns; tables without columns are kept
+CATALOG_QUERY = """
+SELECT
+    t.table_name,
+    c.column_name,
+    c.data_type,
+    c.is_nullable,
+    (quote_ident(c.udt_schema) || '.' || quote_ident(c.udt_name))::regtype::oid AS type_oid
+FROM information_schema.tables t
+LEFT JOIN information_schema.columns c
+    ON c.table_schema = t.table_schema AND c.table_name = t.table_name
+WHERE t.table_schema = 'public'
+ORDER BY t.table_name, c.ordinal_position;
+"""
+
+
+# Described ad-hoc queries kept per process
+MAX_CACHED_QUERIES = 256
+
+SCHEMA_LOOKUPS = get_registry().counter(
+    "analytics_schema_cache_lookups_total", "Schema catalog lookups by result", ["result"]
+)
+
+
+class SchemaCache:
+    """Process-wide cache of table/column metadata with a TTL and explicit invalidation."""
+
+    def __init__(self, ttl: float = None):
+        self.ttl = ttl if ttl is not None else float(os.getenv('SCHEMA_CACHE_TTL', 300))
+        self._lock = threading.Lock()
+        self._catalogs = {}  # database key -> (fetched_at, catalog)
+        self._query_columns = {}  # (database key, query) -> (described_at, columns)
+
+    @staticmethod
+    def _key(db_config: Dict) -> tuple:
+        return (db_config.get('host'), db_config.get('port'), db_config.get('database'), db_config.get('user'))
+
+    def get_catalog(self, db_config: Dict, connect: Callable) -> Dict[str, List[Dict]]:
+        """Return {table: [{name, type, nullable}, ...]}, querying the database only when stale."""
+        key = self._key(db_config)
+        with self._lock:
+            cached = self._catalogs.get(key)
+            if cached and time.monotonic() - cached[0] < self.ttl:
+                SCHEMA_LOOKUPS.inc(result="hit")
+                return cached[1]
+            SCHEMA_LOOKUPS.inc(result="miss")
+
+            # Fetch under the lock so concurrent reruns share one catalog query
+            catalog = self._fetch(connect)
+            self._catalogs[key] = (time.monotonic(), catalog)
+            return catalog
+
+    @staticmethod
+    def _fetch(connect: Callable) -> Dict[str, List[Dict]]:
+        conn = connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(CATALOG_QUERY)
+            rows = cursor.fetchall()
+            cursor.close()
+        finally:
+            conn.close()
+
+        catalog = {}
+        for table_name, column_name, data_type, is_nullable, type_oid in rows:
+            columns = catalog.setdefault(table_name, [])
+            if column_name is not None:
+                columns.append({
+                    "name": column_name,
+                    "type": data_type,
+                    "nullable": is_nullable == 'YES',
+                    "type_oid": type_oid
+                })
+        return catalog
+
+    def get_query_columns(self, db_config: Dict, query: str, describe: Callable) -> List:
+        """Result columns of a SELECT, from describe() at most once per TTL."""
+        key = (self._key(db_config), query)
+        with self._lock:
+            cached = self._query_columns.get(key)
+            if cached and time.monotonic() - cached[0] < self.ttl:
+                SCHEMA_LOOKUPS.inc(result="hit")
+                return cached[1]
+            SCHEMA_LOOKUPS.inc(result="miss")
+
+        columns = describe()
+        with self._lock:
+            self._query_columns[key] = (time.monotonic(), columns)
+            # Queries are open-ended; keep the most recently described ones
+            while len(self._query_columns) > MAX_CACHED_QUERIES:
+                self._query_columns.pop(next(iter(self._query_columns)))
+        return columns
+
+    def invalidate(self, db_config: Dict = None):
+        """Drop cached metadata for one database, or for all of them."""
+        with self._lock:
+            if db_config is None:
+                self._catalogs.clear()
+                self._query_columns.clear()
+            else:
+                key = self._key(db_config)
+                self._catalogs.pop(key, None)
+                self._query_columns = {
+                    cached: value for cached, value in self._query_columns.items() if cached[0] != key
+                }
+
+
+_schema_cache = SchemaCache()
+
+
+def get_schema_cache() -> SchemaCache:
+    """Return the process-wide schema cache."""
+    return _schema_cache
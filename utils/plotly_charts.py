@@ -0,0 +1,151 @@
+# ============================================================================
+# File: utils/plotly_charts.py
+# ============================================================================
+import json
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+from .columnar import ColumnarResult
+from .downsampling import downsample_frame
+
+
+# Maps Visualization Agent chart types onto dashboard chart names
+AGENT_CHART_TYPES = {
+    "bar": "Bar Chart",
+    "line": "Line Chart",
+    "scatter": "Scatter Plot",
+    "pie": "Pie Chart",
+    "area": "Area Chart",
+    "histogram": "Histogram",
+    "box": "Box Plot"
+}
+
+CHART_TEMPLATE = "plotly_dark"
+
+
+def create_plotly_chart(data, chart_type, x_col, y_col, title, x_label=None, y_label=None):
+    """Create a Plotly chart based on the specified type."""
+    chart_type = AGENT_CHART_TYPES.get(chart_type, chart_type)
+    df = data.to_pandas() if isinstance(data, ColumnarResult) else pd.DataFrame(data)
+    df, downsampling = downsample_frame(df, x_col, y_col, chart_type)
+    labels = {col: label for col, label in ((x_col, x_label), (y_col, y_label)) if col and label}
+    
+    if chart_type == "Bar Chart":
+        fig = px.bar(df, x=x_col, y=y_col, title=title, 
+                     color_discrete_sequence=['#667eea'])
+    elif chart_type == "Line Chart":
+        fig = px.line(df, x=x_col, y=y_col, title=title, 
+                      markers=True, color_discrete_sequence=['#667eea'])
+    elif chart_type == "Scatter Plot":
+        fig = px.scatter(df, x=x_col, y=y_col, title=title,
+                        color_discrete_sequence=['#667eea'])
+    elif chart_type == "Pie Chart":
+        fig = px.pie(df, names=x_col, values=y_col, title=title)
+    elif chart_type == "Area Chart":
+        fig = px.area(df, x=x_col, y=y_col, title=title,
+                     color_discrete_sequence=['#667eea'])
+    elif chart_type == "Histogram":
+        fig = px.histogram(df, x=x_col, title=title, nbins=30,
+                           color_discrete_sequence=['#667eea'])
+    elif chart_type == "Box Plot":
+        fig = px.box(df, x=x_col, y=y_col, title=title,
+                     color_discrete_sequence=['#667eea'])
+    else:
+        fig = px.bar(df, x=x_col, y=y_col, title=title)
+    
+    if labels:
+        fig.update_layout(
+            xaxis_title=labels.get(x_col, x_col),
+            yaxis_title=labels.get(y_col, y_col)
+        )
+    
+    # Update layout for dark theme
+    fig.update_layout(
+        template=CHART_TEMPLATE,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        title_font_size=20,
+        title_font_color='#667eea',
+        meta=downsampling
+    )
+    
+    return fig
+
+
+def create_forecast_chart(forecast_data):
+    """Create a forecast visualization with confidence intervals."""
+    historical_df, downsampling = downsample_frame(
+        pd.DataFrame(forecast_data["historical"]), 'period', 'value', "line"
+    )
+    forecast_df = pd.DataFrame(forecast_data["forecast"])
+    
+    fig = go.Figure()
+    
+    # Historical data
+    fig.add_trace(go.Scatter(
+        x=historical_df['period'],
+        y=historical_df['value'],
+        mode='lines+markers',
+        name='Historical',
+        line=dict(color='#667eea', width=2)
+    ))
+    
+    # Forecast data
+    fig.add_trace(go.Scatter(
+        x=forecast_df['period'],
+        y=forecast_df['predicted_value'],
+        mode='lines+markers',
+        name='Forecast',
+        line=dict(color='#10b981', width=2, dash='dash')
+    ))
+    
+    # Confidence interval
+    fig.add_trace(go.Scatter(
+        x=forecast_df['period'],
+        y=forecast_df['upper_bound'],
+        mode='lines',
+        name='Upper Bound',
+        line=dict(width=0),
+        showlegend=False
+    ))
+    
+    fig.add_trace(go.Scatter(
+        x=forecast_df['period'],
+        y=forecast_df['lower_bound'],
+        mode='lines',
+        name='95% Confidence',
+        fill='tonexty',
+        fillcolor='rgba(16, 185, 129, 0.2)',
+        line=dict(width=0)
+    ))
+    
+    fig.update_layout(
+        template="plotly_dark",
+        title="Forecast with Confidence Interval",
+        xaxis_title="Period",
+        yaxis_title="Value",
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white'),
+        hovermode='x unified',
+        meta=downsampling
+    )
+    
+    return fig
+
+
+def figure_to_spec(fig) -> dict:
+    """Convert a figure into a compact JSON-serializable spec for storage and in-browser rendering."""
+    spec = json.loads(pio.to_json(fig, validate=False, remove_uids=True))
+    # The dark template is several KB and identical for every chart; it is re-applied on load
+    spec.get("layout", {}).pop("template", None)
+    return spec
+
+
+def figure_from_spec(spec: dict):
+    """Rebuild a figure from a spec produced by figure_to_spec."""
+    fig = go.Figure(spec)
+    fig.update_layout(template=CHART_TEMPLATE)
+    return fig
\ No newline at end of file
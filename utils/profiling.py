@@ -0,0 +1,137 @@
+# ============================================================================
+# File: utils/profiling.py
+# ============================================================================
+import os
+import time
+import pstats
+import cProfile
+import linecache
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List
+
+
+# cProfile and tracemalloc are process-wide, so only one block is profiled at a time
+_profile_lock = threading.Lock()
+
+
+def get_profiling_config() -> Dict:
+    """Get profiling configuration from environment variables."""
+    return {
+        'directory': os.getenv('PROFILE_DIR', '.profiles'),
+        'top_n': int(os.getenv('PROFILE_TOP_N', 25)),
+        'traceback_frames': int(os.getenv('PROFILE_TRACEBACK_FRAMES', 10))
+    }
+
+
+def _function_label(key) -> str:
+    filename, line, function = key
+    if filename == "~":
+        # Built-ins such as {method 'execute' of 'psycopg2.extensions.cursor' objects}
+        return function
+    return f"{function} ({os.path.basename(filename)}:{line})"
+
+
+def top_functions(stats: pstats.Stats, limit: int) -> List[Dict]:
+    """Functions with the most self time."""
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [
+        {
+            "function": _function_label(key),
+            "calls": calls,
+            "self_ms": round(self_time * 1000, 1),
+            "cumulative_ms": round(cumulative * 1000, 1)
+        }
+        for key, (_, calls, self_time, cumulative, _) in rows
+    ]
+
+
+def top_allocations(snapshot: tracemalloc.Snapshot, baseline: tracemalloc.Snapshot, limit: int) -> List[Dict]:
+    """Source lines holding the most memory allocated since the baseline."""
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>")
+    ])
+    stats = [stat for stat in snapshot.compare_to(baseline, "lineno") if stat.size_diff > 0][:limit]
+    return [
+        {
+            "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_kb": round(stat.size_diff / 1024, 1),
+            "count": stat.count_diff,
+            "source": linecache.getline(stat.traceback[0].filename, stat.traceback[0].lineno).strip()
+        }
+        for stat in stats
+    ]
+
+
+def _write_allocation_report(path: str, title: str, peak_bytes: int, allocations: List[Dict]):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"Allocation profile: {title}\n")
+        f.write(f"Peak traced memory: {peak_bytes / 1024 / 1024:.1f} MiB\n\n")
+        f.write(f"Top {len(allocations)} allocation sites still held at the end:\n")
+        for rank, allocation in enumerate(allocations, 1):
+            f.write(f"#{rank}: {allocation['site']}: {allocation['size_kb']:,.1f} KiB in {allocation['count']:,} blocks\n")
+            if allocation['source']:
+                f.write(f"    {allocation['source']}\n")
+
+
+@contextmanager
+def profiled(name: str, enabled: bool = True, directory: str = None):
+    """Profile CPU (cProfile) and memory (tracemalloc) of a block on the calling thread.
+
+    Yields a dict that is filled on exit with the paths of the saved .pstats
+    file and allocation report and a short summary; it stays empty when
+    profiling is disabled or another block is already being profiled.
+    """
+    report = {}
+    if not enabled:
+        yield report
+        return
+    if not _profile_lock.acquire(blocking=False):
+        print("⚠️ Another query is being profiled; running this one without profiling")
+        yield report
+        return
+
+    config = get_profiling_config()
+    directory = directory or config['directory']
+    try:
+        os.makedirs(directory, exist_ok=True)
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(config['traceback_frames'])
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.take_snapshot()
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield report
+        finally:
+            profiler.disable()
+            wall_ms = (time.perf_counter() - start) * 1000
+            snapshot = tracemalloc.take_snapshot()
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+
+            prefix = os.path.join(directory, f"{datetime.now():%Y%m%d-%H%M%S}-{name[:16]}")
+            stats = pstats.Stats(profiler)
+            stats.dump_stats(f"{prefix}.pstats")
+            allocations = top_allocations(snapshot, baseline, config['top_n'])
+            _write_allocation_report(f"{prefix}-allocations.txt", name, peak_bytes, allocations)
+
+            report.update({
+                "pstats_path": f"{prefix}.pstats",
+                "allocations_path": f"{prefix}-allocations.txt",
+                "wall_ms": round(wall_ms, 1),
+                "peak_memory_mb": round(peak_bytes / 1024 / 1024, 1),
+                "top_functions": top_functions(stats, 10),
+                "top_allocations": allocations[:5]
+            })
+            print(f"🔬 Profile saved: {prefix}.pstats (peak {report['peak_memory_mb']} MiB traced)")
+    finally:
+        _profile_lock.release()
@@ -0,0 +1,205 @@
+# ============================================================================
+# File: utils/serialization.py
+# ============================================================================
+import io
+import os
+import csv
+import json
+import math
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Sequence, Union
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# LLM-facing encodings of tabular tool results
+ENCODINGS = ("rows", "csv", "records")
+
+
+def get_serialization_config() -> Dict:
+    """Get tool-result serialization configuration from environment variables."""
+    return {
+        # auto uses orjson when installed; json forces the standard library encoder
+        'encoder': os.getenv('JSON_ENCODER', 'auto').lower(),
+        'tool_encoding': os.getenv('TOOL_RESULT_ENCODING', 'rows').lower(),
+        'significant_digits': int(os.getenv('TOOL_RESULT_SIGNIFICANT_DIGITS', 6))
+    }
+
+
+def to_native(value):
+    """JSON-native form of a value the encoders do not handle themselves."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, memoryview)):
+        return bytes(value).decode('utf-8', errors='replace')
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    # Intervals, ranges, custom types: readable beats failing the whole tool result
+    return str(value)
+
+
+def _converter(sample) -> Optional[Callable]:
+    """The conversion a column needs, judged from one of its values; None if it is already native."""
+    if sample is None or isinstance(sample, (str, bool, int, float)):
+        return None
+    if isinstance(sample, Decimal):
+        return float
+    if isinstance(sample, (datetime, date, time)):
+        # Bound to the column's own type, so datetimes keep their time part
+        return type(sample).isoformat
+    return to_native
+
+
+def native_columns(columns: Dict[str, Sequence]) -> Dict[str, List]:
+    """Convert each column to JSON-native values, choosing one converter per column.
+
+    The per-value work is one direct call (or none, for text and numbers)
+    instead of the encoder calling back into Python for every Decimal or date.
+    """
+    converted = {}
+    for name, values in columns.items():
+        convert = _converter(next((value for value in values if value is not None), None))
+        if convert is None:
+            converted[name] = list(values)
+            continue
+        try:
+            converted[name] = [None if value is None else convert(value) for value in values]
+        except (TypeError, ValueError, AttributeError):
+            # Mixed types in one column
+            converted[name] = [None if value is None else to_native(value) for value in values]
+    return converted
+
+
+def records_from_columns(columns: Dict[str, List]) -> List[Dict]:
+    """Column lists back to a list of row dicts."""
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+def dumps(obj) -> bytes:
+    """Serialize obj to compact UTF-8 JSON with the fastest available encoder."""
+    if orjson is not None and get_serialization_config()['encoder'] != 'json':
+        return orjson.dumps(obj, default=to_native, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=to_native, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def dumps_text(obj) -> str:
+    """dumps() as a str, e.g. for chat message content."""
+    return dumps(obj).decode('utf-8')
+
+
+def approximate_tokens(text: str) -> int:
+    """Rough LLM token count, at about four characters per token."""
+    return (len(text) + 3) // 4
+
+
+def _type_hint(value) -> str:
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        return "text"
+    return type(value).__name__
+
+
+# Compact encodings never round to fewer decimals than this, so money amounts keep their cents
+MIN_DECIMALS = 2
+
+
+def round_significant(value: float, digits: int) -> float:
+    """Round to digits significant digits, but never to fewer than MIN_DECIMALS decimals.
+
+    0.000042 stays 0.000042, 123.456789 becomes 123.457 and 57936.63 stays
+    57936.63 (with 6 digits); only digits past the cents of large values go.
+    """
+    if not value or not math.isfinite(value):
+        return value
+    return round(value, max(digits - 1 - math.floor(math.log10(abs(value))), MIN_DECIMALS))
+
+
+def _round_column(values: List, digits: int) -> List:
+    return [round_significant(value, digits) if isinstance(value, float) else value for value in values]
+
+
+def encode_table(records: List[Dict], encoding: str, significant_digits: int = None,
+                 types: Dict[str, str] = None) -> Union[Dict, str, List[Dict]]:
+    """Rows with the header sent once: {"columns", "types", "rows"} or typed-header CSV text.
+
+    Floats are rounded to significant_digits significant digits. Types default to ones
+    inferred from each column's first value; "records" returns rows unchanged.
+    """
+    if encoding == "records" or not records:
+        return records
+    names = list(records[0])
+    columns = {name: [row.get(name) for row in records] for name in names}
+    if significant_digits is not None:
+        columns = {name: _round_column(values, significant_digits) for name, values in columns.items()}
+    types = types or {}
+    hints = [
+        types.get(name) or _type_hint(next((value for value in columns[name] if value is not None), ""))
+        for name in names
+    ]
+
+    if encoding == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(f"{name}:{hint}" for name, hint in zip(names, hints))
+        writer.writerows(zip(*columns.values()))
+        return buffer.getvalue()
+    return {"columns": names, "types": hints, "rows": list(zip(*columns.values()))}
+
+
+def _is_table(value) -> bool:
+    return isinstance(value, list) and bool(value) and all(isinstance(row, dict) for row in value)
+
+
+def _round_floats(value, digits: int):
+    if isinstance(value, float):
+        return round_significant(value, digits)
+    if isinstance(value, dict):
+        return {key: _round_floats(item, digits) for key, item in value.items()}
+    return value
+
+
+def compact_result(result: Dict, encoding: str = None, significant_digits: int = None) -> Dict:
+    """A tool result re-encoded for the LLM; the result itself is left as is for other callers.
+
+    Every top-level list of row dicts is encoded with encode_table (using the
+    result's "column_types" for its "data" rows, when present) and other floats
+    are rounded. "records" returns the result unchanged.
+    """
+    config = get_serialization_config()
+    encoding = encoding or config['tool_encoding']
+    if significant_digits is None:
+        significant_digits = config['significant_digits']
+    if encoding not in ENCODINGS:
+        raise ValueError(f"encoding must be one of {', '.join(ENCODINGS)}")
+    if encoding == "records":
+        return result
+
+    compact = {}
+    for key, value in result.items():
+        if key == "column_types":
+            continue
+        if _is_table(value):
+            types = result.get("column_types") if key == "data" else None
+            compact[key] = encode_table(value, encoding, significant_digits, types)
+            compact["encoding"] = encoding
+        else:
+            compact[key] = _round_floats(value, significant_digits)
+    return compact
@@ -0,0 +1,248 @@
+# ============================================================================
+# File: utils/sql_statistics.py
+# ============================================================================
+from itertools import combinations
+from typing import Dict, List, Tuple
+import pandas as pd
+from psycopg2 import sql
+from utils.trend_analysis import TIME_COLUMN_HINTS
+
+
+PERCENTILES = (0.25, 0.5, 0.75)
+
+# Postgres type OIDs as reported in cursor.description
+NUMERIC_TYPE_OIDS = {20, 21, 23, 700, 701, 1700}
+TYPE_NAMES = {
+    16: "boolean", 20: "bigint", 21: "smallint", 23: "integer", 25: "text",
+    700: "real", 701: "double precision", 1042: "character", 1043: "character varying",
+    1082: "date", 1083: "time", 1114: "timestamp", 1184: "timestamptz", 1700: "numeric",
+    2950: "uuid", 3802: "jsonb"
+}
+TIME_TYPE_OIDS = {1082, 1114, 1184}
+
+TREND_PERIODS = ("day", "week", "month", "quarter", "year")
+TREND_AGGREGATES = ("sum", "avg", "min", "max", "count")
+# Approximate days per period, to pick the finest one that keeps a series short
+_PERIOD_DAYS = {"day": 1, "week": 7, "month": 30.44, "quarter": 91.31, "year": 365.25}
+MAX_TREND_PERIODS = 120
+
+
+def source_relation(table: str = None, query: str = None) -> sql.Composable:
+    """Build the FROM clause target for a table name or an arbitrary SELECT."""
+    if table:
+        return sql.Identifier(*table.split('.'))
+    if query:
+        return sql.SQL("({}) AS src").format(sql.SQL(query.strip().rstrip(';')))
+    raise ValueError("Either a table or a query source is required")
+
+
+def describe_source(conn, relation: sql.Composable) -> List[Tuple[str, int]]:
+    """Return (column name, type OID) pairs for a source without reading any rows."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql.SQL("SELECT * FROM {} LIMIT 0").format(relation))
+        return [(col.name, col.type_code) for col in cursor.description]
+    finally:
+        cursor.close()
+
+
+def build_statistics_query(relation: sql.Composable, columns: List[Tuple[str, int]],
+                           analysis_type: str, max_correlation_columns: int = 20) -> Tuple[sql.Composed, List[Tuple]]:
+    """Compile the requested statistics into one aggregate SELECT.
+
+    Returns the statement and a plan mapping each output column to (column, statistic)
+    so the single result row can be reshaped.
+    """
+    numeric = [name for name, oid in columns if oid in NUMERIC_TYPE_OIDS]
+    expressions = [sql.SQL("count(*)")]
+    plan = [(None, "row_count")]
+
+    def add(expression, column, statistic):
+        expressions.append(expression)
+        plan.append((column, statistic))
+
+    if analysis_type == "summary":
+        for name, _ in columns:
+            add(sql.SQL("count({})").format(sql.Identifier(name)), name, "non_null")
+
+    elif analysis_type == "descriptive":
+        percentiles = sql.SQL(", ").join(sql.Literal(p) for p in PERCENTILES)
+        for name in numeric:
+            col = sql.SQL("{}::float8").format(sql.Identifier(name))
+            add(sql.SQL("count({})").format(col), name, "count")
+            add(sql.SQL("avg({})").format(col), name, "mean")
+            add(sql.SQL("stddev_samp({})").format(col), name, "std")
+            add(sql.SQL("min({})").format(col), name, "min")
+            add(sql.SQL("percentile_cont(ARRAY[{}]) WITHIN GROUP (ORDER BY {})").format(percentiles, col),
+                name, "percentiles")
+            add(sql.SQL("max({})").format(col), name, "max")
+
+    elif analysis_type == "correlation":
+        for a, b in combinations(numeric[:max_correlation_columns], 2):
+            add(sql.SQL("corr({}::float8, {}::float8)").format(sql.Identifier(a), sql.Identifier(b)),
+                (a, b), "corr")
+
+    else:
+        raise ValueError(f"Analysis type '{analysis_type}' cannot be pushed down to the database")
+
+    query = sql.SQL("SELECT {} FROM {}").format(sql.SQL(", ").join(expressions), relation)
+    return query, plan
+
+
+def _reshape(row, plan, columns, analysis_type) -> Dict:
+    """Turn the single aggregate row back into the analyst result layout."""
+    row_count = row[0]
+
+    if analysis_type == "summary":
+        return {"summary": {
+            "row_count": row_count,
+            "column_count": len(columns),
+            "columns": [name for name, _ in columns],
+            "data_types": {name: TYPE_NAMES.get(oid, str(oid)) for name, oid in columns},
+            "missing_values": {column: row_count - value for (column, _), value in zip(plan[1:], row[1:])}
+        }}
+
+    if analysis_type == "descriptive":
+        statistics = {}
+        for (column, statistic), value in zip(plan[1:], row[1:]):
+            stats = statistics.setdefault(column, {})
+            if statistic == "percentiles":
+                for p, v in zip(PERCENTILES, value or [None] * len(PERCENTILES)):
+                    stats[f"{int(p * 100)}%"] = v
+            else:
+                stats[statistic] = value
+        return {"row_count": row_count, "statistics": statistics}
+
+    correlations = {}
+    for (pair, _), value in zip(plan[1:], row[1:]):
+        a, b = pair
+        correlations.setdefault(a, {a: 1.0})[b] = value
+        correlations.setdefault(b, {b: 1.0})[a] = value
+    return {"row_count": row_count, "correlations": correlations}
+
+
+def compute_source_statistics(conn, analysis_type: str, table: str = None, query: str = None,
+                              columns: List[Tuple[str, int]] = None) -> Dict:
+    """Run descriptive, summary or correlation statistics inside Postgres in one statement.
+
+    columns are the source's (name, type OID) pairs, e.g. from the schema cache;
+    without them the source is described first, at the cost of a round trip.
+    """
+    relation = source_relation(table, query)
+    if columns is None:
+        columns = describe_source(conn, relation)
+    statement, plan = build_statistics_query(relation, columns, analysis_type)
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(statement)
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+
+    return _reshape(row, plan, columns, analysis_type)
+
+
+def trend_columns(columns: List[Tuple[str, int]], time_column: str = None, value_column: str = None,
+                  group_column: str = None) -> Tuple[str, str]:
+    """Time and value columns for a trend, detected from column types and names when not given."""
+    names = [name for name, _ in columns]
+    for name in (time_column, value_column, group_column):
+        if name and name not in names:
+            raise ValueError(f"Column '{name}' not found in source")
+
+    if time_column is None:
+        candidates = [name for name, oid in columns if oid in TIME_TYPE_OIDS]
+        candidates += [name for name in names if any(h in name.lower() for h in TIME_COLUMN_HINTS)]
+        if not candidates:
+            raise ValueError("Could not detect a time column; pass time_column")
+        time_column = candidates[0]
+
+    if value_column is None:
+        numeric = [
+            name for name, oid in columns
+            if oid in NUMERIC_TYPE_OIDS and name not in (time_column, group_column)
+        ]
+        if not numeric:
+            raise ValueError("Could not detect a numeric value column; pass value_column")
+        # Summing surrogate keys is never the trend anyone asked about
+        measures = [name for name in numeric if name.lower() != "id" and not name.lower().endswith("_id")]
+        value_column = (measures or numeric)[0]
+
+    return time_column, value_column
+
+
+def choose_trend_period(conn, relation: sql.Composable, time_column: str) -> str:
+    """The finest period that spreads the source's time range over at most MAX_TREND_PERIODS points."""
+    column = sql.Identifier(time_column)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql.SQL("SELECT max({})::date - min({})::date FROM {}").format(column, column, relation))
+        span_days = cursor.fetchone()[0] or 0
+    finally:
+        cursor.close()
+    for period in TREND_PERIODS:
+        if span_days / _PERIOD_DAYS[period] <= MAX_TREND_PERIODS:
+            return period
+    return TREND_PERIODS[-1]
+
+
+def build_trend_query(relation: sql.Composable, time_column: str, value_column: str, group_column: str = None,
+                      period: str = None, aggregate: str = "sum") -> sql.Composed:
+    """One aggregated point per (group, period); without a period, per distinct time value."""
+    if period is not None and period not in TREND_PERIODS:
+        raise ValueError(f"period must be one of {', '.join(TREND_PERIODS)}")
+    if aggregate not in TREND_AGGREGATES:
+        raise ValueError(f"aggregate must be one of {', '.join(TREND_AGGREGATES)}")
+
+    time, value = sql.Identifier(time_column), sql.Identifier(value_column)
+    time_expression = sql.SQL("date_trunc({}, {})").format(sql.Literal(period), time) if period else time
+    expressions = [
+        sql.SQL("{} AS {}").format(time_expression, time),
+        sql.SQL("{}({})::float8 AS {}").format(sql.SQL(aggregate), value, value)
+    ]
+    keys = sql.SQL("1")
+    if group_column:
+        group = sql.Identifier(group_column)
+        expressions.insert(0, sql.SQL("{}::text AS {}").format(group, group))
+        keys = sql.SQL("1, 2")
+
+    return sql.SQL(
+        "SELECT {} FROM {} WHERE {} IS NOT NULL AND {} IS NOT NULL GROUP BY {} ORDER BY {}"
+    ).format(sql.SQL(", ").join(expressions), relation, time, value, keys, keys)
+
+
+def fetch_source_trend(conn, table: str = None, query: str = None, time_column: str = None,
+                       value_column: str = None, group_column: str = None, period: str = None,
+                       aggregate: str = "sum", columns: List[Tuple[str, int]] = None) -> Tuple[pd.DataFrame, Dict]:
+    """A source aggregated to one value per group and period inside Postgres.
+
+    Date and timestamp columns are truncated to period (chosen from the time
+    range when omitted); other time columns, such as years or 'YYYY-MM' text,
+    are grouped by value. columns work as for compute_source_statistics. Returns
+    the series frame and the columns, period and aggregate used.
+    """
+    relation = source_relation(table, query)
+    if columns is None:
+        columns = describe_source(conn, relation)
+    time_column, value_column = trend_columns(columns, time_column, value_column, group_column)
+    if dict(columns)[time_column] not in TIME_TYPE_OIDS:
+        period = None
+    elif period is None:
+        period = choose_trend_period(conn, relation, time_column)
+
+    statement = build_trend_query(relation, time_column, value_column, group_column, period, aggregate)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(statement)
+        frame = pd.DataFrame(cursor.fetchall(), columns=[col.name for col in cursor.description])
+    finally:
+        cursor.close()
+
+    return frame, {
+        "time_column": time_column,
+        "value_column": value_column,
+        "group_column": group_column,
+        "period": period,
+        "aggregate": aggregate
+    }
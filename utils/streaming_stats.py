@@ -0,0 +1,307 @@
+# ============================================================================
+# File: utils/streaming_stats.py
+# ============================================================================
+import uuid
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Iterator, List
+from utils.sql_statistics import NUMERIC_TYPE_OIDS
+
+
+PERCENTILES = (0.25, 0.5, 0.75)
+
+
+class RunningMoments:
+    """Mergeable count/mean/variance/min/max (Welford, with Chan's batch merge)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def _combine(self, count, mean, m2, minimum, maximum):
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+    def update(self, values: np.ndarray):
+        values = values[~np.isnan(values)]
+        if len(values):
+            mean = values.mean()
+            self._combine(len(values), mean, ((values - mean) ** 2).sum(), values.min(), values.max())
+
+    def merge(self, other: "RunningMoments"):
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else None
+
+
+class KLLSketch:
+    """Mergeable quantile sketch (KLL) with O(k log n) memory."""
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # Keep one odd item behind so every promoted pair is complete
+                keep = items[:len(items) % 2]
+                paired = items[len(keep):]
+                promoted = paired[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values: np.ndarray):
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+
+    def merge(self, other: "KLLSketch"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+
+    def quantiles(self, probabilities) -> List[float]:
+        items = np.concatenate(self.levels)
+        if not len(items):
+            return [None] * len(probabilities)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items)
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(probabilities) * cumulative[-1])
+        return [float(v) for v in items[order][np.minimum(positions, len(items) - 1)]]
+
+
+class HyperLogLog:
+    """Mergeable approximate distinct counter."""
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @staticmethod
+    def _bit_length(values: np.ndarray) -> np.ndarray:
+        """Exact bit length of uint64 values."""
+        lengths = np.zeros(len(values), dtype=np.uint8)
+        values = values.copy()
+        for shift in (32, 16, 8, 4, 2, 1):
+            mask = values >= (np.uint64(1) << np.uint64(shift))
+            lengths[mask] += shift
+            values[mask] >>= np.uint64(shift)
+        return lengths + (values > 0)
+
+    def update(self, values):
+        if not len(values):
+            return
+        hashes = pd.util.hash_array(np.asarray(values), categorize=False)
+        width = 64 - self.precision
+        index = (hashes >> np.uint64(width)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << width) - 1)
+        rank = (width + 1 - self._bit_length(remainder)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(2.0 ** -self.registers.astype(float))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class CoMoments:
+    """Mergeable co-moment matrix for Pearson correlations over complete rows."""
+
+    def __init__(self, size: int):
+        self.count = 0
+        self.mean = np.zeros(size)
+        self.c = np.zeros((size, size))
+
+    def _combine(self, count, mean, c):
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.c += c + np.outer(delta, delta) * self.count * count / total
+        self.mean += delta * count / total
+        self.count = total
+
+    def update(self, matrix: np.ndarray):
+        matrix = matrix[~np.isnan(matrix).any(axis=1)]
+        if len(matrix):
+            mean = matrix.mean(axis=0)
+            centered = matrix - mean
+            self._combine(len(matrix), mean, centered.T @ centered)
+
+    def merge(self, other: "CoMoments"):
+        self._combine(other.count, other.mean, other.c)
+
+    def correlation(self) -> np.ndarray:
+        scale = np.sqrt(np.diag(self.c))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            matrix = np.clip(self.c / np.outer(scale, scale), -1.0, 1.0)
+        return matrix
+
+
+class StreamingSummary:
+    """Constant-memory summary of a row stream, mergeable across partitions."""
+
+    def __init__(self, kll_k: int = 200, hll_precision: int = 12):
+        self.kll_k = kll_k
+        self.hll_precision = hll_precision
+        self.row_count = 0
+        self.columns = None
+        self.numeric_columns = None
+        self.nulls = {}
+        self.distinct = {}
+        self.moments = {}
+        self.quantiles = {}
+        self.comoments = None
+
+    def _initialize(self, columns: List[str], numeric_columns: List[str]):
+        self.columns = list(columns)
+        self.numeric_columns = list(numeric_columns)
+        for column in self.columns:
+            self.nulls[column] = 0
+            self.distinct[column] = HyperLogLog(self.hll_precision)
+        for column in self.numeric_columns:
+            self.moments[column] = RunningMoments()
+            self.quantiles[column] = KLLSketch(self.kll_k)
+        self.comoments = CoMoments(len(self.numeric_columns))
+
+    def update(self, batch: pd.DataFrame):
+        """Fold one batch of rows into the summary."""
+        if self.columns is None:
+            self._initialize(batch.columns, [c for c in batch.columns if pd.api.types.is_numeric_dtype(batch[c])])
+
+        self.row_count += len(batch)
+        for column in self.columns:
+            series = batch[column]
+            present = series.dropna()
+            self.nulls[column] += len(series) - len(present)
+            if column in self.moments:
+                values = pd.to_numeric(present, errors='coerce').to_numpy(dtype=float)
+                self.distinct[column].update(values)
+                self.moments[column].update(values)
+                self.quantiles[column].update(values)
+            else:
+                self.distinct[column].update(present.astype(str).to_numpy(dtype=object))
+
+        if self.numeric_columns:
+            matrix = batch[self.numeric_columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+            self.comoments.update(matrix)
+
+    def merge(self, other: "StreamingSummary") -> "StreamingSummary":
+        """Combine with a summary built over another partition of the same source."""
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self._initialize(other.columns, other.numeric_columns)
+
+        self.row_count += other.row_count
+        for column in self.columns:
+            self.nulls[column] += other.nulls[column]
+            self.distinct[column].merge(other.distinct[column])
+        for column in self.numeric_columns:
+            self.moments[column].merge(other.moments[column])
+            self.quantiles[column].merge(other.quantiles[column])
+        self.comoments.merge(other.comoments)
+        return self
+
+    def describe(self) -> Dict:
+        """Per-column statistics in the same layout as DataFrame.describe()."""
+        statistics = {}
+        for column in self.numeric_columns or []:
+            moments = self.moments[column]
+            quartiles = self.quantiles[column].quantiles(PERCENTILES)
+            statistics[column] = {
+                "count": moments.count,
+                "mean": float(moments.mean) if moments.count else None,
+                "std": moments.std,
+                "min": float(moments.min) if moments.count else None,
+                **{f"{int(p * 100)}%": q for p, q in zip(PERCENTILES, quartiles)},
+                "max": float(moments.max) if moments.count else None,
+                "approx_distinct": self.distinct[column].estimate()
+            }
+        return statistics
+
+    def summary(self) -> Dict:
+        return {
+            "row_count": self.row_count,
+            "column_count": len(self.columns or []),
+            "columns": self.columns or [],
+            "missing_values": dict(self.nulls),
+            "approx_distinct_values": {c: hll.estimate() for c, hll in self.distinct.items()}
+        }
+
+    def correlations(self) -> Dict:
+        matrix = self.comoments.correlation()
+        return {
+            a: {b: (None if np.isnan(matrix[i, j]) else float(matrix[i, j])) for j, b in enumerate(self.numeric_columns)}
+            for i, a in enumerate(self.numeric_columns)
+        }
+
+
+def summarize_batches(batches: Iterable[pd.DataFrame], summary: StreamingSummary = None) -> StreamingSummary:
+    """Consume an iterator of row batches into a streaming summary."""
+    summary = summary or StreamingSummary()
+    for batch in batches:
+        summary.update(batch)
+    return summary
+
+
+def iter_records(records: List[Dict], batch_size: int = 10000) -> Iterator[pd.DataFrame]:
+    """Yield DataFrame batches from a list of row dicts."""
+    for start in range(0, len(records), batch_size):
+        yield pd.DataFrame(records[start:start + batch_size])
+
+
+def iter_query_batches(conn, query, batch_size: int = 10000) -> Iterator[pd.DataFrame]:
+    """Stream a query through a server-side cursor as DataFrame batches."""
+    cursor = conn.cursor(name=f"stream_{uuid.uuid4().hex[:12]}")
+    cursor.itersize = batch_size
+    try:
+        cursor.execute(query)
+        rows = cursor.fetchmany(batch_size)
+        columns = [col.name for col in cursor.description]
+        numeric = [col.name for col in cursor.description if col.type_code in NUMERIC_TYPE_OIDS]
+        while rows:
+            batch = pd.DataFrame.from_records(rows, columns=columns)
+            # NUMERIC arrives as Decimal objects; convert so the batch is vectorizable
+            for column in numeric:
+                batch[column] = pd.to_numeric(batch[column], errors='coerce').astype(float)
+            yield batch
+            rows = cursor.fetchmany(batch_size)
+    finally:
+        cursor.close()
@@ -0,0 +1,197 @@
+# ============================================================================
+# File: utils/trend_analysis.py
+# ============================================================================
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+
+TIME_COLUMN_HINTS = ("date", "period", "month", "year", "week", "day", "time")
+
+# Shorter series do not have enough residuals for a meaningful spread estimate
+MIN_POINTS_FOR_ANOMALIES = 8
+
+
+def _detect_columns(df: pd.DataFrame, time_column: Optional[str], value_column: Optional[str],
+                    group_column: Optional[str]):
+    """Pick time and value columns when the caller did not name them."""
+    if time_column is None:
+        datetime_cols = [c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])]
+        hinted = [c for c in df.columns if any(h in str(c).lower() for h in TIME_COLUMN_HINTS)]
+        candidates = datetime_cols + hinted
+        if not candidates:
+            raise ValueError("Could not detect a time column; pass time_column")
+        time_column = candidates[0]
+
+    if value_column is None:
+        numeric = [
+            c for c in df.columns
+            if c not in (time_column, group_column) and pd.to_numeric(df[c], errors='coerce').notna().mean() > 0.9
+        ]
+        if not numeric:
+            raise ValueError("Could not detect a numeric value column; pass value_column")
+        value_column = numeric[0]
+
+    return time_column, value_column
+
+
+def _to_time_axis(values: pd.Series) -> pd.Series:
+    """Parse periods such as '2024-03' or dates; keep plain numbers (e.g. years) numeric."""
+    if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    parsed = pd.to_datetime(values, errors='coerce')
+    if parsed.notna().mean() > 0.9:
+        return parsed
+    numeric = pd.to_numeric(values, errors='coerce')
+    return numeric if numeric.notna().mean() > 0.9 else values
+
+
+def _leave_one_out_median(values: pd.Series) -> pd.Series:
+    """Median of the other values for each value; NaN when there is no other.
+
+    Used for the seasonal profile: a point's own value never enters its
+    expected value, so it cannot be cancelled to an exact-zero residual that
+    would shrink the MAD. Medians keep one outlier from leaking into the same
+    phase of other cycles.
+    """
+    count = len(values)
+    if count < 2:
+        return pd.Series(np.nan, index=values.index)
+    others = np.broadcast_to(values.to_numpy(dtype=float), (count, count))[~np.eye(count, dtype=bool)]
+    return pd.Series(np.median(others.reshape(count, count - 1), axis=1), index=values.index)
+
+
+def _robust_z(residual: pd.Series, keys: pd.Series) -> pd.Series:
+    """Robust z-score per group: 0.6745 * (x - median) / MAD."""
+    grouped = residual.groupby(keys)
+    median = grouped.transform('median')
+    mad = (residual - median).abs().groupby(keys).transform('median')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (0.6745 * (residual - median) / mad).replace([np.inf, -np.inf], np.nan)
+
+
+def _standard_z(residual: pd.Series, keys: pd.Series) -> pd.Series:
+    """Classic z-score per group."""
+    grouped = residual.groupby(keys)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (residual - grouped.transform('mean')) / grouped.transform('std')
+    return z.replace([np.inf, -np.inf], np.nan)
+
+
+def _clean(value):
+    """Make a value compact and JSON-friendly."""
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, (np.integer, np.floating)):
+        value = value.item()
+    if isinstance(value, float):
+        return None if np.isnan(value) else round(value, 4)
+    return value
+
+
+def analyze_trends(df: pd.DataFrame, time_column: str = None, value_column: str = None,
+                   group_column: str = None, window: int = 3, season_length: int = None,
+                   anomaly_method: str = "mad", threshold: float = 3.5,
+                   max_series: int = 25, max_anomalies: int = 10) -> Dict:
+    """Trend and anomaly findings for one or many series, computed with grouped vector ops."""
+    time_column, value_column = _detect_columns(df, time_column, value_column, group_column)
+
+    frame = pd.DataFrame({
+        "time": _to_time_axis(df[time_column]),
+        "value": pd.to_numeric(df[value_column], errors='coerce').astype(float),
+        "group": df[group_column].astype(str) if group_column else "all"
+    }).dropna(subset=["time", "value"])
+    frame = frame.sort_values(["group", "time"], kind="mergesort").reset_index(drop=True)
+
+    keys = frame["group"]
+    grouped = frame.groupby(keys, sort=False)
+    frame["t"] = grouped.cumcount().astype(float)
+
+    # Least-squares slope per group from grouped sums: (nΣty − ΣtΣy) / (nΣt² − (Σt)²)
+    frame["ty"] = frame["t"] * frame["value"]
+    frame["tt"] = frame["t"] ** 2
+    sums = frame.groupby(keys, sort=False)[["t", "value", "ty", "tt"]].sum()
+    n = grouped.size().astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * sums["ty"] - sums["t"] * sums["value"]) / (n * sums["tt"] - sums["t"] ** 2)
+    slope = slope.fillna(0.0)
+    intercept = (sums["value"] - slope * sums["t"]) / n
+
+    # Detrended residuals, optionally with a seasonal profile removed
+    fitted = frame["group"].map(intercept) + frame["group"].map(slope) * frame["t"]
+    residual = frame["value"] - fitted
+    if season_length and season_length > 1:
+        phase = (frame["t"] % season_length).astype(int)
+        seasonal = residual.groupby([keys, phase]).transform(_leave_one_out_median)
+        has_seasons = frame["group"].map(n >= 2 * season_length)
+        seasonal = seasonal.where(has_seasons, 0.0).fillna(0.0)
+        residual = residual - seasonal
+        fitted = fitted + seasonal
+
+    score = _robust_z(residual, keys) if anomaly_method == "mad" else _standard_z(residual, keys)
+    score = score.where(frame["group"].map(n >= MIN_POINTS_FOR_ANOMALIES))
+    frame["expected"] = fitted
+    frame["score"] = score
+    frame["rolling_mean"] = (
+        grouped["value"].rolling(window, min_periods=1).mean().reset_index(level=0, drop=True)
+    )
+    frame["change_pct"] = grouped["value"].pct_change() * 100
+
+    first = grouped.first()
+    last = grouped.last()
+    mean_abs = frame["value"].abs().groupby(keys, sort=False).mean()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total_change_pct = ((last["value"] - first["value"]) / first["value"].abs() * 100).replace([np.inf, -np.inf], np.nan)
+        # Share of the mean level the fitted line moves over the whole series
+        trend_strength = (slope * (n - 1) / mean_abs).replace([np.inf, -np.inf], np.nan).fillna(0.0)
+    direction = np.where(trend_strength > 0.05, "increasing", np.where(trend_strength < -0.05, "decreasing", "flat"))
+
+    anomalous = frame[frame["score"].abs() > threshold]
+    anomaly_counts = anomalous.groupby("group").size()
+
+    findings = pd.DataFrame({
+        "group": first.index,
+        "points": n.astype(int).values,
+        "start": first["time"].values,
+        "end": last["time"].values,
+        "first_value": first["value"].values,
+        "last_value": last["value"].values,
+        "total_change_pct": total_change_pct.values,
+        "slope_per_period": slope.values,
+        "direction": direction,
+        "last_period_change_pct": frame.groupby(keys, sort=False)["change_pct"].last().values,
+        "avg_period_change_pct": frame.groupby(keys, sort=False)["change_pct"].mean().values,
+        "rolling_mean_last": frame.groupby(keys, sort=False)["rolling_mean"].last().values,
+        "anomaly_count": anomaly_counts.reindex(first.index, fill_value=0).values
+    })
+    findings["_rank"] = findings["total_change_pct"].abs().fillna(0) + findings["anomaly_count"] * 1000
+    findings = findings.sort_values("_rank", ascending=False).drop(columns="_rank").head(max_series)
+
+    top_anomalies = anomalous.reindex(anomalous["score"].abs().sort_values(ascending=False).index).head(max_anomalies)
+
+    return {
+        "time_column": time_column,
+        "value_column": value_column,
+        "group_column": group_column,
+        "series_count": int(len(n)),
+        "total_points": int(len(frame)),
+        "anomaly_method": "robust z-score (MAD)" if anomaly_method == "mad" else "z-score",
+        "seasonal_adjustment": season_length if season_length and season_length > 1 else None,
+        "findings": [{key: _clean(value) for key, value in row.items()} for row in findings.to_dict('records')],
+        "anomalies": [
+            {
+                "group": row["group"],
+                "time": _clean(row["time"]),
+                "value": _clean(row["value"]),
+                "expected": _clean(row["expected"]),
+                "score": round(row["score"], 2)
+            }
+            for row in top_anomalies.to_dict('records')
+        ],
+        "summary": [
+            f"{row['group']}: {row['direction']}"
+            + (f", {row['total_change_pct']:+.1f}% from first to last period" if pd.notna(row['total_change_pct']) else "")
+            + f" over {row['points']} points, {row['anomaly_count']} anomalies"
+            for row in findings.to_dict('records')
+        ]
+    }